@@ -0,0 +1,240 @@
+"""
+Генератор детерминированного синтетического корпуса документов для бенчмарков.
+
+Корпус содержит письма-бланки на русском языке («Отправитель», «Кому», «№»,
+даты, тема) в форматах DOCX, PDF с текстовым слоем, сканированный PDF
+и сканы PNG/TIFF. Рядом с документами пишется corpus.json с ожидаемыми
+значениями реквизитов и исходным текстом — для оценки точности.
+
+Запуск из корня проекта:
+    python -m benchmarks.corpus --output bench_corpus --count 20
+"""
+import os
+import json
+import random
+import argparse
+
+FORMATS = ("docx", "pdf_text", "pdf_scan", "png", "tiff")
+
+_EXTENSIONS = {"docx": ".docx", "pdf_text": ".pdf", "pdf_scan": ".pdf", "png": ".png", "tiff": ".tiff"}
+
+_FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+    "/Library/Fonts/Arial.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+]
+
+_LAST_NAMES = ["Иванов", "Петров", "Сидоров", "Кузнецов", "Смирнов", "Попов", "Васильев", "Соколов"]
+_FIRST_NAMES = ["Иван", "Пётр", "Сергей", "Алексей", "Дмитрий", "Андрей", "Николай", "Михаил"]
+_PATRONYMICS = ["Иванович", "Петрович", "Сергеевич", "Алексеевич", "Дмитриевич", "Андреевич"]
+_ORGS = ["ООО «Ромашка»", "АО «Вектор»", "ПАО «Северсталь-Сервис»", "ООО «Гамма»", "ГУП «Водоканал»"]
+_MONTHS = ["января", "февраля", "марта", "апреля", "мая", "июня", "июля",
+           "августа", "сентября", "октября", "ноября", "декабря"]
+_TYPES = {
+    "письмо": ["О направлении информации", "О согласовании графика", "Ответ на запрос"],
+    "приказ": ["О назначении ответственного", "Об утверждении положения", "О проведении проверки"],
+    "договор": ["Договор поставки", "Договор аренды помещения", "Договор оказания услуг"],
+}
+_WORDS = ("в соответствии с настоящим прошу направить сведения о выполнении работ "
+          "по договору согласно приложению сроки исполнения обязательств стороны "
+          "обеспечивают оплату в течение десяти рабочих дней с момента подписания "
+          "акта приёма передачи документации").split()
+
+
+def find_font(font_path=None):
+    if font_path:
+        return font_path
+    for candidate in _FONT_CANDIDATES:
+        if os.path.exists(candidate):
+            return candidate
+    raise RuntimeError("Не найден TTF-шрифт с кириллицей, укажите его через --font")
+
+
+def _person(rng):
+    return f"{rng.choice(_LAST_NAMES)} {rng.choice(_FIRST_NAMES)} {rng.choice(_PATRONYMICS)}"
+
+
+def make_document(rng, pages: int = 1) -> dict:
+    """
+        Содержимое одного документа: строки текста и ожидаемые реквизиты.
+    """
+    doc_type = rng.choice(sorted(_TYPES))
+    sender = _person(rng)
+    recipient = _person(rng)
+    number = f"{rng.randint(1, 999)}/{rng.randint(1, 99)}"
+    if rng.random() < 0.5:
+        date = f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.randint(2019, 2025)}"
+    else:
+        date = f"{rng.randint(1, 28)} {rng.choice(_MONTHS)} {rng.randint(2019, 2025)}"
+    subject = rng.choice(_TYPES[doc_type])
+
+    lines = [
+        rng.choice(_ORGS),
+        "",
+        f"Отправитель: {sender}",
+        "",
+        f"Кому: {recipient}",
+        "",
+        f"№ {number}",
+        f"Дата {date}",
+        f"Тема: {subject}",
+        "",
+    ]
+    for _ in range(pages):
+        for _ in range(rng.randint(8, 14)):
+            lines.append(" ".join(rng.choice(_WORDS) for _ in range(rng.randint(6, 11))).capitalize() + ".")
+        lines.append("\f")
+    lines[-1] = "С уважением"
+    lines.append(sender)
+
+    return {
+        "lines": lines,
+        "text": "\n".join(line for line in lines if line and line != "\f"),
+        "expected": {
+            "document_type": doc_type.capitalize(),
+            "sender": sender,
+            "recipient": recipient,
+            "document_number": number,
+            "document_date": date,
+            "subject": subject,
+        },
+    }
+
+
+def _split_pages(lines):
+    pages = [[]]
+    for line in lines:
+        if line == "\f":
+            pages.append([])
+        else:
+            pages[-1].append(line)
+    return [page for page in pages if page]
+
+
+def write_docx(path, lines):
+    from docx import Document
+    doc = Document()
+    for line in lines:
+        if line == "\f":
+            doc.add_page_break()
+        else:
+            doc.add_paragraph(line)
+    doc.save(path)
+
+
+def render_page(lines, font_path, dpi=200, rng=None):
+    """
+        Отрисовка страницы A4 как «скана»: градации серого, лёгкий шум и наклон.
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    width, height = int(8.27 * dpi), int(11.69 * dpi)
+    image = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.truetype(font_path, size=max(10, dpi // 8))
+    margin = dpi
+    y = margin
+    for line in lines:
+        draw.text((margin, y), line, fill=0, font=font)
+        y += int(font.size * 1.5)
+
+    if rng is not None:
+        for _ in range(width * height // 2000):
+            draw.point((rng.randrange(width), rng.randrange(height)), fill=rng.randint(120, 220))
+        image = image.rotate(rng.uniform(-1.5, 1.5), fillcolor=255, expand=False)
+    image.info["dpi"] = (dpi, dpi)
+    return image
+
+
+def write_pdf_text(path, lines, font_path):
+    import fitz
+    doc = fitz.open()
+    for page_lines in _split_pages(lines):
+        page = doc.new_page(width=595, height=842)
+        page.insert_font(fontname="F0", fontfile=font_path)
+        page.insert_textbox(fitz.Rect(60, 60, 535, 800), "\n".join(page_lines),
+                            fontname="F0", fontsize=11)
+    doc.save(path)
+    doc.close()
+
+
+def write_pdf_scan(path, lines, font_path, rng):
+    import io
+    import fitz
+    doc = fitz.open()
+    for page_lines in _split_pages(lines):
+        image = render_page(page_lines, font_path, rng=rng)
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        page = doc.new_page(width=595, height=842)
+        page.insert_image(page.rect, stream=buffer.getvalue())
+    doc.save(path)
+    doc.close()
+
+
+def write_image(path, lines, font_path, rng, fmt):
+    pages = [render_page(page, font_path, rng=rng) for page in _split_pages(lines)]
+    if fmt == "tiff":
+        pages[0].save(path, save_all=True, append_images=pages[1:], compression="tiff_deflate", dpi=(200, 200))
+    else:
+        # PNG — одностраничный скан первой страницы
+        pages[0].save(path, dpi=(200, 200))
+
+
+def generate(output_folder: str, count: int = 10, seed: int = 42, formats=FORMATS,
+             font_path=None, max_pages: int = 3) -> dict:
+    """
+        Создаёт count документов каждого формата. Одинаковые seed и count
+        дают одинаковое содержимое корпуса.
+    """
+    font_path = find_font(font_path)
+    os.makedirs(output_folder, exist_ok=True)
+    rng = random.Random(seed)
+    manifest = {"seed": seed, "count": count, "documents": []}
+
+    for fmt in formats:
+        for i in range(count):
+            document = make_document(rng, pages=rng.randint(1, max_pages))
+            name = f"{fmt}_{i:04d}{_EXTENSIONS[fmt]}"
+            path = os.path.join(output_folder, name)
+            if fmt == "docx":
+                write_docx(path, document["lines"])
+            elif fmt == "pdf_text":
+                write_pdf_text(path, document["lines"], font_path)
+            elif fmt == "pdf_scan":
+                write_pdf_scan(path, document["lines"], font_path, rng)
+            else:
+                write_image(path, document["lines"], font_path, rng, fmt)
+            manifest["documents"].append({
+                "file": name,
+                "format": fmt,
+                "expected": document["expected"],
+                # Для PNG сохраняется только первая страница
+                "text": document["text"] if fmt != "png" else "\n".join(
+                    line for line in _split_pages(document["lines"])[0] if line),
+            })
+
+    with open(os.path.join(output_folder, "corpus.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Генерация синтетического корпуса для бенчмарков")
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--count", type=int, default=10, help="Документов каждого формата")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS))
+    parser.add_argument("--max-pages", type=int, default=3)
+    parser.add_argument("--font", help="TTF-шрифт с кириллицей")
+    args = parser.parse_args(argv)
+
+    manifest = generate(args.output, args.count, args.seed, args.formats, args.font, args.max_pages)
+    print(f"Создано документов: {len(manifest['documents'])} в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
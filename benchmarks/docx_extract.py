@@ -0,0 +1,132 @@
+"""
+Сравнение потокового извлечения текста DOCX (src.core.docx_reader)
+с прежним путём через python-docx на больших документах: время
+и пиковый объём памяти процесса (каждый способ замеряется в отдельном
+процессе: python-docx держит дерево lxml вне кучи Python, поэтому
+tracemalloc его не видит).
+
+Без --files генерируется документ из --paragraphs абзацев с таблицей
+и колонтитулами.
+
+Запуск из корня проекта:
+    python -m benchmarks.docx_extract --paragraphs 20000 50000
+    python -m benchmarks.docx_extract --files big1.docx big2.docx
+"""
+import io
+import os
+import re
+import time
+import random
+import argparse
+import zipfile
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape
+
+from benchmarks.corpus import make_document
+from benchmarks.run import peak_rss_mb
+
+METHODS = ("streaming", "python-docx")
+
+
+def _paragraph_xml(text: str) -> str:
+    return f"<w:p><w:r><w:t xml:space=\"preserve\">{escape(text)}</w:t></w:r></w:p>"
+
+
+def _table_xml(rows) -> str:
+    cells = "".join(
+        "<w:tr>" + "".join(f"<w:tc>{_paragraph_xml(value)}</w:tc>" for value in row) + "</w:tr>"
+        for row in rows
+    )
+    return f"<w:tbl>{cells}</w:tbl>"
+
+
+def make_large_docx(path: str, paragraphs: int, seed: int = 0):
+    """
+        Шаблон с колонтитулами создаётся python-docx, тело документа
+        пишется в word/document.xml напрямую: добавление десятков тысяч
+        абзацев через python-docx заняло бы больше, чем сам замер.
+    """
+    from docx import Document
+
+    rng = random.Random(seed)
+    doc = Document()
+    section = doc.sections[0]
+    section.header.paragraphs[0].text = "ООО «Бланк» — исх. № 1/1"
+    section.footer.paragraphs[0].text = "Страница документа"
+    doc.add_paragraph("{body}")
+    template = io.BytesIO()
+    doc.save(template)
+
+    body = []
+    written = 0
+    while written < paragraphs:
+        lines = [line for line in make_document(rng, 1)["lines"] if line.strip()]
+        body += [_paragraph_xml(line) for line in lines]
+        body.append(_table_xml([("Реквизит", rng.choice(lines)) for _ in range(3)]))
+        written += len(lines) + 6
+
+    with zipfile.ZipFile(template) as source, zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as target:
+        for item in source.infolist():
+            data = source.read(item.filename)
+            if item.filename == "word/document.xml":
+                data = re.sub(rb"<w:p>(?:(?!<w:p>).)*?\{body\}.*?</w:p>", lambda _: "".join(body).encode(), data)
+            target.writestr(item, data)
+
+
+def _extractor(method: str):
+    from src.core.text_extractor import extract_text_docx, extract_text_docx_legacy
+    return extract_text_docx if method == "streaming" else extract_text_docx_legacy
+
+
+def measure(method: str, path: str, repeat: int) -> dict:
+    function = _extractor(method)
+    baseline = peak_rss_mb()
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        text = function(path)
+        seconds = time.perf_counter() - started
+        best = seconds if best is None else min(best, seconds)
+    peak = peak_rss_mb()
+    return {
+        "seconds": round(best, 3),
+        "rss_mb": round(peak - baseline, 1) if peak is not None and baseline is not None else None,
+        "chars": len(text or ""),
+    }
+
+
+def measure_in_process(method: str, path: str, repeat: int) -> dict:
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(measure, method, path, repeat).result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Потоковый DOCX против python-docx")
+    parser.add_argument("--files", nargs="+", help="Готовые DOCX-файлы")
+    parser.add_argument("--paragraphs", nargs="+", type=int, default=[5000, 20000],
+                        help="Размеры генерируемых документов, абзацев")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = args.files
+        if not files:
+            files = []
+            for count in args.paragraphs:
+                path = os.path.join(tmp, f"large_{count}.docx")
+                make_large_docx(path, count)
+                files.append(path)
+
+        print(f"{'Файл':<24} {'МБ':>6} {'способ':<12} {'время, с':>9} {'+RSS, МБ':>8} {'символов':>9}")
+        for path in files:
+            size = os.path.getsize(path) / 2 ** 20
+            for method in METHODS:
+                report = measure_in_process(method, path, args.repeat)
+                print(f"{os.path.basename(path):<24} {size:>6.1f} {method:<12} {report['seconds']:>9} "
+                      f"{report['rss_mb']!s:>8} {report['chars']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Сравнение движка правил реквизитов (src.core.rules) с прежним разбором
+строк в nlp_extractor: время разбора без NER и совпадение результатов
+(поля и блоки для NER) на текстах корпуса benchmarks.corpus.
+
+Запуск из корня проекта:
+    python -m benchmarks.field_rules --corpus bench_corpus [--repeat 50]
+"""
+import re
+import os
+import json
+import time
+import argparse
+
+
+def legacy_scan_fields(text):
+    """
+        Прежняя реализация (до движка правил) — эталон для сравнения.
+    """
+    lines = [line.strip() for line in text.splitlines()]
+
+    while lines and lines[0] == "":
+        lines.pop(0)
+    while lines and lines[-1] == "":
+        lines.pop()
+
+    result = {"sender": None, "recipient": None, "document_date": None,
+              "document_number": None, "subject": None, "content_summary": None}
+
+    date_patterns = [
+        r"\b\d{1,2}[./-]\d{1,2}[./-]\d{2,4}\b",
+        r"\b\d{1,2}\s+(?:января|февраля|марта|апреля|мая|июня|июля|августа|сентября|октября|ноября|декабря)\s+\d{4}\b",
+        r"\b\d{4}-\d{2}-\d{2}\b"
+    ]
+    date_re = re.compile("|".join(f"({p})" for p in date_patterns), re.IGNORECASE)
+    num_re = re.compile(r"(?:Документ\s*№[:\s]*|№[:\s]*|Номер[:\s]*)\s*([\w\/\-]+(?:[:\s]*\d{1,2}[\/\-]?\d{1,4})?)",
+                        re.IGNORECASE)
+
+    assignments = []
+    sender_found = False
+    for idx, ln in enumerate(lines):
+        if re.match(r"^(Отправитель|От кого)\b", ln, re.IGNORECASE):
+            block = [s for s in _legacy_block(lines, idx) if s]
+            if block:
+                assignments.append(("sender", " ".join(block)))
+                sender_found = True
+        elif re.match(r"^(Получатель|Кому)\b", ln, re.IGNORECASE):
+            block = [s for s in _legacy_block(lines, idx) if s]
+            if block:
+                assignments.append(("recipient", " ".join(block).strip()))
+        elif re.match(r"^(Тема|Subject)[:\s]", ln, re.IGNORECASE):
+            if ":" in ln:
+                result["subject"] = ln.split(":", 1)[1].strip()
+            elif idx + 1 < len(lines) and lines[idx + 1].strip():
+                result["subject"] = lines[idx + 1].strip()
+        elif not sender_found:
+            block = [s for s in _legacy_block(lines, idx - 1) if s]
+            if block:
+                assignments.append(("sender", " ".join(block)))
+                sender_found = True
+
+    num_match = num_re.search(text)
+    if num_match:
+        result["document_number"] = num_match.group(1).strip()
+    date_match = date_re.search(text)
+    if date_match:
+        for g in date_match.groups():
+            if g:
+                result["document_date"] = g.strip().strip(" .гГ")
+                break
+    return result, assignments
+
+
+def _legacy_block(lines, i):
+    block = []
+    if ":" in lines[i]:
+        after = lines[i].split(":", 1)[1].strip()
+        if after:
+            block.append(after)
+    j = i + 1
+    while j < len(lines):
+        ln = lines[j].strip()
+        if ln == "":
+            break
+        if re.match(r"^(От|Отправитель|От кого|Получатель|Кому|Документ|Дата|Тема|Текст|С уважением)\b",
+                    ln, re.IGNORECASE):
+            break
+        block.append(ln)
+        j += 1
+    return block
+
+
+def time_scan(scan, texts, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in texts:
+            scan(text)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def load_texts(corpus_folder: str, scale: int) -> list:
+    with open(os.path.join(corpus_folder, "corpus.json"), encoding="utf-8") as f:
+        documents = json.load(f)["documents"]
+    texts = [entry["text"] for entry in documents if entry.get("text")]
+    # Длинные документы: тексты корпуса, склеенные по scale штук
+    long_texts = ["\n\n".join(texts[i:i + scale]) for i in range(0, len(texts), scale)] if scale > 1 else []
+    return texts, long_texts
+
+
+def main(argv=None):
+    from src.core.rules import get_rules
+
+    parser = argparse.ArgumentParser(description="Движок правил реквизитов против прежнего разбора")
+    parser.add_argument("--corpus", required=True, help="Папка с corpus.json")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--scale", type=int, default=20,
+                        help="Сколько текстов склеивать в один длинный документ")
+    args = parser.parse_args(argv)
+
+    rules = get_rules()
+    texts, long_texts = load_texts(args.corpus, args.scale)
+
+    mismatches = [i for i, text in enumerate(texts) if rules.scan(text) != legacy_scan_fields(text)]
+    print(f"Текстов: {len(texts)}, расхождений с прежним разбором: {len(mismatches)}")
+
+    print(f"{'Набор':<16} {'прежний, мс':>12} {'правила, мс':>12} {'ускорение':>10}")
+    for name, sample in (("корпус", texts), (f"склейки ×{args.scale}", long_texts)):
+        if not sample:
+            continue
+        legacy = time_scan(legacy_scan_fields, sample, args.repeat)
+        engine = time_scan(rules.scan, sample, args.repeat)
+        print(f"{name:<16} {legacy * 1000:>12.2f} {engine * 1000:>12.2f} {legacy / engine:>9.2f}×")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Загрузка классификатора из pickle и из экспорта для mmap
+(src.core.model_store): время загрузки и память N одновременно
+работающих процессов. На Linux из /proc/self/smaps_rollup берутся
+RSS, собственная (Private) память процесса и PSS — доля общих
+страниц, поделённая между процессами; сумма PSS — реальный расход
+памяти на все процессы.
+
+Без --model строится синтетическая модель TF-IDF + LogisticRegression
+со словарём из --vocab термов.
+
+Запуск из корня проекта:
+    python -m benchmarks.model_load --processes 4 --vocab 500000
+    python -m benchmarks.model_load --model data/doc3_classifier.pkl
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+import multiprocessing
+
+SAMPLE_TEXTS = [
+    "Договор аренды нежилого помещения между арендодателем и арендатором",
+    "Приказ о приёме на работу и назначении на должность",
+    "Письмо с просьбой направить документы по договору поставки",
+]
+
+
+def make_synthetic_model(path: str, vocab: int, classes: int = 3, seed: int = 0):
+    import joblib
+    import numpy as np
+    from sklearn.pipeline import Pipeline
+    from sklearn.feature_extraction.text import TfidfVectorizer, TfidfTransformer
+    from sklearn.linear_model import LogisticRegression
+
+    rng = random.Random(seed)
+    alphabet = "абвгдежзиклмнопрстуфхцчшщэюя"
+    terms = set(text_word.lower() for text in SAMPLE_TEXTS for text_word in text.split())
+    while len(terms) < vocab:
+        terms.add("".join(rng.choice(alphabet) for _ in range(rng.randint(4, 12))))
+
+    vectorizer = TfidfVectorizer()
+    vectorizer.vocabulary_ = {term: i for i, term in enumerate(sorted(terms))}
+    vectorizer.fixed_vocabulary_ = False
+    vectorizer._stop_words_id = 0
+    vectorizer._tfidf = TfidfTransformer()
+    generator = np.random.default_rng(seed)
+    vectorizer.idf_ = 1.0 + generator.random(vocab) * 5
+
+    classifier = LogisticRegression()
+    classifier.classes_ = np.array([f"класс{i}" for i in range(classes)], dtype=object)
+    classifier.coef_ = generator.standard_normal((classes, vocab))
+    classifier.intercept_ = generator.standard_normal(classes)
+    classifier.n_features_in_ = vocab
+    classifier.n_iter_ = np.array([1])
+
+    joblib.dump(Pipeline([("tfidf", vectorizer), ("clf", classifier)]), path)
+
+
+def memory_mb() -> dict:
+    """
+        RSS, Private и PSS процесса в МБ (Linux), иначе только RSS через peak_rss_mb.
+    """
+    fields = {}
+    try:
+        with open("/proc/self/smaps_rollup", encoding="ascii") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    except OSError:
+        from benchmarks.run import peak_rss_mb
+        return {"rss": peak_rss_mb(), "private": None, "pss": None}
+    return {
+        "rss": fields.get("Rss"),
+        "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+        "pss": fields.get("Pss"),
+    }
+
+
+def _child(kind, path, barrier, conn):
+    # Импорт библиотек не входит во время загрузки и прирост памяти
+    import joblib
+    import sklearn.pipeline  # noqa: F401
+    import sklearn.linear_model  # noqa: F401
+    import sklearn.feature_extraction.text  # noqa: F401
+    from src.core import model_store
+
+    before = memory_mb()
+    started = time.perf_counter()
+    model = model_store.load_model(path) if kind == "mmap" else joblib.load(path)
+    loaded = time.perf_counter() - started
+    model.predict_proba(SAMPLE_TEXTS)
+    # Все процессы держат модель одновременно — так видно, что делится
+    barrier.wait()
+    after = memory_mb()
+    barrier.wait()
+    conn.send({
+        "load_seconds": loaded,
+        "rss_mb": after["rss"],
+        "model_rss_mb": after["rss"] - before["rss"] if after["rss"] and before["rss"] else None,
+        "private_mb": after["private"],
+        "pss_mb": after["pss"],
+    })
+
+
+def measure(kind: str, path: str, processes: int) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(processes)
+    pipes = []
+    workers = []
+    for _ in range(processes):
+        parent, child = ctx.Pipe(duplex=False)
+        process = ctx.Process(target=_child, args=(kind, path, barrier, child))
+        process.start()
+        child.close()
+        pipes.append(parent)
+        workers.append(process)
+    reports = [pipe.recv() for pipe in pipes]
+    for process in workers:
+        process.join()
+
+    def mean(key):
+        values = [r[key] for r in reports if r[key] is not None]
+        return sum(values) / len(values) if values else None
+
+    pss = [r["pss_mb"] for r in reports if r["pss_mb"] is not None]
+    return {
+        "load_ms": mean("load_seconds") * 1000,
+        "rss_mb": mean("rss_mb"),
+        "model_rss_mb": mean("model_rss_mb"),
+        "private_mb": mean("private_mb"),
+        "total_pss_mb": sum(pss) if pss else None,
+    }
+
+
+def _fmt(value) -> str:
+    return "-" if value is None else f"{value:.1f}"
+
+
+def main(argv=None):
+    from src.core.model_store import export_model
+
+    parser = argparse.ArgumentParser(description="Загрузка модели: pickle против mmap")
+    parser.add_argument("--model", help="Модель pickle (по умолчанию синтетическая)")
+    parser.add_argument("--vocab", type=int, default=200000, help="Размер словаря синтетической модели")
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model = args.model
+        if not model:
+            model = os.path.join(tmp, "synthetic.pkl")
+            make_synthetic_model(model, args.vocab)
+        export = os.path.join(tmp, "model.mmap")
+        export_model(model, export)
+        print(f"Модель: {model} ({os.path.getsize(model) / 2 ** 20:.1f} МБ), процессов: {args.processes}")
+
+        print(f"{'формат':<8} {'загрузка, мс':>13} {'RSS, МБ':>8} {'+модель, МБ':>12} "
+              f"{'Private, МБ':>12} {'ΣPSS, МБ':>9}")
+        for kind, path in (("pickle", model), ("mmap", export)):
+            report = measure(kind, path, args.processes)
+            print(f"{kind:<8} {report['load_ms']:>13.1f} {_fmt(report['rss_mb']):>8} "
+                  f"{_fmt(report['model_rss_mb']):>12} {_fmt(report['private_mb']):>12} "
+                  f"{_fmt(report['total_pss_mb']):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Сравнение профилей OCR (src.core.ocr.PROFILES) по времени и точности
+на размеченной выборке — корпусе benchmarks.corpus или любой папке
+с corpus.json того же вида (file, expected, text).
+
+Для каждого профиля замеряется время извлечения текста, время
+на страницу, сходство распознанного текста с эталоном и доля верно
+извлечённых реквизитов.
+
+Запуск из корня проекта:
+    python -m benchmarks.ocr_profiles --corpus bench_corpus --profiles raw fast standard accurate
+"""
+import os
+import re
+import json
+import time
+import argparse
+import difflib
+
+# Форматы, текст которых получается через OCR
+OCR_FORMATS = ("pdf_scan", "png", "tiff")
+FIELDS = ("sender", "recipient", "document_date", "document_number", "subject")
+
+
+def _normalize(value) -> str:
+    return re.sub(r"\s+", " ", str(value or "")).strip().lower()
+
+
+def text_similarity(recognized: str, reference: str) -> float:
+    """
+        Доля совпадающих символов (difflib) между распознанным текстом и эталоном
+        после нормализации пробелов и регистра.
+    """
+    return difflib.SequenceMatcher(None, _normalize(recognized), _normalize(reference), autojunk=False).ratio()
+
+
+def field_matches(fields: dict, expected: dict) -> int:
+    return sum(1 for name in FIELDS if expected.get(name) and _normalize(expected[name]) in _normalize(fields.get(name)))
+
+
+def bench_profile(profile: str, documents: list, corpus_folder: str) -> dict:
+    from src.core.ocr import configure
+    from src.core.text_extractor import extract_document
+    from src.core.nlp_extractor import extract_fields
+
+    configure(profile=profile)
+    seconds = 0.0
+    pages = 0
+    similarity = 0.0
+    matched = 0
+    expected_fields = 0
+    for entry in documents:
+        started = time.perf_counter()
+        document = extract_document(os.path.join(corpus_folder, entry["file"]))
+        seconds += time.perf_counter() - started
+
+        text = document["text"] if document else ""
+        pages += len(document["pages"]) if document else 0
+        if entry.get("text"):
+            similarity += text_similarity(text, entry["text"])
+        fields = extract_fields(text) if text.strip() else {}
+        matched += field_matches(fields, entry["expected"])
+        expected_fields += sum(1 for name in FIELDS if entry["expected"].get(name))
+
+    count = len(documents)
+    return {
+        "documents": count,
+        "pages": pages,
+        "seconds": round(seconds, 3),
+        "seconds_per_page": round(seconds / pages, 3) if pages else None,
+        "text_similarity": round(similarity / count, 4) if count else None,
+        "field_accuracy": round(matched / expected_fields, 4) if expected_fields else None,
+    }
+
+
+def _cell(value) -> str:
+    return "-" if value is None else str(value)
+
+
+def main(argv=None):
+    from src.core.ocr import PROFILES
+    from src.core.warmup import warm_up
+
+    parser = argparse.ArgumentParser(description="Время и точность профилей OCR")
+    parser.add_argument("--corpus", required=True, help="Папка с corpus.json")
+    parser.add_argument("--profiles", nargs="+", choices=sorted(PROFILES), default=sorted(PROFILES))
+    parser.add_argument("--formats", nargs="+", default=list(OCR_FORMATS))
+    parser.add_argument("--output", help="Куда сохранить результаты в JSON")
+    args = parser.parse_args(argv)
+
+    with open(os.path.join(args.corpus, "corpus.json"), encoding="utf-8") as f:
+        documents = [entry for entry in json.load(f)["documents"] if entry["format"] in args.formats]
+
+    warm_up()
+    results = {}
+    print(f"{'Профиль':<10} {'док.':>5} {'стр.':>5} {'время, с':>9} {'с/стр.':>7} {'текст':>7} {'реквизиты':>10}")
+    for profile in args.profiles:
+        report = bench_profile(profile, documents, args.corpus)
+        results[profile] = report
+        print(f"{profile:<10} {report['documents']:>5} {report['pages']:>5} {report['seconds']:>9} "
+              f"{_cell(report['seconds_per_page']):>7} {_cell(report['text_similarity']):>7} "
+              f"{_cell(report['field_accuracy']):>10}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"profiles": results, "settings": {name: PROFILES[name] for name in args.profiles}},
+                      f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
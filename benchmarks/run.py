@@ -0,0 +1,229 @@
+"""
+Бенчмарк пропускной способности по корпусу из benchmarks.corpus.
+
+Для каждого формата в отдельном процессе (чтобы пиковый RSS не смешивался)
+измеряются process_document целиком и каждый этап в изоляции:
+docs/sec, задержки p50/p95/p99 и пиковый RSS. Результат сохраняется в JSON;
+при --compare сравнивается с прошлым прогоном, регрессии выводятся
+и завершают процесс с кодом 1.
+
+Запуск из корня проекта:
+    python -m benchmarks.run --corpus bench_corpus --output bench.json
+    python -m benchmarks.run --corpus bench_corpus --output new.json --compare bench.json
+"""
+import os
+import sys
+import json
+import math
+import time
+import platform
+import argparse
+import multiprocessing
+
+from benchmarks.corpus import FORMATS
+
+BENCHMARKS = ("process_document", "extract", "nlp", "classify")
+DEFAULT_THRESHOLD = 0.10
+
+
+def percentile(values, q):
+    """
+        Перцентиль методом ближайшего ранга.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    # Наименьший ранг, на котором доля значений не меньше q процентов
+    rank = min(max(1, math.ceil(q / 100.0 * len(ordered))), len(ordered))
+    return ordered[rank - 1]
+
+
+def summarize(latencies) -> dict:
+    total = sum(latencies)
+    return {
+        "count": len(latencies),
+        "docs_per_sec": round(len(latencies) / total, 3) if total > 0 else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+    }
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+            return round(psutil.Process().memory_info().peak_wset / 2 ** 20, 1)
+        except (ImportError, AttributeError):
+            return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдаёт килобайты, macOS — байты
+    divisor = 2 ** 20 if sys.platform == "darwin" else 2 ** 10
+    return round(peak / divisor, 1)
+
+
+def _timed(func, arg):
+    started = time.perf_counter()
+    value = func(arg)
+    return value, time.perf_counter() - started
+
+
+def bench_format(paths: list, repeat: int = 1) -> dict:
+    """
+        Выполняется в дочернем процессе: замеры по файлам одного формата.
+    """
+    from src.core.warmup import warm_up
+    from src.core.processor import process_document
+    from src.core.text_extractor import extract_text
+    from src.core.nlp_extractor import extract_fields
+    from src.core.classifier import classify_document
+
+    started = time.perf_counter()
+    # Библиотеки и модели грузятся заранее, чтобы замерять установившийся режим
+    warm_up()
+    warmup_seconds = time.perf_counter() - started
+
+    latencies = {name: [] for name in BENCHMARKS}
+    errors = 0
+    for _ in range(repeat):
+        for path in paths:
+            result, seconds = _timed(process_document, path)
+            latencies["process_document"].append(seconds)
+            if "error" in result:
+                errors += 1
+
+            text, seconds = _timed(extract_text, path)
+            latencies["extract"].append(seconds)
+            if not text:
+                continue
+            _, seconds = _timed(extract_fields, text)
+            latencies["nlp"].append(seconds)
+            _, seconds = _timed(classify_document, text)
+            latencies["classify"].append(seconds)
+
+    return {
+        "documents": len(paths),
+        "errors": errors,
+        "warmup_seconds": round(warmup_seconds, 3),
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": {name: summarize(values) for name, values in latencies.items()},
+    }
+
+
+def _child(paths, repeat, conn):
+    try:
+        conn.send(bench_format(paths, repeat))
+    except Exception as e:
+        conn.send({"error": str(e)})
+    finally:
+        conn.close()
+
+
+def run_in_process(paths: list, repeat: int = 1) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    parent, child = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_child, args=(paths, repeat, child))
+    process.start()
+    child.close()
+    try:
+        report = parent.recv()
+    except EOFError:
+        report = {"error": f"процесс завершился с кодом {process.exitcode}"}
+    process.join()
+    return report
+
+
+def load_corpus(corpus_folder: str, formats) -> dict:
+    with open(os.path.join(corpus_folder, "corpus.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    by_format = {}
+    for entry in manifest["documents"]:
+        if entry["format"] in formats:
+            by_format.setdefault(entry["format"], []).append(os.path.join(corpus_folder, entry["file"]))
+    return by_format
+
+
+def compare(current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """
+        Регрессия — падение docs/sec или рост p95 и пикового RSS
+        больше чем на threshold относительно базового прогона.
+    """
+    regressions = []
+    for fmt, report in current["formats"].items():
+        base = baseline.get("formats", {}).get(fmt)
+        if not base or "error" in base or "error" in report:
+            continue
+
+        for stage, stats in report["stages"].items():
+            base_stats = base["stages"].get(stage)
+            if not base_stats:
+                continue
+            old, new = base_stats.get("docs_per_sec"), stats.get("docs_per_sec")
+            if old and new and new < old * (1 - threshold):
+                regressions.append(f"{fmt}/{stage}: docs/sec {old} -> {new}")
+            old, new = base_stats.get("p95_ms"), stats.get("p95_ms")
+            if old and new and new > old * (1 + threshold):
+                regressions.append(f"{fmt}/{stage}: p95 {old} ms -> {new} ms")
+
+        old, new = base.get("peak_rss_mb"), report.get("peak_rss_mb")
+        if old and new and new > old * (1 + threshold):
+            regressions.append(f"{fmt}: peak RSS {old} MB -> {new} MB")
+    return regressions
+
+
+def print_report(results: dict):
+    print(f"{'Формат':<10} {'Этап':<17} {'док/с':>9} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9} {'RSS, МБ':>8}")
+    for fmt, report in results["formats"].items():
+        if "error" in report:
+            print(f"{fmt:<10} ошибка: {report['error']}")
+            continue
+        for stage, stats in report["stages"].items():
+            print(f"{fmt:<10} {stage:<17} {stats['docs_per_sec'] or '-':>9} {stats['p50_ms'] or '-':>9} "
+                  f"{stats['p95_ms'] or '-':>9} {stats['p99_ms'] or '-':>9} {report['peak_rss_mb'] or '-':>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк пропускной способности textScanner")
+    parser.add_argument("--corpus", required=True, help="Папка корпуса (python -m benchmarks.corpus)")
+    parser.add_argument("--output", help="Куда сохранить результаты в JSON")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS))
+    parser.add_argument("--repeat", type=int, default=1, help="Сколько раз прогнать корпус")
+    parser.add_argument("--compare", help="JSON прошлого прогона для поиска регрессий")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Допустимое ухудшение, доля (по умолчанию 0.10)")
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus(args.corpus, args.formats)
+    results = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "formats": {},
+    }
+    for fmt in args.formats:
+        if fmt in corpus:
+            print(f"Формат {fmt}: {len(corpus[fmt])} документов...")
+            results["formats"][fmt] = run_in_process(corpus[fmt], args.repeat)
+
+    print_report(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("\nРегрессии:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nРегрессий не обнаружено")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,181 @@
+import time
+_STARTED = time.perf_counter()
+
+import sys
 import argparse
-from src.cli import process_folder
+import importlib
+import multiprocessing
+from src.cli import process_folder, watch
+from src.core.cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+from src.core.dedup import DEFAULT_INDEX_PATH, IMAGE_DISTANCE, TEXT_DISTANCE
+from src.core.pipeline import CLASSIFY_BATCH, BATCH_TIMEOUT
+from src.sinks import OUTPUT_FORMATS
+from src.traversal import parse_shard
+from src.core.ocr import PROFILES, PROFILE
+from src.core.processor import (
+    early_exit_options, EARLY_EXIT_FIELDS, EARLY_EXIT_PROB, EARLY_EXIT_FIRST_PAGES,
+)
+
+_IMPORTED = time.perf_counter()
+
+# Подкоманды: имя -> модуль с функцией main(argv)
+COMMANDS = {
+    "serve": "src.server",
+    "client": "src.client",
+    "merge": "src.merge",
+    "convert-model": "src.core.model_store",
+    "query": "src.store",
+}
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        importlib.import_module(COMMANDS[sys.argv[1]]).main(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser()
-    parser.add_argument("--input", required=True)
-    parser.add_argument("--output", required=True)
+    parser.add_argument("--input")
+    parser.add_argument("--output")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Число процессов-обработчиков (по умолчанию 1)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="Каталог кэша результатов")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="Предельный размер кэша, МБ")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Не использовать кэш результатов")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Обработать документы заново и обновить кэш")
+    parser.add_argument("--near-duplicates", action="store_true",
+                        help="Узнавать пересканированные документы (pHash страниц до OCR, "
+                             "SimHash текста перед NER) и брать их результат из индекса")
+    parser.add_argument("--near-duplicates-index", default=DEFAULT_INDEX_PATH,
+                        help="Файл индекса почти-дубликатов (SQLite)")
+    parser.add_argument("--image-distance", type=int, default=IMAGE_DISTANCE,
+                        help="Порог расстояния Хэмминга pHash страниц, бит из 64 (меньше 0 — слой отключён)")
+    parser.add_argument("--text-distance", type=int, default=TEXT_DISTANCE,
+                        help="Порог расстояния Хэмминга SimHash текста, бит из 64 (меньше 0 — слой отключён)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Обрабатывать только новые и изменённые файлы")
+    parser.add_argument("--watch", action="store_true",
+                        help="Следить за папкой и обрабатывать файлы по мере появления")
+    parser.add_argument("--debounce", type=float, default=2.0,
+                        help="Сколько секунд файл должен не меняться перед обработкой")
+    parser.add_argument("--recursive", action="store_true",
+                        help="Обходить подпапки; результаты повторяют дерево входной папки")
+    parser.add_argument("--include", nargs="+", default=None,
+                        help="Шаблоны glob: обрабатывать только подходящие файлы (путь или имя)")
+    parser.add_argument("--exclude", nargs="+", default=None,
+                        help="Шаблоны glob: пропускать подходящие файлы и подпапки")
+    parser.add_argument("--shard", type=parse_shard, default=None, metavar="i/N",
+                        help="Обработать только i-ю из N долей файлов (по хэшу пути); "
+                             "результаты долей объединяет команда merge")
+    parser.add_argument("--doc-timeout", type=float, default=None,
+                        help="Бюджет времени на документ, секунд: обработчик, превысивший его, "
+                             "убивается и перезапускается")
+    parser.add_argument("--doc-memory", type=float, default=None,
+                        help="Предельная память (RSS) процесса-обработчика, МБ")
+    parser.add_argument("--retries", type=int, default=1,
+                        help="Повторов документа после таймаута или падения, затем — карантин")
+    parser.add_argument("--retry-quarantined", action="store_true",
+                        help="Обработать и документы из карантина")
+    parser.add_argument("--resume", action="store_true",
+                        help="Продолжить прерванный запуск по журналу .journal.jsonl")
+    parser.add_argument("--ocr-threads", type=int, default=None,
+                        help="Потоков OCR на один документ")
+    parser.add_argument("--ocr-profile", choices=sorted(PROFILES), default=PROFILE,
+                        help="Профиль OCR: разрешение, режим сегментации, языки и предобработка")
+    parser.add_argument("--early-exit", action="store_true",
+                        help="Обрабатывать сначала первые страницы и продолжать, только если "
+                             "реквизиты не найдены или тип документа определён неуверенно")
+    parser.add_argument("--early-exit-fields", nargs="+", default=list(EARLY_EXIT_FIELDS),
+                        choices=["sender", "recipient", "document_date", "document_number", "subject"],
+                        help="Реквизиты, которые должны быть найдены для раннего выхода")
+    parser.add_argument("--early-exit-prob", type=float, default=EARLY_EXIT_PROB,
+                        help="Минимальная вероятность классификатора для раннего выхода")
+    parser.add_argument("--first-pages", type=int, default=EARLY_EXIT_FIRST_PAGES,
+                        help="Сколько страниц обрабатывать в первой порции")
+    parser.add_argument("--batch-size", type=int, default=8,
+                        help="Документов в микропакете для NER и классификации")
+    parser.add_argument("--engine", choices=["batch", "pipeline"], default="batch",
+                        help="batch — процесс проводит свой пакет через все этапы; pipeline — извлечение, "
+                             "NER и классификация работают одновременно, со своими очередями")
+    parser.add_argument("--classify-batch", type=int, default=CLASSIFY_BATCH,
+                        help="Наибольший пакет классификатора в движке pipeline")
+    parser.add_argument("--batch-timeout", type=float, default=BATCH_TIMEOUT,
+                        help="Сколько секунд этап pipeline ждёт пополнения неполного пакета")
+    parser.add_argument("--output-format", choices=OUTPUT_FORMATS, default="json",
+                        help="json — файл на документ, jsonl — общий поток JSON Lines, "
+                             "parquet — колоночный файл")
+    parser.add_argument("--compress", choices=["gzip"], default=None,
+                        help="Сжатие потока jsonl")
+    parser.add_argument("--row-group-size", type=int, default=10000,
+                        help="Строк в группе Parquet")
+    parser.add_argument("--store", action="store_true",
+                        help="Записывать результаты, текст и метаданные в базу SQLite results.sqlite "
+                             "в папке результатов (поиск — подкомандой query)")
+    parser.add_argument("--meta", action="store_true",
+                        help="Добавлять в результаты блок _meta: способ извлечения, страницы, время этапов")
+    parser.add_argument("--metrics-file", default=None,
+                        help="Записать гистограммы времени обработки в формате Prometheus")
+    parser.add_argument("--slowest", type=int, default=10,
+                        help="Сколько самых медленных документов показать (0 — не показывать)")
+    parser.add_argument("--profile-dir", default=None,
+                        help="Сохранить профили cProfile для самых медленных документов")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="Показать время импорта и загрузки каждого компонента")
     args = parser.parse_args()
 
-    process_folder(args.input, args.output)
+    if args.startup_profile:
+        from src.core.warmup import warm_up, print_profile
+        print_profile([("CLI (import)", _IMPORTED - _STARTED, None)] + warm_up())
+        if not args.input and not args.output:
+            return
+
+    if not args.input or not args.output:
+        parser.error("the following arguments are required: --input, --output")
+
+    options = dict(
+        workers=args.workers,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        cache_size=args.cache_size * 1024 * 1024,
+        refresh=args.refresh,
+        ocr_threads=args.ocr_threads,
+        ocr_profile=args.ocr_profile,
+        early_exit=early_exit_options(args.early_exit_fields, args.early_exit_prob, args.first_pages)
+        if args.early_exit else None,
+        batch_size=args.batch_size,
+        output_format=args.output_format,
+        compress=args.compress,
+        row_group_size=args.row_group_size,
+        include_meta=args.meta,
+        metrics_file=args.metrics_file,
+        slowest=args.slowest,
+        profile_dir=args.profile_dir,
+        recursive=args.recursive,
+        include=args.include,
+        exclude=args.exclude,
+        shard=args.shard,
+        doc_timeout=args.doc_timeout,
+        doc_memory=args.doc_memory,
+        retries=args.retries,
+        retry_quarantined=args.retry_quarantined,
+        near_duplicates_index=args.near_duplicates_index if args.near_duplicates else None,
+        image_distance=args.image_distance if args.image_distance >= 0 else None,
+        text_distance=args.text_distance if args.text_distance >= 0 else None,
+        engine=args.engine,
+        classify_batch=args.classify_batch,
+        batch_timeout=args.batch_timeout,
+        store=args.store,
+    )
+
+    if args.watch:
+        try:
+            watch(args.input, args.output, debounce=args.debounce, **options)
+        except KeyboardInterrupt:
+            pass
+    else:
+        process_folder(args.input, args.output, incremental=args.incremental, resume=args.resume, **options)
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
@@ -1,25 +1,31 @@
-from src.core.processor import process_document
+from src.core.processor import process_document, STAGES
 import sys
 import json
 import os
 import re
+import time
+import threading
 from src.core.bootstrap import setup_poppler
+from src.core.warmup import warm_up
+from src.core.text_extractor import is_supported
 
 try:
     from PyQt6.QtWidgets import (
         QApplication, QWidget, QPushButton, QLabel, QTextEdit,
-        QFileDialog, QHBoxLayout, QVBoxLayout, QGroupBox, QMessageBox
+        QFileDialog, QHBoxLayout, QVBoxLayout, QGroupBox, QMessageBox,
+        QTableWidget, QTableWidgetItem, QProgressBar, QHeaderView, QAbstractItemView
     )
     from PyQt6.QtGui import QSyntaxHighlighter, QTextCharFormat, QColor
-    from PyQt6.QtCore import Qt
+    from PyQt6.QtCore import Qt, QTimer, QObject, QRunnable, QThreadPool, pyqtSignal
     FROM_PYQT6 = True
 except Exception:
     from PyQt5.QtWidgets import (
         QApplication, QWidget, QPushButton, QLabel, QTextEdit,
-        QFileDialog, QHBoxLayout, QVBoxLayout, QGroupBox, QMessageBox
+        QFileDialog, QHBoxLayout, QVBoxLayout, QGroupBox, QMessageBox,
+        QTableWidget, QTableWidgetItem, QProgressBar, QHeaderView, QAbstractItemView
     )
     from PyQt5.QtGui import QSyntaxHighlighter, QTextCharFormat, QColor
-    from PyQt5.QtCore import Qt
+    from PyQt5.QtCore import Qt, QTimer, QObject, QRunnable, QThreadPool, pyqtSignal
     FROM_PYQT6 = False
 
 
@@ -96,14 +102,76 @@ class JsonHighlighter(QSyntaxHighlighter):
             self.setFormat(s, e - s, self.fmt_bracket)
 
 
+# ====== Фоновая обработка ======
+class TaskCancelled(Exception):
+    pass
+
+
+class TaskSignals(QObject):
+    started = pyqtSignal(int)                 # строка очереди
+    stage = pyqtSignal(int, str, float)       # строка, этап, секунды
+    finished = pyqtSignal(int, object)        # строка, результат
+    failed = pyqtSignal(int, str)             # строка, сообщение
+
+
+class DocumentTask(QRunnable):
+    """
+        Обработка одного документа в пуле потоков.
+        Отмена срабатывает до начала обработки или между этапами.
+    """
+
+    def __init__(self, row, file_path):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.row = row
+        self.file_path = file_path
+        self.cancelled = False
+        self.signals = TaskSignals()
+
+    def run(self):
+        if self.cancelled:
+            self.signals.failed.emit(self.row, "Отменено")
+            return
+        self.signals.started.emit(self.row)
+
+        def on_stage(stage, seconds):
+            self.signals.stage.emit(self.row, stage, seconds)
+            if self.cancelled:
+                raise TaskCancelled()
+
+        try:
+            result = process_document(self.file_path, on_stage=on_stage)
+        except TaskCancelled:
+            self.signals.failed.emit(self.row, "Отменено")
+        except Exception as e:
+            self.signals.failed.emit(self.row, f"Ошибка: {e}")
+        else:
+            self.signals.finished.emit(self.row, result)
+
+
 class DarkMockupUI(QWidget):
+    # Колонки очереди документов
+    COL_FILE, COL_STATUS, COL_PROGRESS = 0, 1, 2
+    STAGE_COLUMNS = {"extract": 3, "nlp": 4, "classify": 5}
+    COL_TOTAL = 6
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Система распознавание документов")
-        self.resize(1000, 600)
+        self.resize(1300, 700)
 
         self.loaded_file = None
 
+        # Очередь документов: строка таблицы -> путь, задача, результат, время старта
+        self.files = []
+        self.tasks = {}
+        self.results = {}
+        self.started_at = {}
+        # Документы обрабатываются в нескольких потоках: spaCy и PyMuPDF
+        # внутри под своими блокировками, OCR — движок на поток
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(1, min(4, (os.cpu_count() or 2) // 2)))
+
         # ====== ТЁМНАЯ ТЕМА ======
         self.setStyleSheet("""
             QWidget {
@@ -176,9 +244,12 @@ class DarkMockupUI(QWidget):
         """)
 
         # ====== ЛЕВАЯ ПАНЕЛЬ ======
-        self.btn_load = QPushButton("Загрузить файл")
+        self.btn_load = QPushButton("Загрузить файлы")
         self.btn_load.clicked.connect(self.load_file)
 
+        self.btn_load_folder = QPushButton("Загрузить папку")
+        self.btn_load_folder.clicked.connect(self.load_folder)
+
         self.label_formats = QLabel("PDF, DOC, DOCX, PNG, JPG, JSON")
         self.label_formats.setStyleSheet("color: #a0a0a0; font-size: 9pt;")
         self.label_formats.setAlignment(Qt.AlignmentFlag.AlignHCenter)
@@ -191,15 +262,41 @@ class DarkMockupUI(QWidget):
         self.btn_process.setObjectName("mainBtn")
         self.btn_process.clicked.connect(self.extract_data)
 
+        self.btn_cancel = QPushButton("Отменить")
+        self.btn_cancel.clicked.connect(self.cancel_processing)
+
+        self.queue_table = QTableWidget(0, 7)
+        self.queue_table.setHorizontalHeaderLabels(
+            ["Файл", "Статус", "Прогресс", "Текст, с", "NER, с", "Класс, с", "Всего, с"]
+        )
+        self.queue_table.setStyleSheet("font-size: 9pt;")
+        self.queue_table.verticalHeader().setVisible(False)
+        self.queue_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.queue_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.queue_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.queue_table.currentCellChanged.connect(self.show_row_result)
+
+        load_buttons = QHBoxLayout()
+        load_buttons.addWidget(self.btn_load)
+        load_buttons.addWidget(self.btn_load_folder)
+
+        process_buttons = QHBoxLayout()
+        process_buttons.addWidget(self.btn_process)
+        process_buttons.addWidget(self.btn_cancel)
+
         left_layout = QVBoxLayout()
         left_layout.setSpacing(8)
-        left_layout.addStretch(1)
-        left_layout.addWidget(self.btn_load)
+        left_layout.addSpacing(25)
+        left_layout.addLayout(load_buttons)
         left_layout.addWidget(self.label_formats)
         left_layout.addWidget(self.label_filename)
-        left_layout.addSpacing(12)
-        left_layout.addWidget(self.btn_process)
-        left_layout.addStretch(1)
+        left_layout.addWidget(self.queue_table, 1)
+        left_layout.addLayout(process_buttons)
+
+        # Обновление времени обработки выполняющихся документов
+        self.elapsed_timer = QTimer(self)
+        self.elapsed_timer.setInterval(200)
+        self.elapsed_timer.timeout.connect(self.update_elapsed)
 
         left_group = QGroupBox("Загрузка файлов")
         left_group.setObjectName("leftGroup")
@@ -237,52 +334,156 @@ class DarkMockupUI(QWidget):
         main = QHBoxLayout()
         main.setContentsMargins(16, 16, 16, 16)
         main.setSpacing(16)
-        main.addWidget(left_group, 1)
+        main.addWidget(left_group, 3)
         main.addWidget(right_group, 2)
         self.setLayout(main)
 
     # ====== ЛОГИКА ======
+    def warm_up_models(self):
+        """
+            Фоновая загрузка библиотек и моделей после появления окна,
+            чтобы первый документ не ждал их загрузки.
+        """
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
     def load_file(self):
-        path, _ = QFileDialog.getOpenFileName(
+        paths, _ = QFileDialog.getOpenFileNames(
             self,
-            "Загрузить файл",
+            "Загрузить файлы",
             "",
-            "Документы, сканы и JSON (*.pdf *.doc *.docx *.png *.jpg *.jpeg *.json)"
+            "Документы, сканы и JSON (*.pdf *.doc *.docx *.png *.jpg *.jpeg *.tiff *.bmp *.json)"
         )
-        if path:
+        if not paths:
+            return
+
+        if len(paths) == 1 and paths[0].lower().endswith(".json"):
+            path = paths[0]
             self.loaded_file = path
             self.label_filename.setText(os.path.basename(path))
-
-            if path.lower().endswith(".json"):
-                try:
-                    with open(path, "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                    self.json_output.setText(json.dumps(data, ensure_ascii=False, indent=4))
-                except Exception as e:
-                    self.show_error(f"Ошибка JSON:\n{e}")
-                    self.json_output.clear()
-            else:
-                # Если выбран не JSON — очищаем поле
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self.json_output.setText(json.dumps(data, ensure_ascii=False, indent=4))
+            except Exception as e:
+                self.show_error(f"Ошибка JSON:\n{e}")
                 self.json_output.clear()
+            return
+
+        self.add_files([p for p in paths if not p.lower().endswith(".json")])
+
+    def load_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Загрузить папку")
+        if folder:
+            self.add_files([
+                os.path.join(folder, name)
+                for name in sorted(os.listdir(folder)) if is_supported(name)
+            ])
+
+    def add_files(self, paths):
+        for path in paths:
+            row = self.queue_table.rowCount()
+            self.queue_table.insertRow(row)
+            self.files.append(path)
+            self.set_cell(row, self.COL_FILE, os.path.basename(path))
+            self.set_cell(row, self.COL_STATUS, "В очереди")
+
+            progress = QProgressBar()
+            progress.setRange(0, len(STAGES))
+            progress.setValue(0)
+            progress.setTextVisible(False)
+            progress.setMaximumHeight(14)
+            self.queue_table.setCellWidget(row, self.COL_PROGRESS, progress)
+
+        if paths:
+            self.loaded_file = paths[-1]
+            self.label_filename.setText(f"Файлов в очереди: {len(self.files)}")
+            # Если выбран не JSON — очищаем поле
+            self.json_output.clear()
+
+    def set_cell(self, row, column, text):
+        self.queue_table.setItem(row, column, QTableWidgetItem(text))
 
     def extract_data(self):
-        if not self.loaded_file:
+        rows = [
+            row for row in range(len(self.files))
+            if row not in self.tasks and row not in self.results
+        ]
+        if not rows:
             self.show_error("Файл не выбран")
             return
 
-        try:
-            result = process_document(self.loaded_file)
+        for row in rows:
+            task = DocumentTask(row, self.files[row])
+            task.signals.started.connect(self.on_task_started)
+            task.signals.stage.connect(self.on_task_stage)
+            task.signals.finished.connect(self.on_task_finished)
+            task.signals.failed.connect(self.on_task_failed)
+            self.tasks[row] = task
+            self.pool.start(task)
+
+        self.elapsed_timer.start()
+
+    def cancel_processing(self):
+        # Ещё не начатые задачи убираются из пула, выполняющиеся
+        # останавливаются на границе этапов
+        self.pool.clear()
+        for row, task in list(self.tasks.items()):
+            task.cancelled = True
+            if row not in self.started_at:
+                self.on_task_failed(row, "Отменено")
+
+    def on_task_started(self, row):
+        # Сигнал задачи, снятой отменой до его доставки, не учитывается:
+        # иначе строка навсегда осталась бы в started_at
+        task = self.tasks.get(row)
+        if task is None or task.cancelled:
+            return
+        self.started_at[row] = time.perf_counter()
+        self.set_cell(row, self.COL_STATUS, "Обработка")
 
-            if "error" in result:
-                self.show_error(result["error"])
-                return
+    def on_task_stage(self, row, stage, seconds):
+        self.set_cell(row, self.STAGE_COLUMNS[stage], f"{seconds:.2f}")
+        self.queue_table.cellWidget(row, self.COL_PROGRESS).setValue(STAGES.index(stage) + 1)
 
-            self.json_output.setText(
-                json.dumps(result, ensure_ascii=False, indent=4)
-            )
+    def on_task_finished(self, row, result):
+        if row not in self.tasks:
+            return
+        self.finish_task(row)
+        self.results[row] = result
+        self.set_cell(row, self.COL_STATUS, result["error"] if "error" in result else "Готово")
+        self.queue_table.cellWidget(row, self.COL_PROGRESS).setValue(len(STAGES))
 
-        except Exception as e:
-            self.show_error(f"Ошибка обработки:\n{e}")
+        current = self.queue_table.currentRow()
+        if current < 0 or current == row:
+            self.show_result(result)
+
+    def on_task_failed(self, row, message):
+        if row not in self.tasks:
+            return
+        self.finish_task(row)
+        self.set_cell(row, self.COL_STATUS, message)
+
+    def finish_task(self, row):
+        self.tasks.pop(row, None)
+        started = self.started_at.pop(row, None)
+        if started is not None:
+            self.set_cell(row, self.COL_TOTAL, f"{time.perf_counter() - started:.2f}")
+        if not self.tasks:
+            self.elapsed_timer.stop()
+
+    def update_elapsed(self):
+        now = time.perf_counter()
+        for row, started in self.started_at.items():
+            self.set_cell(row, self.COL_TOTAL, f"{now - started:.1f}")
+
+    def show_row_result(self, row, *_):
+        if row in self.results:
+            self.show_result(self.results[row])
+
+    def show_result(self, result):
+        self.json_output.setText(
+            json.dumps(result, ensure_ascii=False, indent=4)
+        )
 
     def copy_output(self):
         QApplication.clipboard().setText(self.json_output.toPlainText())
@@ -312,6 +513,7 @@ def main():
     app = QApplication(sys.argv)
     gui = DarkMockupUI()
     gui.show()
+    QTimer.singleShot(0, gui.warm_up_models)
     if FROM_PYQT6:
         sys.exit(app.exec())
     else:
@@ -1,30 +1,520 @@
 import os
-import json
-from src.core.processor import process_document
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from src.core.processor import process_documents
+from src.core.cache import ResultCache, pipeline_version
+from src.core.dedup import NearDuplicateIndex, IMAGE_DISTANCE, TEXT_DISTANCE
+from src.core.pipeline import Pipeline, print_report, CLASSIFY_BATCH, BATCH_TIMEOUT
+from src.core.ocr import configure as configure_ocr
+from src.core.text_extractor import is_supported
+from src.core.warmup import warm_models
+from src.incremental import (
+    Manifest, manifest_name, Journal, journal_name, quarantine_name, QUARANTINE_NAME,
+)
+from src.traversal import iter_files, file_filter, shard_name, in_excluded_dir
+from src.watch import watch_folder
+from src.sinks import open_sink
+from src.store import ResultStore, store_name
+from src.metrics import BatchMetrics, print_slowest, profile_documents
+from src.supervisor import Supervisor, Task
 
+# Относительная стоимость обработки одной страницы / одного мегабайта.
+# Сканы (OCR) на порядки дороже текстового слоя и DOCX.
+_OCR_PAGE_COST = 50.0
+_TEXT_PAGE_COST = 1.0
+_IMAGE_COST = 50.0
+_DOCX_MB_COST = 2.0
 
-def process_folder(input_folder: str, output_folder: str):
+
+def estimate_cost(file_path: str) -> float:
+    """
+        Грубая оценка трудоёмкости файла для планировщика.
+        Самые дорогие файлы (большие и сканированные PDF, изображения)
+        отправляются в обработку первыми.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    size_mb = os.path.getsize(file_path) / (1024 * 1024)
+
+    if ext == '.pdf':
+        try:
+            import fitz
+            with fitz.open(file_path) as doc:
+                pages = doc.page_count
+                scanned = pages > 0 and not doc[0].get_text().strip()
+            return pages * (_OCR_PAGE_COST if scanned else _TEXT_PAGE_COST) + size_mb
+        except Exception:
+            return _OCR_PAGE_COST * max(size_mb, 1.0)
+    if ext == '.docx':
+        return _DOCX_MB_COST * size_mb
+    if ext == '.zip':
+        # Состав архива заранее неизвестен — считаем его сканами
+        return _IMAGE_COST * max(size_mb, 1.0)
+    return _IMAGE_COST + size_mb
+
+
+_cache = None
+_early_exit = None
+_near_duplicates = None
+_with_text = False
+
+
+def _init_worker(cache_options=None, ocr_threads=None, ocr_profile=None, early_exit=None,
+                 near_duplicates_options=None, with_text=False, warm=False):
+    """
+        Инициализация процесса-обработчика: модели spaCy и классификатора
+        загружаются один раз на процесс, а не на каждый документ.
+    """
+    global _cache, _early_exit, _near_duplicates, _with_text
+
+    configure_ocr(threads=ocr_threads, profile=ocr_profile)
+    _cache = ResultCache(**cache_options) if cache_options else None
+    _early_exit = early_exit
+    _near_duplicates = NearDuplicateIndex(**near_duplicates_options) if near_duplicates_options else None
+    _with_text = with_text
+
+    if warm:
+        for name, _, error in warm_models():
+            if error:
+                print(f"Не удалось загрузить {name}: {error}")
+
+
+class WorkerPool:
+    """
+        Процессы-обработчики, переживающие несколько вызовов process_folder
+        (режим наблюдения): модели загружаются один раз, а не на каждую
+        порцию новых файлов. Пул пересоздаётся, если изменились параметры
+        процессов или пул сломан (процесс-обработчик погиб).
+    """
+
+    def __init__(self):
+        self._pool = None
+        self._args = None
+        self._local = None
+
+    def get(self, workers: int, init_args: tuple) -> ProcessPoolExecutor:
+        if self._pool is not None and self._args != (workers, init_args):
+            self.close()
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                             initargs=init_args + (True,))
+            self._args = (workers, init_args)
+        return self._pool
+
+    def init_local(self, init_args: tuple):
+        """
+            Инициализация обработки в текущем процессе (workers=1) — тоже
+            один раз на одинаковые параметры.
+        """
+        if self._local != init_args:
+            _init_worker(*init_args)
+            self._local = init_args
+
+    def discard(self, pool: ProcessPoolExecutor = None):
+        # Сломанный пул закрывается без ожидания, следующий вызов создаст новый.
+        # pool — сломанный пул: если его уже заменили, ничего не делается.
+        if self._pool is not None and (pool is None or pool is self._pool):
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self._args = None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            self._args = None
+
+
+def _process_documents(file_paths: list) -> list:
+    return process_documents(file_paths, cache=_cache, with_meta=True, early_exit=_early_exit,
+                             near_duplicates=_near_duplicates, with_text=_with_text)
+
+
+def _process_batch(file_paths: list):
+    start = time.perf_counter()
+    hits = _cache.hits if _cache is not None else 0
+    try:
+        results = _process_documents(file_paths)
+    except Exception as e:
+        if len(file_paths) == 1:
+            results = [{"error": f"Ошибка обработки: {e}"}]
+        else:
+            # Сбой пакетного этапа: документы повторяются по одному,
+            # ошибку получает только тот, на котором она возникла
+            logging.error(f"Batch processing failed, retrying documents one by one: {e}")
+            results = []
+            for file_path in file_paths:
+                try:
+                    results.extend(_process_documents([file_path]))
+                except Exception as e:
+                    results.append({"error": f"Ошибка обработки: {e}"})
+    cache_hits = _cache.hits - hits if _cache is not None else 0
+    return results, os.getpid(), time.perf_counter() - start, cache_hits
+
+
+def _collect_files(input_folder: str, accept, recursive: bool = False, exclude=None) -> list:
+    return [path for path in iter_files(input_folder, recursive=recursive, exclude=exclude) if accept(path)]
+
+
+def _print_summary(stats: dict, wall: float, cache_used: bool = False, reused: dict = None):
+    total = sum(s["docs"] for s in stats.values())
+    print(f"Обработано документов: {total} за {wall:.2f} с "
+          f"({total / wall if wall else 0.0:.2f} док/с)")
+    if cache_used:
+        hits = sum(s["cache_hits"] for s in stats.values())
+        print(f"Кэш: попаданий {hits}, промахов {total - hits}")
+    if reused is not None:
+        print(f"Почти-дубликаты: по изображению {reused.get('image', 0)}, по тексту {reused.get('text', 0)}")
+    for n, (pid, s) in enumerate(sorted(stats.items()), start=1):
+        rate = s["docs"] / s["busy"] if s["busy"] else 0.0
+        print(f"  Процесс {n} (pid {pid}): {s['docs']} док., "
+              f"занят {s['busy']:.2f} с, {rate:.2f} док/с")
+
+
+def process_folder(input_folder: str, output_folder: str, workers: int = 1,
+                   cache_dir: str = None, cache_size: int = None, refresh: bool = False,
+                   incremental: bool = False, files: list = None, ocr_threads: int = None,
+                   batch_size: int = 8, output_format: str = "json", compress: str = None,
+                   row_group_size: int = 10000, include_meta: bool = False,
+                   metrics_file: str = None, slowest: int = 10, profile_dir: str = None,
+                   ocr_profile: str = None, early_exit: dict = None, recursive: bool = False,
+                   include: list = None, exclude: list = None, shard: tuple = None,
+                   doc_timeout: float = None, doc_memory: float = None, retries: int = 1,
+                   resume: bool = False, retry_quarantined: bool = False,
+                   near_duplicates_index: str = None, image_distance: int = IMAGE_DISTANCE,
+                   text_distance: int = TEXT_DISTANCE, engine: str = "batch",
+                   classify_batch: int = CLASSIFY_BATCH, batch_timeout: float = BATCH_TIMEOUT,
+                   store: bool = False, worker_pool: WorkerPool = None):
+    """
+        Обработка всех документов папки.
+        Файлы задаются путями относительно input_folder; результаты
+        формата json повторяют дерево входной папки.
+        cache_dir — каталог кэша результатов (None — без кэша),
+        cache_size — предельный размер кэша в байтах,
+        refresh — пересчитать документы, перезаписав записи кэша,
+        incremental — обрабатывать только новые и изменённые файлы (по манифесту),
+        files — явный список относительных путей вместо содержимого папки,
+        ocr_threads — потоков OCR на документ (по умолчанию ядра делятся между процессами),
+        batch_size — документов в микропакете для NER и классификации,
+        output_format — "json" (файл на документ), "jsonl" или "parquet" (общий поток),
+        compress — "gzip" для jsonl,
+        row_group_size — строк в группе Parquet,
+        include_meta — сохранять в результатах блок "_meta" (способ извлечения,
+        страницы, время этапов),
+        metrics_file — файл для гистограмм в текстовом формате Prometheus,
+        slowest — сколько самых медленных документов показать в отчёте,
+        profile_dir — повторно обработать их под cProfile и сохранить профили сюда,
+        ocr_profile — профиль OCR из src.core.ocr.PROFILES,
+        early_exit — параметры режима раннего выхода (early_exit_options()):
+        страницы после первых обрабатываются, только если не найдены
+        нужные реквизиты или тип документа определён неуверенно,
+        recursive — обходить подпапки,
+        include, exclude — шаблоны glob для относительного пути или имени файла
+        (exclude отсекает и подпапки),
+        shard — (i, N): обрабатывать только i-ю из N долей файлов (по хэшу пути);
+        манифест и потоковые файлы результатов получают метку доли,
+        их объединяет команда merge,
+        doc_timeout — бюджет времени на документ, секунд, doc_memory — предельный
+        RSS процесса-обработчика, МБ: документы обрабатываются в процессах
+        под надзором (src.supervisor), зависший или раздувшийся процесс
+        убивается, документ повторяется до retries раз, затем попадает
+        в карантин (.quarantine.jsonl) и в следующих запусках пропускается,
+        пока не задан retry_quarantined,
+        resume — продолжить прерванный запуск: пропустить документы,
+        которые журнал (.journal.jsonl) отмечает как обработанные;
+        журнал ведётся только с resume или под надзором (doc_timeout,
+        doc_memory), для parquet — фиксируется лишь при закрытии файла,
+        near_duplicates_index — файл индекса почти-дубликатов (None — без него):
+        пересканированный документ получает результат ранее обработанного,
+        если pHash страниц отличается не больше чем на image_distance бит
+        (проверяется до OCR) или SimHash текста — не больше чем на
+        text_distance бит (перед NER); None в пороге отключает слой.
+        В результате указывается, откуда он взят (поле "reused_from"),
+        engine — "batch": каждый процесс проводит свой пакет через все этапы;
+        "pipeline": этапы работают одновременно (src.core.pipeline) —
+        workers процессов извлечения, NER пакетами до batch_size и
+        классификация пакетами до classify_batch, неполный пакет ждёт
+        пополнения не дольше batch_timeout секунд; в конце печатается
+        загрузка этапов. Режимы раннего выхода и надзора (doc_timeout,
+        doc_memory) работают в движке batch,
+        store — дополнительно записывать результаты, извлечённый текст
+        и метаданные обработки в базу SQLite results.sqlite в папке
+        результатов (src.store; поиск — подкомандой query),
+        worker_pool — процессы-обработчики движка batch, общие для
+        нескольких вызовов (WorkerPool); по умолчанию пул создаётся
+        на вызов и закрывается по его окончании.
+    """
     os.makedirs(output_folder, exist_ok=True)
+    # Профиль входит в версию конвейера, поэтому задаётся до её вычисления
+    configure_ocr(profile=ocr_profile)
+
+    cache_options = None
+    if cache_dir:
+        cache_options = {"cache_dir": cache_dir, "refresh": refresh}
+        if cache_size:
+            cache_options["max_bytes"] = cache_size
+
+    near_duplicates_options = None
+    if near_duplicates_index:
+        near_duplicates_options = {"path": near_duplicates_index, "image_distance": image_distance,
+                                   "text_distance": text_distance, "refresh": refresh}
+
+    label = shard_name(shard) if shard else None
+    accept = file_filter(is_supported, include=include, exclude=exclude, shard=shard)
+    if files is None:
+        files = _collect_files(input_folder, accept, recursive=recursive, exclude=exclude)
+    else:
+        files = [f for f in files if accept(f)]
+    if shard:
+        print(f"Доля {shard[0]}/{shard[1]}: файлов {len(files)}")
+
+    manifest = None
+    if incremental:
+        manifest = Manifest(output_folder, name=manifest_name(label))
+        changed = []
+        for filename in files:
+            try:
+                if manifest.needs_processing(filename, os.path.join(input_folder, filename)):
+                    changed.append(filename)
+            except OSError as e:
+                print(f"Пропущен файл {filename}: {e}")
+        print(f"Новых или изменённых файлов: {len(changed)} из {len(files)}")
+        files = changed
+
+    # Журнал ведётся с --resume и под надзором (там сбои ожидаемы): по нему
+    # следующий запуск с --resume продолжает прерванный. Без журнала пакеты
+    # не платят за контрольные точки результатов и fsync журнала.
+    journaled = resume or bool(doc_timeout or doc_memory)
+    journal = Journal(output_folder, name=journal_name(label), resume=resume)
+    if resume:
+        remaining = [f for f in files if journal.status(f) is None]
+        print(f"Продолжение по журналу: уже обработано {len(files) - len(remaining)}, осталось {len(remaining)}")
+        files = remaining
+
+    quarantine = Journal(output_folder, name=quarantine_name(label), fallback=QUARANTINE_NAME)
+    if not retry_quarantined:
+        skipped = [f for f in files if f in quarantine.entries]
+        if skipped:
+            print(f"Пропущено файлов в карантине: {len(skipped)} (см. {quarantine.path})")
+            files = [f for f in files if f not in quarantine.entries]
+
+    # Порядок обхода определяет, какой файл «побеждает» при совпадении
+    # имён (a.pdf и a.docx -> a.json) — как при последовательной обработке.
+    order = {filename: i for i, filename in enumerate(files)}
+    written = {}
+    stats = {}
+    started = time.perf_counter()
+
+    sink = open_sink(output_format, output_folder, compress=compress, row_group_size=row_group_size,
+                     label=label)
+    results_store = ResultStore(os.path.join(output_folder, store_name(label))) if store else None
+    metrics = BatchMetrics(slowest=slowest)
+    # Версия конвейера (хэш модели, tesseract --version) записывается только
+    # потоковыми форматами и базой результатов — файлам JSON она не нужна
+    version = pipeline_version() if not sink.per_file or results_store is not None else None
+
+    def handle(filenames, results, pid, elapsed, cache_hits):
+        s = stats.setdefault(pid, {"docs": 0, "busy": 0.0, "cache_hits": 0})
+        s["docs"] += len(filenames)
+        s["busy"] += elapsed
+        s["cache_hits"] += cache_hits
+
+        meta = {
+            "elapsed_seconds": round(elapsed / len(filenames), 6),
+            "worker_pid": pid,
+            "pipeline_version": version,
+        }
+        for filename, result in zip(filenames, results):
+            source = os.path.join(input_folder, filename)
+            metrics.observe(source, result)
+            if "reused_from" in result:
+                match = result["reused_from"]["match"]
+                reused[match] = reused.get(match, 0) + 1
+            if journaled:
+                journal.record(filename, "done")
+            if results_store is not None:
+                results_store.write(filename, source, result, meta)
+            if not include_meta:
+                result.pop("_meta", None)
+
+            if sink.per_file:
+                output_file = sink.output_path(filename)
+                if written.get(output_file, -1) > order[filename]:
+                    continue
+                written[output_file] = order[filename]
+
+            output_file = sink.write(filename, source, result, meta)
+            if sink.per_file:
+                print(f"Сохранено: {output_file}")
+
+            if manifest is not None:
+                manifest.record(filename, source)
+
+        stored = results_store is None or results_store.checkpoint()
+        # Журнал не должен опережать результаты: запись — только после
+        # того, как результаты пакета надёжно в файлах
+        if journaled and sink.checkpoint() and stored:
+            journal.commit()
+
+    quarantined = []
+    reused = {}
+
+    def on_quarantine(filename, reason, attempts):
+        quarantined.append(filename)
+        quarantine.record(filename, "quarantined", reason=reason, attempts=attempts,
+                          at=time.strftime("%Y-%m-%dT%H:%M:%S%z"))
+        quarantine.commit()
+        journal.record(filename, "quarantined", reason=reason)
+
+    if not ocr_threads:
+        ocr_threads = max(1, (os.cpu_count() or 1) // max(1, workers))
+
+    init_args = (cache_options, ocr_threads, ocr_profile, early_exit, near_duplicates_options, store)
+    pipeline = None
+    if engine == "pipeline" and (early_exit or doc_timeout or doc_memory):
+        print("Конвейер не поддерживает ранний выход и надзор за документами, используется движок batch")
+    try:
+        if doc_timeout or doc_memory:
+            supervisor = Supervisor(workers, init_args, timeout=doc_timeout, memory_mb=doc_memory, retries=retries)
+            tasks = [Task(batch, [os.path.join(input_folder, f) for f in batch])
+                     for batch in _batches(_cost_order(input_folder, files), batch_size)]
+            supervisor.run(tasks, handle, on_quarantine)
+        elif engine == "pipeline" and not early_exit:
+            pipeline = Pipeline(extract_workers=workers, nlp_batch=batch_size, classify_batch=classify_batch,
+                                batch_timeout=batch_timeout, cache_options=cache_options,
+                                ocr_threads=ocr_threads, ocr_profile=ocr_profile,
+                                near_duplicates_options=near_duplicates_options, with_text=store)
+            _run_pipeline(pipeline, input_folder, files, handle)
+        else:
+            _run(input_folder, files, workers, batch_size, init_args, handle, worker_pool=worker_pool)
+    finally:
+        # Сначала сбрасываются результаты, затем журнал и манифест: в них
+        # не должны попасть документы, чьи результаты не записаны
+        sink.close()
+        if results_store is not None:
+            results_store.close()
+        journal.close()
+        quarantine.close()
+        if manifest is not None:
+            manifest.save()
+
+    if not sink.per_file:
+        print(f"Результаты записаны в {sink.path}")
+    if results_store is not None:
+        print(f"База результатов: {results_store.path}")
+
+    _print_summary(stats, time.perf_counter() - started, cache_used=bool(cache_options),
+                   reused=reused if near_duplicates_options else None)
+    if pipeline is not None:
+        print_report(pipeline.report(), pipeline.wall)
+    if quarantined:
+        print(f"В карантин помещено документов: {len(quarantined)} (см. {quarantine.path})")
+
+    slow = metrics.slowest()
+    print_slowest(slow)
+    if metrics_file:
+        metrics.write(metrics_file)
+        print(f"Метрики записаны в {metrics_file}")
+    if profile_dir and slow:
+        profile_documents([source for _, source, _ in slow], profile_dir, early_exit=early_exit)
+
+
+def _batches(files: list, batch_size: int):
+    batch_size = max(1, batch_size)
+    for i in range(0, len(files), batch_size):
+        yield files[i:i + batch_size]
+
+
+def _cost_order(input_folder: str, files: list) -> list:
+    costs = {}
+    for filename in files:
+        try:
+            costs[filename] = estimate_cost(os.path.join(input_folder, filename))
+        except OSError:
+            costs[filename] = 0.0
+    return sorted(files, key=lambda name: costs[name], reverse=True)
+
+
+def _run(input_folder: str, files: list, workers: int, batch_size: int, init_args: tuple, handle,
+         worker_pool: WorkerPool = None):
+    owned = worker_pool is None
+    if owned:
+        worker_pool = WorkerPool()
+
+    if workers <= 1:
+        worker_pool.init_local(init_args)
+        for batch in _batches(files, batch_size):
+            for filename in batch:
+                print(f"Обрабатываю файл: {filename}")
+            handle(batch, *_process_batch([os.path.join(input_folder, f) for f in batch]))
+        return
+
+    queue = _cost_order(input_folder, files)
+    pool = worker_pool.get(workers, init_args)
+    broken = False
+    try:
+        futures = {}
+        # Пакеты собираются из соседних по стоимости файлов
+        for batch in _batches(queue, batch_size):
+            for filename in batch:
+                print(f"Обрабатываю файл: {filename}")
+            paths = [os.path.join(input_folder, f) for f in batch]
+            futures[pool.submit(_process_batch, paths)] = batch
+
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                handle(batch, *future.result())
+            except BrokenProcessPool as e:
+                broken = True
+                print(f"Ошибка обработки {', '.join(batch)}: {e}")
+            except Exception as e:
+                print(f"Ошибка обработки {', '.join(batch)}: {e}")
+    except BrokenProcessPool:
+        broken = True
+        raise
+    finally:
+        if broken:
+            worker_pool.discard()
+        elif owned:
+            worker_pool.close()
 
-    for filename in os.listdir(input_folder):
-        file_path = os.path.join(input_folder, filename)
 
-        if not filename.lower().endswith(
-            ('.docx', '.pdf', '.jpeg', '.jpg', '.png', '.tiff', '.bmp')
-        ):
-            continue
+def _run_pipeline(pipeline: Pipeline, input_folder: str, files: list, handle):
+    def jobs():
+        for filename in _cost_order(input_folder, files):
+            print(f"Обрабатываю файл: {filename}")
+            yield filename, os.path.join(input_folder, filename)
 
-        print(f"Обрабатываю файл: {filename}")
+    for filename, result in pipeline.run(jobs()):
+        meta = result.get("_meta") or {}
+        # Этапы NER и классификации идут в основном процессе
+        handle([filename], [result], os.getpid(), meta.get("seconds", 0.0), 1 if meta.get("cached") else 0)
 
-        result = process_document(file_path)
 
-        output_file = os.path.join(
-            output_folder,
-            f"{os.path.splitext(filename)[0]}.json"
-        )
+def watch(input_folder: str, output_folder: str, debounce: float = 2.0, **options):
+    """
+        Режим наблюдения: сначала обрабатываются новые и изменённые файлы папки,
+        затем — файлы по мере их появления (после стабилизации на debounce секунд).
+        Процессы-обработчики создаются один раз на всё время наблюдения.
+        С recursive=True отслеживаются и подпапки, включая новые.
+    """
+    worker_pool = WorkerPool()
 
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(result, f, ensure_ascii=False, indent=4)
+    def on_start():
+        process_folder(input_folder, output_folder, incremental=True, worker_pool=worker_pool, **options)
+        print(f"Ожидание новых файлов в {input_folder}...")
 
-        print(f"Сохранено: {output_file}")
+    def on_ready(names):
+        names = [name for name in names if not in_excluded_dir(name, options.get("exclude"))]
+        if not names:
+            return
+        process_folder(input_folder, output_folder, incremental=True, files=names, worker_pool=worker_pool,
+                       **options)
 
+    try:
+        watch_folder(input_folder, on_ready, accept=is_supported, debounce=debounce, on_start=on_start,
+                     recursive=options.get("recursive", False))
+    finally:
+        worker_pool.close()
@@ -0,0 +1,108 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import http.client
+from urllib.parse import urlparse, quote
+
+from src.server import DEFAULT_HOST, DEFAULT_PORT
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class Client:
+    """
+        Тонкий клиент локального сервиса обработки документов.
+        При ответе 503 (очередь заполнена) запрос повторяется после Retry-After.
+    """
+
+    def __init__(self, url=None, socket_path=None, timeout=600.0, retries=30):
+        self.socket_path = socket_path
+        url = urlparse(url or f"http://{DEFAULT_HOST}:{DEFAULT_PORT}")
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.timeout = timeout
+        self.retries = retries
+
+    def _connection(self):
+        if self.socket_path:
+            return UnixHTTPConnection(self.socket_path, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _request(self, method, path, body=None, headers=None):
+        for _ in range(self.retries + 1):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                response = conn.getresponse()
+                data = response.read()
+                if response.status != 503:
+                    return response.status, data
+                delay = float(response.getheader("Retry-After") or 1)
+            finally:
+                conn.close()
+            time.sleep(delay)
+        return response.status, data
+
+    def process_path(self, path: str) -> dict:
+        body = json.dumps({"path": os.path.abspath(path)}).encode("utf-8")
+        _, data = self._request("POST", "/process", body, {"Content-Type": "application/json"})
+        return json.loads(data)
+
+    def process_bytes(self, data: bytes, filename: str = None) -> dict:
+        headers = {"Content-Type": "application/octet-stream"}
+        if filename:
+            headers["X-Filename"] = quote(filename)
+        _, data = self._request("POST", "/process", data, headers)
+        return json.loads(data)
+
+    def health(self) -> dict:
+        _, data = self._request("GET", "/health")
+        return json.loads(data)
+
+    def metrics(self) -> str:
+        _, data = self._request("GET", "/metrics")
+        return data.decode("utf-8")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="main_cli.py client",
+                                     description="Отправка документов в локальный сервис")
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--url", default=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}")
+    parser.add_argument("--socket", help="Путь к Unix-сокету сервиса")
+    parser.add_argument("--send-bytes", action="store_true",
+                        help="Передавать содержимое файла, а не путь (сервис на другой машине/в контейнере)")
+    parser.add_argument("--health", action="store_true")
+    parser.add_argument("--metrics", action="store_true")
+    args = parser.parse_args(argv)
+
+    client = Client(args.url, args.socket)
+
+    if args.health:
+        print(json.dumps(client.health(), ensure_ascii=False, indent=4))
+    if args.metrics:
+        sys.stdout.write(client.metrics())
+
+    for path in args.files:
+        start = time.perf_counter()
+        if args.send_bytes:
+            with open(path, "rb") as f:
+                result = client.process_bytes(f.read(), os.path.basename(path))
+        else:
+            result = client.process_path(path)
+        elapsed = time.perf_counter() - start
+        print(json.dumps({"file": path, "latency_ms": round(elapsed * 1000, 1), "result": result},
+                         ensure_ascii=False, indent=4))
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import logging
+import os
+from functools import lru_cache
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "textscanner")
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+_CHUNK = 1024 * 1024
+
+
+def file_hash(file_path) -> str:
+    from src.core.text_extractor import InMemoryFile
+
+    if isinstance(file_path, InMemoryFile):
+        return hashlib.sha256(file_path.data).hexdigest()
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@lru_cache(maxsize=1)
+def pipeline_version() -> str:
+    """
+        Версия конвейера обработки: хэш модели классификатора, модель spaCy,
+        версия Tesseract, профиль OCR, версия кода экстракторов и правила реквизитов.
+        Любое изменение одной из составляющих делает старые записи кэша недействительными.
+    """
+    from src.core import classifier, nlp_extractor, text_extractor, rules
+
+    parts = [f"extractor={text_extractor.EXTRACTOR_VERSION}"]
+
+    try:
+        parts.append(f"rules={file_hash(rules.RULES_PATH)}")
+    except OSError:
+        parts.append("rules=none")
+
+    try:
+        parts.append(f"model={classifier.model_version()}")
+    except OSError:
+        parts.append("model=none")
+
+    try:
+        # Версия spaCy берётся из метаданных пакета, чтобы не импортировать его
+        from importlib.metadata import version
+        with open(os.path.join(nlp_extractor.MODEL_PATH, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        parts.append(f"spacy={version('spacy')}:{meta.get('name')}:{meta.get('version')}")
+    except Exception:
+        parts.append("spacy=unknown")
+
+    try:
+        from src.core.ocr import engine_version
+        parts.append(f"tesseract={engine_version()}")
+    except Exception:
+        parts.append("tesseract=unknown")
+
+    from src.core.ocr import profile_version
+    parts.append(f"ocr_profile={profile_version()}")
+
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+class ResultCache:
+    """
+        Дисковый кэш результатов process_document.
+        Ключ — хэш содержимого файла и версии конвейера, поэтому повторно
+        пришедший документ (под любым именем) не проходит OCR и NLP заново.
+        Размер ограничен max_bytes, вытесняются давно не использованные записи.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR,
+                 max_bytes: int = DEFAULT_MAX_BYTES, refresh: bool = False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._size = sum(size for _, _, size in self._entries())
+
+    def key(self, file_path, variant: str = None) -> str:
+        """
+            variant отличает результаты другого режима обработки того же файла
+            (например, раннего выхода) — они хранятся под отдельным ключом.
+        """
+        key = f"{file_hash(file_path)}-{pipeline_version()}"
+        if variant:
+            key += "-" + hashlib.sha256(variant.encode("utf-8")).hexdigest()[:8]
+        return key
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str, required: str = None):
+        """
+            required — поле, без которого запись не годится (считается промахом).
+        """
+        if self.refresh:
+            self.misses += 1
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+            # Отметка использования для LRU
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        if required and required not in result:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return result
+
+    def put(self, key: str, result: dict):
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False)
+            # Перезаписываемая запись (--refresh) не должна учитываться дважды
+            try:
+                previous = os.path.getsize(path)
+            except OSError:
+                previous = 0
+            os.replace(tmp, path)
+            self._size += os.path.getsize(path) - previous
+        except OSError as e:
+            logging.error(f"Cache write failed for {path}: {e}")
+            return
+
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_mtime, st.st_size
+
+    def _evict(self):
+        # Кэш может разделяться несколькими процессами, поэтому
+        # перед вытеснением фактический размер пересчитывается.
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        self._size = sum(size for _, _, size in entries)
+        target = self.max_bytes * 0.9
+        for path, _, size in entries:
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+                self._size -= size
+            except OSError:
+                pass
@@ -1,6 +1,7 @@
-import joblib
 import os
-from typing import Dict
+import logging
+import threading
+from typing import Dict, List
 import sys
 
 # MODEL_PATH = "../../data/doc3_classifier.pkl"
@@ -11,19 +12,61 @@ def resource_path(rel):
     return os.path.abspath(rel)
 
 MODEL_PATH = resource_path("data/doc3_classifier.pkl")
+# Экспорт для общей памяти процессов (main_cli.py convert-model), см. src.core.model_store
+MMAP_PATH = resource_path("data/doc3_classifier.mmap")
 
 
 _pipeline = None
+_load_error = None
+_lock = threading.Lock()
 
 def _load_resources():
-    global _pipeline
-    if _pipeline is None:
-        if os.path.exists(MODEL_PATH):
-            _pipeline = joblib.load(MODEL_PATH)
-        else:
-            raise FileNotFoundError(f"Model not found at {MODEL_PATH}")
+    """
+    Модель загружается при первой классификации (или явном прогреве),
+    а не при импорте модуля. Неудачная загрузка не повторяется:
+    та же ошибка возвращается при следующих обращениях.
+    """
+    global _pipeline, _load_error
+    with _lock:
+        if _load_error is not None:
+            raise _load_error
+        if _pipeline is None:
+            try:
+                _pipeline = _load_model()
+            except Exception as e:
+                logging.error(f"Classifier model could not be loaded: {e}")
+                _load_error = e
+                raise
+    return _pipeline
+
 
-_load_resources()
+def _load_model():
+    from src.core import model_store
+    if os.path.isdir(MMAP_PATH) and model_store.is_current(MMAP_PATH, MODEL_PATH):
+        # Массивы отображаются из файла и делятся между процессами
+        return model_store.load_model(MMAP_PATH)
+    if os.path.exists(MODEL_PATH):
+        if os.path.isdir(MMAP_PATH):
+            logging.error(f"Model export {MMAP_PATH} is outdated, loading {MODEL_PATH}; "
+                          f"run convert-model to refresh it")
+        import joblib
+        return joblib.load(MODEL_PATH)
+    raise FileNotFoundError(f"Model not found at {MODEL_PATH}")
+
+
+def model_version() -> str:
+    """
+        Хэш модели для версии конвейера: хэш pickle, а если его нет —
+        хэш исходной модели из метаданных экспорта.
+    """
+    from src.core.cache import file_hash
+    if os.path.exists(MODEL_PATH):
+        return file_hash(MODEL_PATH)
+    from src.core.model_store import read_meta
+    meta = read_meta(MMAP_PATH)
+    if meta is None:
+        raise FileNotFoundError(f"Model not found at {MODEL_PATH}")
+    return meta["source"]["sha256"]
 
 def classify_document(text: str) -> Dict:
     """
@@ -35,15 +78,49 @@ def classify_document(text: str) -> Dict:
       "method": "ml"
     }
     """
+    return classify_documents([text])[0]
+
+
+def classify_documents(texts: List[str], top_k: int = 1) -> List[Dict]:
+    """
+    Пакетная классификация: весь пакет векторизуется одним вызовом,
+    метка и вероятность берутся из одной матрицы predict_proba.
+    Возвращает список словарей в порядке текстов:
+    {
+      "label": str | None,
+      "prob": float,
+      "method": "ml",
+      "top": [{"label": str, "prob": float}, ...]   # top_k лучших меток
+    }
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+
     try:
-        probs = _pipeline.predict_proba([text])[0]
-        pred = _pipeline.predict([text])[0]
-        classes = _pipeline.classes_
-        prob = float(probs[list(classes).index(pred)])
+        pipeline = _load_resources()
+    except Exception:
+        # Без модели документы получают неизвестный тип (ошибка уже
+        # записана в журнал), а не ошибку всего пакета
+        return [_unknown() for _ in texts]
+    import numpy as np
 
-        # Приводим первую букву к заглавной
-        pred = pred.capitalize()
+    try:
+        probs = pipeline.predict_proba(texts)
+        classes = pipeline.classes_
+        # Лучшие top_k классов для каждой строки матрицы
+        best = np.argsort(-probs, axis=1, kind="stable")[:, :max(1, top_k)]
 
-        return {"label": pred, "prob": prob, "method": "ml"}
+        results = []
+        for row, indices in zip(probs, best):
+            # Приводим первую букву к заглавной
+            top = [{"label": str(classes[i]).capitalize(), "prob": float(row[i])} for i in indices]
+            results.append({"label": top[0]["label"], "prob": top[0]["prob"], "method": "ml", "top": top})
+        return results
     except Exception as e:
-        return {"label": None, "prob": 0.0, "method": "unknown"}
+        logging.error(f"Classification failed: {e}")
+        return [_unknown() for _ in texts]
+
+
+def _unknown() -> Dict:
+    return {"label": None, "prob": 0.0, "method": "unknown", "top": []}
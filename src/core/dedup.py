@@ -0,0 +1,400 @@
+"""
+Индекс почти-дубликатов: одно и то же бумажное письмо, отсканированное
+или сфотографированное заново, отличается побайтно, и кэш по хэшу
+содержимого его не узнаёт. Индекс хранит для обработанных документов
+две сигнатуры и результат:
+
+  image — перцептивный хэш (pHash, 64 бита) каждой страницы-изображения.
+          Проверяется до OCR: совпали число страниц и все страницы
+          с расстоянием Хэмминга не больше image_distance — документ
+          сразу получает сохранённый результат;
+  text  — SimHash (64 бита) по триграммам слов извлечённого текста.
+          Проверяется перед NER и классификацией и ловит остальное:
+          другие поля скана, поворот, PDF с текстовым слоем.
+
+Близкие хэши бывают и у разных писем одного шаблона: тот же бланк
+и текст, другие номер и дата. Поэтому совпадение принимается, только
+если номер и дата документа, найденные правилами реквизитов
+(src.core.rules), те же, что в сохранённом результате: для text — по
+всему тексту, для image — по распознанной первой странице.
+
+Сигнатуры и результаты лежат в SQLite (по умолчанию рядом с кэшем
+результатов) и годятся только для той же версии конвейера
+(pipeline_version). Процессы-обработчики пишут в общий файл, а поиск
+идёт по копии хэшей в памяти (массивы numpy), которая дочитывает новые
+строки перед каждым запросом.
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+
+from src.core.cache import DEFAULT_CACHE_DIR
+
+DEFAULT_INDEX_PATH = os.path.join(DEFAULT_CACHE_DIR, "near_duplicates.sqlite")
+
+# Пороги по умолчанию — расстояние Хэмминга между 64-битными хэшами.
+# Пересканированная страница обычно отличается на 0–4 бита, но бланки
+# одного вида с разным текстом бывают близки по картинке, поэтому
+# порог для изображений строже, чем принято для фотографий.
+IMAGE_DISTANCE = 4
+TEXT_DISTANCE = 3
+
+# Реквизиты, которые должны совпасть с сохранённым результатом
+KEY_FIELDS = ("document_number", "document_date")
+
+# Короткий текст (подпись, штамп) даёт слишком мало триграмм для SimHash
+MIN_TEXT_WORDS = 20
+
+# Разрешение отрисовки страниц PDF для pHash: хэш строится по 32×32
+HASH_DPI = 24
+
+_HASH_SIZE = 32
+_LOW = 8
+_WORD_RE = re.compile(r"\w+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    source TEXT,
+    version TEXT NOT NULL,
+    result TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS signatures (
+    id INTEGER PRIMARY KEY,
+    document_id INTEGER NOT NULL REFERENCES documents(id),
+    kind TEXT NOT NULL,
+    hash INTEGER NOT NULL,
+    pages INTEGER NOT NULL,
+    page_hashes TEXT
+);
+CREATE INDEX IF NOT EXISTS signatures_kind ON signatures(kind, id);
+"""
+
+_dct = None
+_popcount = None
+
+
+def _dct_matrix():
+    # Ортонормированная матрица DCT-II: dct(x) = C @ x @ C.T
+    global _dct
+    if _dct is None:
+        import numpy as np
+
+        n = np.arange(_HASH_SIZE)
+        matrix = np.cos(np.pi * (2 * n[None, :] + 1) * n[:, None] / (2 * _HASH_SIZE))
+        matrix[0] *= 1 / np.sqrt(2)
+        _dct = matrix * np.sqrt(2 / _HASH_SIZE)
+    return _dct
+
+
+def _pack(bits) -> int:
+    value = 0
+    for i, bit in enumerate(bits):
+        if bit:
+            value |= 1 << i
+    return value
+
+
+def image_hash(image) -> int:
+    """
+        pHash изображения: знаки низкочастотных коэффициентов DCT
+        уменьшенной копии относительно их медианы. Не зависит от
+        разрешения, сжатия и умеренных изменений яркости и контраста.
+    """
+    import numpy as np
+    from PIL import Image
+
+    small = image.convert("L").resize((_HASH_SIZE, _HASH_SIZE), Image.BOX)
+    matrix = _dct_matrix()
+    coefficients = (matrix @ np.asarray(small, dtype=np.float64) @ matrix.T)[:_LOW, :_LOW].ravel()
+    # Постоянная составляющая в медиану не входит — она лишь яркость
+    return _pack(coefficients > np.median(coefficients[1:]))
+
+
+def text_hash(text: str):
+    """
+        SimHash текста по триграммам слов (без учёта регистра).
+        None — слишком короткий текст.
+    """
+    import numpy as np
+
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < MIN_TEXT_WORDS:
+        return None
+    digests = b"".join(
+        hashlib.blake2b(" ".join(words[i:i + 3]).encode("utf-8"), digest_size=8).digest()
+        for i in range(len(words) - 2)
+    )
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    # Голосование по битам: бит результата — тот, что чаще у триграмм
+    return _pack(bits.sum(axis=0) * 2 > len(bits))
+
+
+def key_fields(text: str) -> dict:
+    """
+        Номер и дата документа по правилам реквизитов (без NER),
+        с нормализованными пробелами, как в результате.
+    """
+    from src.core.rules import get_rules
+
+    result, _ = get_rules().scan(text)
+    return {name: " ".join(result[name].split()) if result.get(name) else None for name in KEY_FIELDS}
+
+
+def _agrees(result: dict, fields: dict) -> bool:
+    return all((result.get(name) or None) == fields[name] for name in KEY_FIELDS)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _distances(hashes, value: int):
+    import numpy as np
+
+    global _popcount
+    xor = hashes ^ np.uint64(value)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(xor)
+    if _popcount is None:
+        _popcount = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    return _popcount[xor.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def _signed(value: int) -> int:
+    # SQLite хранит знаковые 64-битные целые
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+def page_hashes(file_path):
+    """
+        pHash каждой страницы скана до OCR: кадры изображения или страницы
+        PDF, отрисованные в низком разрешении. Для PDF, где хоть одна
+        страница содержит текстовый слой, и для DOCX возвращается None —
+        их текст извлекается дёшево и сравнивается SimHash.
+    """
+    from src.core.text_extractor import (
+        IMAGE_EXTENSIONS, _resolve, _binary, _open_pdf, _pdf_lock, has_text_layer,
+    )
+
+    source, ext = _resolve(file_path)
+    try:
+        if ext in IMAGE_EXTENSIONS:
+            from PIL import Image, ImageSequence
+
+            with Image.open(_binary(source)) as image:
+                if getattr(image, "n_frames", 1) > 1:
+                    return [image_hash(frame) for frame in ImageSequence.Iterator(image)]
+                # JPEG декодируется сразу в уменьшенном виде
+                image.draft("L", (_HASH_SIZE * 4, _HASH_SIZE * 4))
+                return [image_hash(image)]
+        if ext == ".pdf":
+            import fitz
+            from PIL import Image
+
+            with _pdf_lock, _open_pdf(source) as doc:
+                if doc.page_count == 0 or any(has_text_layer(page.get_text()) for page in doc):
+                    return None
+                hashes = []
+                for page in doc:
+                    pix = page.get_pixmap(dpi=HASH_DPI, colorspace=fitz.csGRAY, alpha=False)
+                    hashes.append(image_hash(Image.frombytes("L", (pix.width, pix.height), pix.samples)))
+                return hashes
+    except Exception as e:
+        logging.error(f"Perceptual hash failed for {file_path}: {e}")
+    return None
+
+
+class _Signatures:
+    """
+        Хэши одного вида в памяти процесса. Массивы растут удвоением,
+        чтобы дочитывание новых строк не копировало их каждый раз.
+    """
+
+    def __init__(self):
+        import numpy as np
+
+        self.last_id = 0
+        self.count = 0
+        self.hashes = np.zeros(1024, dtype=np.uint64)
+        self.pages = np.zeros(1024, dtype=np.int32)
+        self.rows = np.zeros(1024, dtype=np.int64)
+
+    def extend(self, rows: list):
+        import numpy as np
+
+        needed = self.count + len(rows)
+        if needed > len(self.hashes):
+            size = len(self.hashes)
+            while size < needed:
+                size *= 2
+            for name in ("hashes", "pages", "rows"):
+                array = getattr(self, name)
+                grown = np.zeros(size, dtype=array.dtype)
+                grown[:self.count] = array[:self.count]
+                setattr(self, name, grown)
+        end = self.count + len(rows)
+        self.rows[self.count:end] = [row[0] for row in rows]
+        self.hashes[self.count:end] = [_unsigned(row[1]) for row in rows]
+        self.pages[self.count:end] = [row[2] for row in rows]
+        self.count = end
+        self.last_id = rows[-1][0]
+
+    def candidates(self, value: int, pages: int, distance: int) -> list:
+        """
+            (расстояние, id сигнатуры) в порядке возрастания расстояния.
+        """
+        import numpy as np
+
+        if not self.count:
+            return []
+        found = _distances(self.hashes[:self.count], value)
+        matches = np.nonzero((found <= distance) & (self.pages[:self.count] == pages))[0]
+        return sorted((int(found[i]), int(self.rows[i])) for i in matches)
+
+
+class NearDuplicateIndex:
+    """
+        image_distance, text_distance — пороги расстояния Хэмминга для
+        слоёв image и text; None — слой отключён.
+        refresh — не искать совпадения (документы обрабатываются заново),
+        но пополнять индекс.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH, image_distance: int = IMAGE_DISTANCE,
+                 text_distance: int = TEXT_DISTANCE, refresh: bool = False):
+        self.path = path
+        self.image_distance = image_distance
+        self.text_distance = text_distance
+        self.refresh = refresh
+        self.hits = {"image": 0, "text": 0}
+        self._conn = None
+        self._version = None
+        self._signatures = {}
+
+    def _connect(self):
+        # Соединение открывается в том процессе, который им пользуется
+        if self._conn is None:
+            from src.core.cache import pipeline_version
+
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=60)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._version = pipeline_version()
+        return self._conn
+
+    def _load(self, kind: str) -> _Signatures:
+        conn = self._connect()
+        signatures = self._signatures.setdefault(kind, _Signatures())
+        rows = conn.execute(
+            "SELECT s.id, s.hash, s.pages FROM signatures s JOIN documents d ON d.id = s.document_id "
+            "WHERE s.kind = ? AND s.id > ? AND d.version = ? ORDER BY s.id",
+            (kind, signatures.last_id, self._version),
+        ).fetchall()
+        if rows:
+            signatures.extend(rows)
+        return signatures
+
+    def _match(self, kind: str, hashes: list, distance, fields):
+        if distance is None or not hashes or self.refresh:
+            return None
+        try:
+            conn = self._connect()
+            for found, row in self._load(kind).candidates(hashes[0], len(hashes), distance):
+                document_id, stored = conn.execute(
+                    "SELECT document_id, page_hashes FROM signatures WHERE id = ?", (row,)
+                ).fetchone()
+                if stored is not None:
+                    # Многостраничный документ: близки должны быть все страницы
+                    found = max(hamming(a, b) for a, b in zip(hashes, json.loads(stored)))
+                    if found > distance:
+                        continue
+                source, result = conn.execute(
+                    "SELECT source, result FROM documents WHERE id = ?", (document_id,)
+                ).fetchone()
+                result = json.loads(result)
+                if callable(fields):
+                    # Реквизиты нужны только при найденном кандидате
+                    fields = fields()
+                if fields is not None and not _agrees(result, fields):
+                    continue
+                self.hits[kind] += 1
+                return {"document_id": document_id, "source": source, "match": kind,
+                        "distance": found, "result": result}
+        except sqlite3.Error as e:
+            logging.error(f"Near-duplicate lookup failed in {self.path}: {e}")
+        return None
+
+    def match_image(self, hashes: list, fields=None):
+        """
+            Совпадение по pHash страниц: словарь с document_id, source
+            (документ, чей результат используется), match ("image"),
+            distance (наибольшее расстояние по страницам) и result; иначе None.
+            fields — функция без аргументов, возвращающая key_fields()
+            первой страницы: вызывается один раз, если нашёлся кандидат.
+        """
+        return self._match("image", hashes, self.image_distance, fields)
+
+    def match_text(self, value, fields: dict = None):
+        """
+            fields — key_fields() текста документа.
+        """
+        return self._match("text", [value] if value is not None else None, self.text_distance, fields)
+
+    def add(self, source: str, result: dict, image: list = None, text: int = None,
+            document_id: int = None):
+        """
+            Сохранение сигнатур документа. Без document_id записывается
+            и результат; с document_id сигнатуры привязываются к уже
+            сохранённому результату (скан, узнанный по тексту, в следующий
+            раз узнаётся ещё до OCR).
+        """
+        signatures = []
+        if image:
+            signatures.append(("image", image[0], len(image), json.dumps(image) if len(image) > 1 else None))
+        if text is not None:
+            signatures.append(("text", text, 1, None))
+        if not signatures:
+            return document_id
+        try:
+            conn = self._connect()
+            with conn:
+                if document_id is None:
+                    document_id = conn.execute(
+                        "INSERT INTO documents (source, version, result, created) VALUES (?, ?, ?, ?)",
+                        (source, self._version, json.dumps(result, ensure_ascii=False), time.time()),
+                    ).lastrowid
+                conn.executemany(
+                    "INSERT INTO signatures (document_id, kind, hash, pages, page_hashes) VALUES (?, ?, ?, ?, ?)",
+                    [(document_id, kind, _signed(value), pages, stored) for kind, value, pages, stored in signatures],
+                )
+        except sqlite3.Error as e:
+            logging.error(f"Near-duplicate index write failed for {self.path}: {e}")
+        return document_id
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def reused(match: dict) -> dict:
+    """
+        Результат найденного почти-дубликата с отметкой, откуда он взят.
+    """
+    return dict(match["result"], reused_from={
+        "source": match["source"], "match": match["match"], "distance": match["distance"],
+    })
@@ -0,0 +1,131 @@
+"""
+Потоковое извлечение текста из DOCX без построения объектной модели
+python-docx: части word/document.xml, колонтитулы (header*.xml, footer*.xml)
+читаются прямо из ZIP через iterparse.
+
+Порядок вывода: верхние колонтитулы (там часто бланк с отправителем и «№»),
+основной текст в порядке чтения — абзацы, ячейки таблиц, надписи
+(текстовые поля), — затем нижние колонтитулы.
+"""
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_MC = "{http://schemas.openxmlformats.org/markup-compatibility/2006}"
+
+_P = _W + "p"
+_R = _W + "r"
+_PPR = _W + "pPr"
+_T = _W + "t"
+_TAB = _W + "tab"
+_BR = _W + "br"
+_CR = _W + "cr"
+_BR_TYPE = _W + "type"
+_NO_BREAK_HYPHEN = _W + "noBreakHyphen"
+# В mc:AlternateContent надпись хранится дважды: в mc:Choice (DrawingML)
+# и в mc:Fallback (VML) — запасной вариант пропускается
+_FALLBACK = _MC + "Fallback"
+
+DOCUMENT_PART = "word/document.xml"
+_HEADER_RE = re.compile(r"^word/header(\d*)\.xml$")
+_FOOTER_RE = re.compile(r"^word/footer(\d*)\.xml$")
+
+
+def _part_order(name, pattern):
+    return int(pattern.match(name).group(1) or 0)
+
+
+def iter_part_paragraphs(stream):
+    """
+        Абзацы одной XML-части в порядке документа. Абзацы надписей
+        вложены в абзац, к которому привязана надпись, и выдаются
+        раньше него — по закрывающему тегу.
+    """
+    # Стек текущих абзацев: у каждого свой список фрагментов текста
+    stack = []
+    # Открытые элементы: прочитанный элемент отсоединяется от родителя,
+    # поэтому память не растёт с длиной тела документа и таблиц
+    parents = []
+    skip = 0
+    # w:tab в w:pPr/w:tabs — позиция табуляции, а не символ: табуляция
+    # текста — только w:tab внутри w:r
+    runs = 0
+    properties = 0
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            parents.append(elem)
+            if tag == _FALLBACK:
+                skip += 1
+            elif tag == _R:
+                runs += 1
+            elif tag == _PPR:
+                properties += 1
+            elif tag == _P and not skip:
+                stack.append([])
+            continue
+
+        parents.pop()
+        if parents:
+            parents[-1].remove(elem)
+
+        if tag == _FALLBACK:
+            skip -= 1
+        elif tag == _R:
+            runs -= 1
+        elif tag == _PPR:
+            properties -= 1
+        elif skip or not stack:
+            continue
+        elif tag == _T:
+            stack[-1].append(elem.text or "")
+        elif tag == _TAB:
+            if runs and not properties:
+                stack[-1].append("\t")
+        elif tag == _CR or (tag == _BR and elem.get(_BR_TYPE, "textWrapping") == "textWrapping"):
+            # Разрыв страницы или колонки — не перенос строки
+            stack[-1].append("\n")
+        elif tag == _NO_BREAK_HYPHEN:
+            stack[-1].append("-")
+        elif tag == _P:
+            yield "".join(stack.pop())
+
+
+def _part_text(archive, name):
+    with archive.open(name) as stream:
+        return list(iter_part_paragraphs(stream))
+
+
+def read_docx_paragraphs(source) -> list:
+    """
+        Абзацы документа: колонтитулы, основной текст, нижние колонтитулы.
+        Одинаковые колонтитулы (первая/чётные/нечётные страницы) выводятся один раз.
+        source — путь или файловый объект.
+    """
+    with zipfile.ZipFile(source) as archive:
+        names = archive.namelist()
+        headers = sorted((n for n in names if _HEADER_RE.match(n)), key=lambda n: _part_order(n, _HEADER_RE))
+        footers = sorted((n for n in names if _FOOTER_RE.match(n)), key=lambda n: _part_order(n, _FOOTER_RE))
+
+        paragraphs = []
+        seen = set()
+
+        def add_part(name):
+            lines = [line for line in _part_text(archive, name) if line.strip()]
+            key = tuple(lines)
+            if lines and key not in seen:
+                seen.add(key)
+                paragraphs.extend(lines)
+
+        for name in headers:
+            add_part(name)
+        with archive.open(DOCUMENT_PART) as stream:
+            paragraphs.extend(iter_part_paragraphs(stream))
+        for name in footers:
+            add_part(name)
+    return paragraphs
+
+
+def read_docx_text(source) -> str:
+    return "\n".join(read_docx_paragraphs(source))
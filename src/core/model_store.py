@@ -0,0 +1,193 @@
+"""
+Формат модели классификатора для общей памяти процессов.
+
+Обычный pickle (data/doc3_classifier.pkl) каждый процесс распаковывает
+в собственную кучу: словарь TfidfVectorizer.vocabulary_ (строка -> столбец)
+и матрицы коэффициентов копируются в каждый процесс-обработчик.
+
+Экспорт — каталог data/doc3_classifier.mmap:
+  model.joblib — конвейер, сохранённый joblib; числовые массивы загружаются
+                 с mmap_mode="r" и отображаются из одного и того же файла,
+                 то есть делят страничный кэш ОС между процессами;
+  meta.json    — версия формата, исходный файл (размер, mtime, sha256).
+Словарь заменяется на MmapVocabulary: термы лежат одним массивом байтов
+UTF-8, поиск — по открытой хэш-таблице, тоже в массивах numpy.
+"""
+import os
+import json
+import time
+import zlib
+import argparse
+
+FORMAT_VERSION = 1
+MODEL_FILE = "model.joblib"
+META_FILE = "meta.json"
+
+
+class MmapVocabulary:
+    """
+        Неизменяемая замена dict для TfidfVectorizer.vocabulary_:
+        терм -> номер столбца. Все данные — массивы numpy, поэтому при
+        загрузке через joblib с mmap_mode они не копируются в процесс.
+    """
+
+    def __init__(self, vocabulary: dict):
+        import numpy as np
+
+        terms = sorted(vocabulary, key=vocabulary.get)
+        encoded = [term.encode("utf-8") for term in terms]
+        self.blob = np.frombuffer(b"".join(encoded), dtype=np.uint8).copy()
+        self.offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(term) for term in encoded], out=self.offsets[1:])
+        self.columns = np.array([vocabulary[term] for term in terms], dtype=np.int32)
+
+        # Открытая адресация, заполнение не больше половины
+        size = 1
+        while size < 2 * max(1, len(terms)):
+            size *= 2
+        self.table = np.full(size, -1, dtype=np.int32)
+        mask = size - 1
+        for index, term in enumerate(encoded):
+            slot = zlib.crc32(term) & mask
+            while self.table[slot] != -1:
+                slot = (slot + 1) & mask
+            self.table[slot] = index
+        self._views = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_views"] = None
+        return state
+
+    def _memoryviews(self):
+        # memoryview над массивами (в том числе memmap) индексируется
+        # быстрее, чем скаляры numpy, и не копирует данные
+        if self._views is None:
+            self._views = (memoryview(self.blob), memoryview(self.offsets),
+                           memoryview(self.columns), memoryview(self.table))
+        return self._views
+
+    def _find(self, term: str) -> int:
+        blob, offsets, _, table = self._memoryviews()
+        key = term.encode("utf-8")
+        mask = len(table) - 1
+        slot = zlib.crc32(key) & mask
+        while True:
+            index = table[slot]
+            if index == -1:
+                return -1
+            if blob[offsets[index]:offsets[index + 1]] == key:
+                return index
+            slot = (slot + 1) & mask
+
+    def __getitem__(self, term: str) -> int:
+        index = self._find(term)
+        if index == -1:
+            raise KeyError(term)
+        return self._memoryviews()[2][index]
+
+    def get(self, term: str, default=None):
+        index = self._find(term)
+        return default if index == -1 else self._memoryviews()[2][index]
+
+    def __contains__(self, term) -> bool:
+        return isinstance(term, str) and self._find(term) != -1
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def keys(self):
+        blob, offsets, _, _ = self._memoryviews()
+        for index in range(len(self)):
+            yield bytes(blob[offsets[index]:offsets[index + 1]]).decode("utf-8")
+
+    __iter__ = keys
+
+    def values(self):
+        return iter(self._memoryviews()[2].tolist())
+
+    def items(self):
+        return zip(self.keys(), self.values())
+
+
+def _source_info(model_path: str) -> dict:
+    from src.core.cache import file_hash
+
+    st = os.stat(model_path)
+    return {"path": os.path.basename(model_path), "size": st.st_size,
+            "mtime": st.st_mtime_ns, "sha256": file_hash(model_path)}
+
+
+def export_model(model_path: str, output_dir: str) -> dict:
+    """
+        Конвертация pickle-модели в каталог для загрузки с mmap_mode.
+    """
+    import joblib
+
+    pipeline = joblib.load(model_path)
+    for _, step in getattr(pipeline, "steps", [("model", pipeline)]):
+        vocabulary = getattr(step, "vocabulary_", None)
+        if isinstance(vocabulary, dict):
+            step.vocabulary_ = MmapVocabulary(vocabulary)
+        # Отброшенные при обучении термы нужны только для интроспекции
+        if hasattr(step, "stop_words_"):
+            step.stop_words_ = None
+
+    os.makedirs(output_dir, exist_ok=True)
+    tmp = os.path.join(output_dir, MODEL_FILE + ".tmp")
+    joblib.dump(pipeline, tmp)
+    os.replace(tmp, os.path.join(output_dir, MODEL_FILE))
+
+    meta = {"format": FORMAT_VERSION, "source": _source_info(model_path),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+    with open(os.path.join(output_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return meta
+
+
+def read_meta(export_dir: str):
+    try:
+        with open(os.path.join(export_dir, META_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_current(export_dir: str, model_path: str) -> bool:
+    """
+        Экспорт годится, если он в текущем формате и сделан из того же
+        файла модели (сравниваются размер и mtime, без чтения модели).
+        Если исходного pickle нет, используется экспорт.
+    """
+    meta = read_meta(export_dir)
+    if meta is None or meta.get("format") != FORMAT_VERSION:
+        return False
+    if not os.path.exists(os.path.join(export_dir, MODEL_FILE)):
+        return False
+    try:
+        st = os.stat(model_path)
+    except OSError:
+        return True
+    source = meta["source"]
+    return source["size"] == st.st_size and source["mtime"] == st.st_mtime_ns
+
+
+def load_model(export_dir: str):
+    import joblib
+    return joblib.load(os.path.join(export_dir, MODEL_FILE), mmap_mode="r")
+
+
+def main(argv=None):
+    from src.core.classifier import MODEL_PATH, MMAP_PATH
+
+    parser = argparse.ArgumentParser(prog="main_cli.py convert-model",
+                                     description="Экспорт модели классификатора для загрузки через mmap")
+    parser.add_argument("--model", default=MODEL_PATH, help="Исходная модель (pickle)")
+    parser.add_argument("--output", default=None, help="Каталог экспорта (по умолчанию рядом с моделью, .mmap)")
+    args = parser.parse_args(argv)
+
+    output = args.output or (MMAP_PATH if args.model == MODEL_PATH else os.path.splitext(args.model)[0] + ".mmap")
+    started = time.perf_counter()
+    meta = export_model(args.model, output)
+    print(f"Модель {args.model} экспортирована в {output} за {time.perf_counter() - started:.2f} с "
+          f"(sha256 {meta['source']['sha256'][:12]})")
@@ -1,7 +1,7 @@
-import re
-import spacy
 import os
 import sys
+import threading
+from src.core.rules import get_rules
 
 # nlp = spacy.load("ru_core_news_sm")
 
@@ -12,104 +12,76 @@ def resource_path(rel):
     return os.path.abspath(rel)
 
 MODEL_PATH = resource_path("spacy_models/ru_core_news_sm")
-nlp = spacy.load(MODEL_PATH)
+
+# Для поиска PER/ORG нужен только NER: остальные компоненты конвейера
+# не загружаются вовсе.
+EXCLUDED_PIPES = ["parser", "lemmatizer", "morphologizer", "attribute_ruler"]
+
+nlp = None
+_lock = threading.Lock()
+# Один объект Language не рассчитан на одновременный вызов из нескольких
+# потоков (интерфейс, сервис), поэтому nlp.pipe выполняется под блокировкой.
+_pipe_lock = threading.Lock()
+
+
+def get_nlp():
+    """
+        Модель spaCy загружается при первом обращении, а не при импорте модуля.
+    """
+    global nlp
+    with _lock:
+        if nlp is None:
+            import spacy
+            nlp = spacy.load(MODEL_PATH, exclude=EXCLUDED_PIPES)
+    return nlp
+
+# Размер пакета для nlp.pipe
+NLP_BATCH_SIZE = 64
+
 
 def extract_fields(text):
     """
         Основная функция nlp-анализа текста.
         Принимает строку, возвращает словарь.
     """
+    return extract_fields_many([text])[0]
 
-    lines = [line.strip() for line in text.splitlines()]
-
-    while lines and lines[0] == "":
-        lines.pop(0)
-    while lines and lines[-1] == "":
-        lines.pop()
-
-    # Результат работы функции
-    result = { "sender": None, "recipient": None, "document_date": None,
-        "document_number": None, "subject": None, "content_summary": None
-    }
-
-    # Регулярные выражение даты и номера
-    date_patterns = [
-        r"\b\d{1,2}[./-]\d{1,2}[./-]\d{2,4}\b",  # 28.01.2025 или 28/01/2025
-        r"\b\d{1,2}\s+(?:января|февраля|марта|апреля|мая|июня|июля|августа|сентября|октября|ноября|декабря)\s+\d{4}\b",
-        # 7 февраля 2025
-        r"\b\d{4}-\d{2}-\d{2}\b"
-    ]
-    date_re = re.compile("|".join(f"({p})" for p in date_patterns), re.IGNORECASE)
-    num_re = re.compile(r"(?:Документ\s*№[:\s]*|№[:\s]*|Номер[:\s]*)\s*([\w\/\-]+(?:[:\s]*\d{1,2}[\/\-]?\d{1,4})?)", re.IGNORECASE)
-
-    #
-    for idx, ln in enumerate(lines):
-        if re.match(r"^(Отправитель|От кого)\b", ln, re.IGNORECASE):
-            sender_block = collect_block_from(lines, idx)
-            sender_block = [s for s in sender_block if s]
-            if sender_block:
-                result["sender"] = " ".join(spacy_persons(nlp(" ".join(sender_block)))).strip()
-
-        elif re.match(r"^(Получатель|Кому)\b", ln, re.IGNORECASE):
-            recipient_block = collect_block_from(lines, idx)
-            recipient_block = [s for s in recipient_block if s]
-            if recipient_block:
-                result["recipient"] = " ".join(spacy_persons(nlp(" ". join(recipient_block).strip()))).strip()
-
-        elif re.match(r"^(Тема|Subject)[:\s]", ln, re.IGNORECASE):
-            if ":" in ln:
-                result["subject"] = ln.split(":", 1)[1].strip()
-            else:
-                # если тема на следующей строке
-                if idx + 1 < len(lines) and lines[idx + 1].strip():
-                    result["subject"] = lines[idx + 1].strip()
-
-        elif result["sender"] is None:
-            sender_block = collect_block_from(lines, idx-1)
-            sender_block = [s for s in sender_block if s]
-            if sender_block:
-                result["sender"] = " ".join(spacy_persons(nlp(" ".join(sender_block)))).strip()
-
-
-    num_match = num_re.search(text)
-    if num_match:
-        result["document_number"] = num_match.group(1).strip()
-
-        # Поиск даты — отдаем первое правдоподобное совпадение
-    date_match = date_re.search(text)
-    if date_match:
-        for g in date_match.groups():
-            if g:
-                result["document_date"] = g.strip().strip(" .гГ")
-                break
-
-    # Нормализуем пробелы
-    for k in ["sender", "recipient", "document_date", "document_number", "subject"]:
-        if result.get(k):
-            result[k] = " ".join(result[k].split())
-
-    return result
-
-def collect_block_from(lines, i):
+
+def extract_fields_many(texts):
     """
-        Объединение строк в смысловые блоки.
+        Пакетный nlp-анализ нескольких текстов.
+        Сначала по всем текстам собираются блоки отправителя и получателя,
+        затем все блоки разом проходят через nlp.pipe.
+        Возвращает список словарей в порядке текстов.
     """
-    block = []
-    if ":" in lines[i]:
-        after = lines[i].split(":", 1)[1].strip()
-        if after:
-            block.append(after)
-    j = i + 1
-    while j < len(lines):
-        ln = lines[j].strip()
-        if ln == "":
-            break
-        if re.match(r"^(От|Отправитель|От кого|Получатель|Кому|Документ|Дата|Тема|Текст|С уважением)\b", ln, re.IGNORECASE):
-            break
-        block.append(ln)
-        j += 1
-
-    return block
+    rules = get_rules()
+    plans = [rules.scan(text) for text in texts]
+
+    # Одинаковые блоки (например, общий бланк) анализируются один раз
+    blocks = list(dict.fromkeys(block for _, assignments in plans for _, block in assignments))
+    persons = {}
+    if blocks:
+        model = get_nlp()
+        with _pipe_lock:
+            docs = list(model.pipe(blocks, batch_size=NLP_BATCH_SIZE))
+        persons = {block: " ".join(spacy_persons(doc)).strip() for block, doc in zip(blocks, docs)}
+
+    results = []
+    for result, assignments in plans:
+        # Присваивания выполняются в порядке строк документа,
+        # более поздний блок перекрывает ранний
+        for field, block in assignments:
+            result[field] = persons[block]
+
+        # Нормализуем пробелы
+        for k in rules.fields:
+            if result.get(k):
+                result[k] = " ".join(result[k].split())
+
+        results.append(result)
+
+    return results
+
 
 def spacy_persons(doc):
     """
@@ -0,0 +1,222 @@
+import os
+import sys
+import json
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+OCR_LANG = "rus"
+
+# Профили OCR: разрешение страницы (для PDF — разрешение отрисовки,
+# для изображений — целевой эффективный DPI после уменьшения),
+# режим сегментации (psm), движок распознавания (oem), языки и шаги
+# предобработки из src.core.preprocess.
+PROFILES = {
+    # Без предобработки: изображение уходит в Tesseract как есть
+    "raw": {"dpi": 200, "psm": 3, "oem": 3, "lang": OCR_LANG, "preprocess": False},
+    "fast": {"dpi": 200, "psm": 6, "oem": 1, "lang": OCR_LANG,
+             "downscale": True, "binarize": True, "deskew": False, "crop": True},
+    "standard": {"dpi": 300, "psm": 3, "oem": 3, "lang": OCR_LANG,
+                 "downscale": True, "binarize": False, "deskew": True, "crop": True},
+    "accurate": {"dpi": 300, "psm": 3, "oem": 3, "lang": "rus+eng",
+                 "downscale": True, "binarize": True, "deskew": True, "crop": True},
+}
+# По умолчанию — прежний конвейер (200 DPI, без предобработки): остальные
+# профили включаются явно, после проверки на своей выборке
+# (benchmarks.ocr_profiles) — standard и accurate заметно медленнее
+PROFILE = os.environ.get("TEXTSCANNER_OCR_PROFILE", "raw")
+
+# Число потоков OCR и число страниц, одновременно находящихся в памяти
+# (отрисованных, но ещё не распознанных).
+OCR_THREADS = max(1, min(4, os.cpu_count() or 1))
+OCR_WINDOW = 2 * OCR_THREADS
+
+# "auto" — tesserocr, если установлен, иначе pytesseract
+ENGINE = os.environ.get("TEXTSCANNER_OCR_ENGINE", "auto")
+
+
+def resource_path(relative_path: str) -> str:
+    base_path = getattr(sys, "_MEIPASS", os.path.abspath("."))
+    return os.path.join(base_path, relative_path)
+
+
+def _pytesseract():
+    import pytesseract
+    # Указать путь к tesseract.exe
+    # pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+    pytesseract.pytesseract.tesseract_cmd = resource_path(
+        os.path.join("tesseract", "tesseract.exe")
+    )
+    return pytesseract
+
+
+class PytesseractEngine:
+    """
+        Запасной движок: отдельный процесс tesseract на каждое изображение.
+    """
+    name = "pytesseract"
+
+    def __init__(self, lang: str = OCR_LANG, psm: int = 3, oem: int = 3):
+        self._pytesseract = _pytesseract()
+        self.lang = lang
+        self.config = f"--psm {psm} --oem {oem}"
+
+    def image_to_string(self, image) -> str:
+        config = self.config
+        dpi = image.info.get("dpi")
+        if dpi:
+            config += f" --dpi {int(dpi[0])}"
+        return self._pytesseract.image_to_string(image, lang=self.lang, config=config)
+
+    @staticmethod
+    def version() -> str:
+        return str(_pytesseract().get_tesseract_version())
+
+
+class TesserocrEngine:
+    """
+        libtesseract в процессе (tesserocr): модель языка загружается один раз
+        на поток, изображения передаются в памяти без временных файлов.
+    """
+    name = "tesserocr"
+
+    def __init__(self, lang: str = OCR_LANG, psm: int = 3, oem: int = 3):
+        import tesserocr
+        options = {"lang": lang, "psm": tesserocr.PSM(psm), "oem": tesserocr.OEM(oem)}
+        tessdata = resource_path(os.path.join("tesseract", "tessdata"))
+        if os.path.isdir(tessdata):
+            options["path"] = tessdata
+        self._api = tesserocr.PyTessBaseAPI(**options)
+        self.lang = lang
+
+    def image_to_string(self, image) -> str:
+        self._api.SetImage(image)
+        dpi = image.info.get("dpi")
+        if dpi:
+            self._api.SetSourceResolution(int(dpi[0]))
+        return self._api.GetUTF8Text()
+
+    @staticmethod
+    def version() -> str:
+        import tesserocr
+        return tesserocr.tesseract_version().splitlines()[0]
+
+
+def _engine_class():
+    if ENGINE in ("auto", TesserocrEngine.name):
+        try:
+            import tesserocr  # noqa: F401
+            return TesserocrEngine
+        except ImportError:
+            if ENGINE == TesserocrEngine.name:
+                logging.error("tesserocr is not installed, falling back to pytesseract")
+    return PytesseractEngine
+
+
+_local = threading.local()
+
+
+def get_profile() -> dict:
+    return PROFILES[PROFILE]
+
+
+def get_engine():
+    """
+        OCR-движок текущего потока для текущего профиля. Движок создаётся
+        при первом обращении и живёт вместе с потоком, поэтому потоки пула
+        OCR держат загруженную модель языка между страницами и документами.
+    """
+    engines = getattr(_local, "engines", None)
+    if engines is None:
+        engines = _local.engines = {}
+    engine = engines.get(PROFILE)
+    if engine is None:
+        profile = get_profile()
+        options = {"lang": profile["lang"], "psm": profile["psm"], "oem": profile["oem"]}
+        cls = _engine_class()
+        try:
+            engine = cls(**options)
+        except Exception as e:
+            if cls is PytesseractEngine:
+                raise
+            logging.error(f"{cls.name} initialization failed, falling back to pytesseract: {e}")
+            engine = PytesseractEngine(**options)
+        engines[PROFILE] = engine
+    return engine
+
+
+def recognize(image) -> str:
+    from src.core.preprocess import preprocess
+    return get_engine().image_to_string(preprocess(image, get_profile()))
+
+
+def engine_version() -> str:
+    cls = _engine_class()
+    return f"{cls.name}:{cls.version()}"
+
+
+def profile_version() -> str:
+    from src.core.preprocess import PREPROCESS_VERSION
+    return f"{PROFILE}:{json.dumps(get_profile(), sort_keys=True)}:preprocess={PREPROCESS_VERSION}"
+
+
+_pool = None
+_pool_size = 0
+_pool_lock = threading.Lock()
+
+
+def configure(threads=None, window=None, profile=None):
+    """
+        Настройка параллельности OCR внутри документа и профиля OCR.
+        При пакетной обработке несколькими процессами потоков на документ
+        нужно меньше, чтобы не перегружать процессор.
+    """
+    global OCR_THREADS, OCR_WINDOW, PROFILE, _pool
+    if profile:
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown OCR profile: {profile}")
+        PROFILE = profile
+    with _pool_lock:
+        if threads:
+            OCR_THREADS = max(1, threads)
+            OCR_WINDOW = 2 * OCR_THREADS
+        if window:
+            OCR_WINDOW = max(OCR_THREADS, window)
+        if _pool is not None and _pool_size != OCR_THREADS:
+            _pool.shutdown(wait=False)
+            _pool = None
+
+
+def _executor():
+    # Пул общий для всех документов процесса: его потоки и их движки
+    # переживают отдельный документ.
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=OCR_THREADS, thread_name_prefix="ocr")
+            _pool_size = OCR_THREADS
+        return _pool
+
+
+def _ocr_page(load_page):
+    return recognize(load_page())
+
+
+def ocr_pages(pages):
+    """
+        Потоковый OCR страниц.
+        pages — итератор функций без аргументов, возвращающих PIL-изображение
+        страницы; изображение создаётся уже в потоке OCR.
+        В работе одновременно не более OCR_WINDOW страниц, порядок сохраняется.
+    """
+    pool = _executor()
+    texts = []
+    in_flight = deque()
+    for load_page in pages:
+        in_flight.append(pool.submit(_ocr_page, load_page))
+        if len(in_flight) >= OCR_WINDOW:
+            texts.append(in_flight.popleft().result())
+    while in_flight:
+        texts.append(in_flight.popleft().result())
+    return texts
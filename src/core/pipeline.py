@@ -0,0 +1,318 @@
+"""
+Конвейерный движок обработки: этапы работают одновременно, каждый
+со своей очередью и своими исполнителями.
+
+  extract  — пул процессов: поиск в кэше и индексе почти-дубликатов,
+             извлечение текста и OCR (prepare_document); ZIP-архив
+             обрабатывается здесь же целиком (process_archive);
+  nlp      — поток, собирающий документы в пакет до nlp_batch штук
+             или до batch_timeout секунд ожидания и передающий пакет
+             в spaCy (extract_fields_many);
+  classify — такой же поток для классификатора (classify_documents).
+
+Пока процессы распознают следующие сканы, NER и классификация идут
+над уже извлечёнными текстами. Число документов в работе ограничено
+max_in_flight: новый документ уходит в извлечение, только когда
+готовый результат забран, поэтому память не растёт с размером папки,
+а очереди между этапами не переполняются.
+
+По каждому этапу собирается загрузка: время работы исполнителей,
+делённое на время прогона и число исполнителей, средний размер пакета
+и ожидание в очереди перед этапом (report(), print_report()).
+"""
+import os
+import time
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from src.core.processor import prepare_document, complete_document, process_archive, _is_archive, STAGES
+from src.core.nlp_extractor import extract_fields_many
+from src.core.classifier import classify_documents
+
+NLP_BATCH = 16
+CLASSIFY_BATCH = 64
+BATCH_TIMEOUT = 0.05
+
+_STOP = object()
+
+_cache = None
+_near_duplicates = None
+_with_text = False
+
+
+def _init_extract_worker(cache_options=None, ocr_threads=None, ocr_profile=None, near_duplicates_options=None,
+                         with_text=False):
+    from src.core.ocr import configure as configure_ocr
+    from src.core.cache import ResultCache
+    from src.core.dedup import NearDuplicateIndex
+
+    global _cache, _near_duplicates, _with_text
+    configure_ocr(threads=ocr_threads, profile=ocr_profile)
+    _cache = ResultCache(**cache_options) if cache_options else None
+    _near_duplicates = NearDuplicateIndex(**near_duplicates_options) if near_duplicates_options else None
+    _with_text = with_text
+
+
+def _ready():
+    return os.getpid()
+
+
+def _prepare(path: str) -> tuple:
+    started = time.perf_counter()
+    if _is_archive(path):
+        # Архив обрабатывается в процессе извлечения целиком, как в движке
+        # batch: его документы не проходят через этапы nlp и classify
+        result = process_archive(path, cache=_cache, with_meta=True, near_duplicates=_near_duplicates,
+                                 with_text=_with_text)
+        return {"result": result}, os.getpid(), time.perf_counter() - started
+    item = prepare_document(path, cache=_cache, with_meta=True, near_duplicates=_near_duplicates,
+                            with_text=_with_text)
+    return item, os.getpid(), time.perf_counter() - started
+
+
+class StageStats:
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.docs = 0
+        self.batches = 0
+        self.busy = 0.0
+        self.wait = 0.0
+        self.max_queue = 0
+        self._lock = threading.Lock()
+
+    def observe(self, docs: int, busy: float, wait: float = 0.0):
+        with self._lock:
+            self.docs += docs
+            self.batches += 1
+            self.busy += busy
+            self.wait += wait
+
+    def depth(self, size: int):
+        if size > self.max_queue:
+            self.max_queue = size
+
+    def summary(self, wall: float) -> dict:
+        return {
+            "stage": self.name,
+            "workers": self.workers,
+            "docs": self.docs,
+            "batches": self.batches,
+            "mean_batch": round(self.docs / self.batches, 2) if self.batches else 0.0,
+            "busy_seconds": round(self.busy, 3),
+            "utilization": round(self.busy / (wall * self.workers), 3) if wall > 0 else 0.0,
+            "mean_wait_seconds": round(self.wait / self.docs, 4) if self.docs else 0.0,
+            "max_queue": self.max_queue,
+        }
+
+
+class Pipeline:
+    """
+        extract_workers — процессов извлечения (по умолчанию по числу ядер),
+        nlp_batch, classify_batch — наибольший пакет этапов nlp и classify,
+        batch_timeout — сколько секунд этап ждёт пополнения неполного пакета,
+        max_in_flight — документов в работе одновременно (по умолчанию
+        вдвое больше процессов плюс пакет nlp),
+        cache_options, near_duplicates_options — параметры ResultCache
+        и NearDuplicateIndex (процессы извлечения ищут в них, результаты
+        сохраняет основной процесс),
+        with_text — добавлять в результаты извлечённый текст ("_text").
+    """
+
+    def __init__(self, extract_workers: int = None, nlp_batch: int = NLP_BATCH,
+                 classify_batch: int = CLASSIFY_BATCH, batch_timeout: float = BATCH_TIMEOUT,
+                 max_in_flight: int = None, cache_options: dict = None, ocr_threads: int = None,
+                 ocr_profile: str = None, near_duplicates_options: dict = None, with_text: bool = False):
+        from src.core.cache import ResultCache
+        from src.core.dedup import NearDuplicateIndex
+
+        self.extract_workers = max(1, extract_workers or os.cpu_count() or 1)
+        self.nlp_batch = max(1, nlp_batch)
+        self.classify_batch = max(1, classify_batch)
+        self.batch_timeout = batch_timeout
+        self.max_in_flight = max_in_flight or 2 * self.extract_workers + self.nlp_batch
+        self.with_text = with_text
+        self.init_args = (cache_options, ocr_threads, ocr_profile, near_duplicates_options, with_text)
+        self.cache = ResultCache(**cache_options) if cache_options else None
+        self.near_duplicates = NearDuplicateIndex(**near_duplicates_options) if near_duplicates_options else None
+        self.stats = {}
+        self.wall = 0.0
+
+    def run(self, jobs):
+        """
+            jobs — итерируемое пар (ключ, путь к файлу). Генератор отдаёт
+            пары (ключ, результат) по мере готовности — не в порядке jobs.
+            Следующий документ уходит в извлечение, только когда забран
+            очередной результат.
+        """
+        from src.core.warmup import warm_models
+
+        self.stats = {
+            "extract": StageStats("extract", self.extract_workers),
+            "nlp": StageStats("nlp", 1),
+            "classify": StageStats("classify", 1),
+        }
+        slots = threading.Semaphore(self.max_in_flight)
+        # Место под все документы в работе и метку конца
+        nlp_queue = queue.Queue(maxsize=self.max_in_flight + 1)
+        classify_queue = queue.Queue(maxsize=self.max_in_flight + 1)
+        output = queue.Queue()
+
+        warm_models()
+        pool = ProcessPoolExecutor(max_workers=self.extract_workers, initializer=_init_extract_worker,
+                                   initargs=self.init_args)
+        # Процессы создаются до запуска потоков этапов: fork из процесса
+        # с работающими потоками может унаследовать занятые блокировки
+        for future in [pool.submit(_ready) for _ in range(self.extract_workers)]:
+            future.result()
+
+        threads = [
+            threading.Thread(target=self._batch_stage, name="pipeline-nlp", daemon=True,
+                             args=(self.stats["nlp"], nlp_queue, self.nlp_batch, self._nlp, "batch_size",
+                                   classify_queue, output)),
+            threading.Thread(target=self._batch_stage, name="pipeline-classify", daemon=True,
+                             args=(self.stats["classify"], classify_queue, self.classify_batch,
+                                   self._classify, "classify_batch_size", output, output)),
+        ]
+        submitter = threading.Thread(target=self._submit, name="pipeline-submit", daemon=True,
+                                     args=(pool, jobs, slots, nlp_queue, output))
+        started = time.perf_counter()
+        for thread in threads + [submitter]:
+            thread.start()
+
+        total = None
+        received = 0
+        try:
+            while total is None or received < total:
+                message = output.get()
+                if message[0] == "total":
+                    total = message[1]
+                    continue
+                _, key, result = message
+                received += 1
+                slots.release()
+                yield key, result
+        finally:
+            nlp_queue.put(_STOP)
+            pool.shutdown(wait=True, cancel_futures=True)
+            for thread in threads:
+                thread.join()
+            self.wall = time.perf_counter() - started
+
+    def _submit(self, pool, jobs, slots, nlp_queue, output):
+        count = 0
+        extract = self.stats["extract"]
+        for key, path in jobs:
+            slots.acquire()
+            count += 1
+            submitted = time.perf_counter()
+            try:
+                future = pool.submit(_prepare, path)
+            except Exception as e:
+                output.put(("result", key, {"error": f"Ошибка обработки: {e}"}))
+                continue
+            # Очередь извлечения — документы, отданные пулу и ещё не готовые
+            extract.depth(count - extract.docs)
+
+            def done(future, key=key, submitted=submitted):
+                # Исключение из обратного вызова concurrent.futures только
+                # логирует: документ без результата остановил бы run навсегда
+                try:
+                    item, pid, seconds = future.result()
+                    # Ожидание этапа — время от постановки в пул до начала работы
+                    extract.observe(1, seconds, max(0.0, time.perf_counter() - submitted - seconds))
+                    item["pid"] = pid
+                    item["key_"] = key
+                    item["queued"] = time.perf_counter()
+                except Exception as e:
+                    output.put(("result", key, {"error": f"Ошибка обработки: {e}"}))
+                    return
+                if item["result"] is not None:
+                    output.put(("result", key, item["result"]))
+                    return
+                nlp_queue.put(item)
+                self.stats["nlp"].depth(nlp_queue.qsize())
+
+            future.add_done_callback(done)
+        output.put(("total", count))
+
+    def _collect(self, source, size):
+        """
+            Пакет: первый документ ждётся без ограничения, остальные —
+            не дольше batch_timeout. Возвращает (пакет, встречен ли конец).
+        """
+        item = source.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        deadline = time.perf_counter() + self.batch_timeout
+        while len(batch) < size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = source.get(timeout=remaining) if remaining > 0 else source.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _batch_stage(self, stats, source, size, work, meta_key, target, output):
+        while True:
+            batch, stopped = self._collect(source, size)
+            if batch:
+                started = time.perf_counter()
+                try:
+                    work(batch)
+                except Exception as e:
+                    for item in batch:
+                        output.put(("result", item["key_"], {"error": f"Ошибка обработки: {e}"}))
+                    batch = []
+                seconds = time.perf_counter() - started
+                stats.observe(len(batch), seconds, sum(started - item["queued"] for item in batch))
+                for item in batch:
+                    item["meta"]["stages"][stats.name] = round(seconds / len(batch), 6)
+                    item["meta"][meta_key] = len(batch)
+                    item["queued"] = time.perf_counter()
+                    if target is output:
+                        output.put(("result", item["key_"], self._complete(item)))
+                    else:
+                        target.put(item)
+                        self.stats[STAGES[STAGES.index(stats.name) + 1]].depth(target.qsize())
+            if stopped:
+                if target is not output:
+                    target.put(_STOP)
+                return
+
+    def _nlp(self, batch):
+        for item, fields in zip(batch, extract_fields_many([item["text"] for item in batch])):
+            item["fields"] = fields
+
+    def _classify(self, batch):
+        for item, classification in zip(batch, classify_documents([item["text"] for item in batch])):
+            item["classification"] = classification
+
+    def _complete(self, item) -> dict:
+        # Сбой завершения одного документа не должен остановить поток этапа
+        try:
+            return complete_document(item, item["fields"], item["classification"], cache=self.cache,
+                                     near_duplicates=self.near_duplicates, with_text=self.with_text)
+        except Exception as e:
+            return {"error": f"Ошибка обработки: {e}"}
+
+    def report(self) -> list:
+        return [stats.summary(self.wall) for stats in self.stats.values()]
+
+
+def print_report(report: list, wall: float):
+    print(f"Загрузка этапов конвейера (прогон {wall:.2f} с):")
+    print(f"  {'этап':<9} {'исп.':>4} {'док.':>6} {'пакетов':>8} {'ср. пакет':>9} "
+          f"{'занят, с':>9} {'загрузка':>9} {'ожидание, с':>12} {'макс. очередь':>14}")
+    for s in report:
+        print(f"  {s['stage']:<9} {s['workers']:>4} {s['docs']:>6} {s['batches']:>8} {s['mean_batch']:>9} "
+              f"{s['busy_seconds']:>9.2f} {s['utilization'] * 100:>8.0f}% {s['mean_wait_seconds']:>12.3f} "
+              f"{s['max_queue']:>14}")
+    busiest = max(report, key=lambda s: s["utilization"], default=None)
+    if busiest is not None and busiest["docs"]:
+        print(f"  Узкое место: {busiest['stage']} ({busiest['utilization'] * 100:.0f}%)")
@@ -0,0 +1,211 @@
+"""
+Подготовка изображения страницы перед Tesseract: оттенки серого,
+уменьшение до целевого эффективного DPI, обрезка тёмных полей скана,
+выравнивание наклона и бинаризация Оцу. Набор шагов задаётся профилем OCR
+(см. src.core.ocr.PROFILES).
+"""
+
+# Версия кода предобработки — входит в ключ кэша результатов
+PREPROCESS_VERSION = "1"
+
+# Формат, по которому оценивается DPI изображений без метаданных
+# (фотографии с телефона): длинная сторона листа A4, дюймы
+_PAGE_LONG_SIDE_INCHES = 11.69
+# Изображения с DPI выше целевого не более чем на этот коэффициент не уменьшаются
+_DOWNSCALE_SLACK = 1.15
+# Диапазон и шаг поиска угла наклона, градусы
+_SKEW_RANGE = 5.0
+_SKEW_STEP = 0.5
+_SKEW_FINE_STEP = 0.1
+# Ширина уменьшенной копии, на которой ищется угол наклона
+_SKEW_WIDTH = 800
+# Строка или столбец на краю, тёмный более чем на эту долю, считается полем скана
+_BORDER_DARK_FRACTION = 0.5
+# Строка или столбец с меньшей долей тёмных точек считается пустой (шум, пыль)
+_CONTENT_DARK_FRACTION = 0.002
+
+
+def effective_dpi(image) -> float:
+    """
+        DPI из метаданных изображения; если их нет или они явно неверны,
+        DPI оценивается по размеру, считая изображение страницей A4.
+    """
+    dpi = image.info.get("dpi")
+    if dpi:
+        try:
+            value = float(dpi[0])
+            if value >= 50:
+                return value
+        except (TypeError, ValueError, IndexError):
+            pass
+    return max(image.size) / _PAGE_LONG_SIDE_INCHES
+
+
+def to_grayscale(image):
+    if image.mode == "L":
+        return image
+    if image.mode in ("RGBA", "LA", "P"):
+        # Прозрачный фон — белый, а не чёрный
+        from PIL import Image
+        rgba = image.convert("RGBA")
+        background = Image.new("RGBA", rgba.size, (255, 255, 255, 255))
+        image = Image.alpha_composite(background, rgba)
+    return image.convert("L")
+
+
+def downscale(image, target_dpi: int):
+    """
+        Уменьшение до целевого DPI. Изображения меньшего разрешения
+        не увеличиваются.
+    """
+    from PIL import Image
+
+    dpi = effective_dpi(image)
+    if dpi <= target_dpi * _DOWNSCALE_SLACK:
+        return image, dpi
+    scale = target_dpi / dpi
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    return image.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0), float(target_dpi)
+
+
+def otsu_threshold(image) -> int:
+    histogram = image.histogram()[:256]
+    total = sum(histogram)
+    sum_all = sum(i * count for i, count in enumerate(histogram))
+    sum_background = 0.0
+    weight_background = 0
+    best_threshold, best_variance = 127, -1.0
+    for threshold, count in enumerate(histogram):
+        weight_background += count
+        if weight_background == 0:
+            continue
+        weight_foreground = total - weight_background
+        if weight_foreground == 0:
+            break
+        sum_background += threshold * count
+        mean_background = sum_background / weight_background
+        mean_foreground = (sum_all - sum_background) / weight_foreground
+        variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = threshold, variance
+    return best_threshold
+
+
+def binarize(image, threshold: int = None):
+    """
+        Глобальная бинаризация Оцу; результат — изображение "L" из 0 и 255.
+    """
+    if threshold is None:
+        threshold = otsu_threshold(image)
+    lut = [0 if value <= threshold else 255 for value in range(256)]
+    return image.point(lut)
+
+
+def _skew_score(dark, angle):
+    import numpy as np
+    from PIL import Image
+
+    rotated = np.asarray(Image.fromarray(dark).rotate(angle, fillcolor=0))
+    # Строки текста при правильном угле дают резкие пики в профиле строк
+    return float(np.var(rotated.sum(axis=1, dtype=np.int64)))
+
+
+def estimate_skew(image) -> float:
+    """
+        Угол наклона текста в градусах методом проекционного профиля:
+        грубый перебор в ±_SKEW_RANGE, затем уточнение около лучшего угла.
+    """
+    import numpy as np
+
+    small = image
+    if image.width > _SKEW_WIDTH:
+        height = max(1, round(image.height * _SKEW_WIDTH / image.width))
+        small = image.resize((_SKEW_WIDTH, height))
+    threshold = otsu_threshold(small)
+    dark = (np.asarray(small) <= threshold).astype(np.uint8) * 255
+
+    def search(center, span, step):
+        steps = int(round(span / step))
+        angles = [center + step * i for i in range(-steps, steps + 1)]
+        return max(angles, key=lambda angle: _skew_score(dark, angle))
+
+    angle = search(0.0, _SKEW_RANGE, _SKEW_STEP)
+    return search(angle, _SKEW_STEP, _SKEW_FINE_STEP)
+
+
+def deskew(image, min_angle: float = 0.1):
+    from PIL import Image
+
+    angle = estimate_skew(image)
+    if abs(angle) < min_angle:
+        return image
+    return image.rotate(angle, resample=Image.Resampling.BICUBIC, expand=True, fillcolor=255)
+
+
+def crop_borders(image, margin: int = 10):
+    """
+        Обрезка тёмных полей по краям скана и пустого поля вокруг текста.
+    """
+    import numpy as np
+
+    dark = np.asarray(image) <= otsu_threshold(image)
+    rows = dark.mean(axis=1)
+    cols = dark.mean(axis=0)
+
+    top, bottom = 0, len(rows)
+    while top < bottom and rows[top] > _BORDER_DARK_FRACTION:
+        top += 1
+    while bottom > top and rows[bottom - 1] > _BORDER_DARK_FRACTION:
+        bottom -= 1
+    left, right = 0, len(cols)
+    while left < right and cols[left] > _BORDER_DARK_FRACTION:
+        left += 1
+    while right > left and cols[right - 1] > _BORDER_DARK_FRACTION:
+        right -= 1
+
+    # Отдельные точки шума не считаются содержимым
+    inner = dark[top:bottom, left:right]
+    ys = np.flatnonzero(inner.mean(axis=1) > _CONTENT_DARK_FRACTION)
+    xs = np.flatnonzero(inner.mean(axis=0) > _CONTENT_DARK_FRACTION)
+    if len(ys) == 0 or len(xs) == 0:
+        return image
+
+    box = (
+        max(left, left + int(xs[0]) - margin),
+        max(top, top + int(ys[0]) - margin),
+        min(right, left + int(xs[-1]) + 1 + margin),
+        min(bottom, top + int(ys[-1]) + 1 + margin),
+    )
+    if box == (0, 0, image.width, image.height):
+        return image
+    return image.crop(box)
+
+
+def preprocess(image, profile: dict):
+    """
+        Применяет к изображению шаги предобработки из профиля OCR.
+        В info["dpi"] результата записывается эффективное разрешение —
+        Tesseract использует его для оценки размера шрифта. Исходное
+        изображение не изменяется.
+    """
+    if not profile.get("preprocess", True):
+        return image
+
+    original = image
+    dpi = effective_dpi(image)
+    image = to_grayscale(image)
+    if profile.get("downscale", True):
+        image, dpi = downscale(image, profile["dpi"])
+    # Поля обрезаются до выравнивания: после поворота тёмная рамка скана
+    # стала бы наклонной и не распознавалась бы как поле
+    if profile.get("crop"):
+        image = crop_borders(image, margin=max(4, round(dpi / 20)))
+    if profile.get("deskew"):
+        image = deskew(image)
+    if profile.get("binarize"):
+        image = binarize(image)
+    if image is original:
+        # Ни один шаг не создал новое изображение: метаданные пишутся в копию
+        image = original.copy()
+    image.info["dpi"] = (round(dpi), round(dpi))
+    return image
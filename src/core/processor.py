@@ -1,17 +1,130 @@
-from src.core.text_extractor import extract_text
-from src.core.nlp_extractor import extract_fields
-from src.core.classifier import classify_document
+import time
+import zipfile
+from src.core.text_extractor import (
+    extract_document, PageReader, InMemoryFile, normalize_text, summary_method, _join_pages,
+)
+from src.core.nlp_extractor import extract_fields_many
+from src.core.classifier import classify_documents
+from src.core.dedup import page_hashes, text_hash, key_fields, reused
 
+# Этапы обработки в порядке выполнения
+STAGES = ("extract", "nlp", "classify")
 
-def process_document(file_path: str) -> dict:
-    text = extract_text(file_path)
+# Режим раннего выхода: реквизиты, которые должны быть найдены,
+# и минимальная вероятность классификатора, после которых
+# оставшиеся страницы документа не обрабатываются
+EARLY_EXIT_FIELDS = ("sender", "document_date", "document_number")
+EARLY_EXIT_PROB = 0.5
+EARLY_EXIT_FIRST_PAGES = 1
+
+# Документов архива, обрабатываемых одним пакетом (и одновременно
+# находящихся в памяти)
+ARCHIVE_BATCH_SIZE = 8
 
-    if not text:
-        return {"error": "Не удалось извлечь текст из документа"}
 
-    fields = extract_fields(text)
-    classification = classify_document(text)
+def process_document(file_path: str, cache=None, on_stage=None, with_meta=False, early_exit=None,
+                     near_duplicates=None, with_text=False) -> dict:
+    """
+        on_stage(stage, seconds) вызывается после каждого этапа из STAGES.
+    """
+    callback = None
+    if on_stage is not None:
+        callback = lambda index, stage, seconds: on_stage(stage, seconds)
+    return process_documents([file_path], cache=cache, on_stage=callback,
+                             with_meta=with_meta, early_exit=early_exit, near_duplicates=near_duplicates,
+                             with_text=with_text)[0]
 
+
+def _extraction_meta(document, timings: dict, seconds: float) -> dict:
+    pages = document["pages"] if document else []
+    return {
+        "cached": False,
+        "extraction": document["method"] if document else None,
+        "pages": len(pages) if document and document["method"] != "docx" else None,
+        "ocr_pages": sum(1 for page in pages if page["method"] == "ocr"),
+        "extract_steps": {name: round(value, 6) for name, value in timings.items()},
+        "stages": {"extract": round(seconds, 6)},
+    }
+
+
+def _finish_meta(meta: dict) -> dict:
+    meta["seconds"] = round(sum(meta["stages"].values()), 6)
+    return meta
+
+
+def _cached(cache, key: str, with_text: bool):
+    # Текст документа хранится в записи кэша, только если его просили;
+    # запись без текста при with_text считается промахом
+    cached = cache.get(key, required="_text" if with_text else None)
+    if cached is not None and not with_text:
+        cached.pop("_text", None)
+    return cached
+
+
+def process_document_bytes(data: bytes, filename: str = None, mime: str = None, cache=None,
+                           with_meta=False, early_exit=None) -> dict:
+    """
+        Обработка документа из памяти, без записи во временный файл.
+        Формат определяется по сигнатуре содержимого (затем по mime и имени),
+        поэтому имя файла и его расширение необязательны.
+        ZIP-архив обрабатывается целиком, как в process_archive.
+    """
+    source = InMemoryFile(data, filename, mime)
+    if source.suffix == ".zip":
+        return process_archive(source, cache=cache, with_meta=with_meta, early_exit=early_exit)
+    return process_document(source, cache=cache, with_meta=with_meta, early_exit=early_exit)
+
+
+def _is_archive(file_path) -> bool:
+    if isinstance(file_path, InMemoryFile):
+        return file_path.suffix == ".zip"
+    return str(file_path).lower().endswith(".zip")
+
+
+def process_archive(archive, cache=None, with_meta=False, early_exit=None,
+                    batch_size: int = ARCHIVE_BATCH_SIZE, near_duplicates=None, with_text=False) -> dict:
+    """
+        Обработка ZIP-архива документов как одного входа. Файлы архива
+        читаются по одному и обрабатываются пакетами по batch_size,
+        поэтому в памяти одновременно не больше batch_size документов.
+        archive — путь или InMemoryFile. Возвращает
+        {"documents": [{"file": имя в архиве, "result": {...}}, ...]}.
+    """
+    documents = []
+    batch = []
+
+    def flush():
+        results = process_documents([source for source, _ in batch], cache=cache,
+                                    with_meta=with_meta, early_exit=early_exit,
+                                    near_duplicates=near_duplicates, with_text=with_text)
+        for (_, entry), result in zip(batch, results):
+            entry["result"] = result
+        batch.clear()
+
+    try:
+        stream = archive.open() if isinstance(archive, InMemoryFile) else archive
+        with zipfile.ZipFile(stream) as zf:
+            for info in zf.infolist():
+                if info.is_dir():
+                    continue
+                source = InMemoryFile(zf.read(info), info.filename)
+                # Записи добавляются в порядке архива, результат заполняется после пакета
+                entry = {"file": info.filename, "result": None}
+                documents.append(entry)
+                if source.suffix in (None, ".zip"):
+                    entry["result"] = {"error": "Неподдерживаемый формат файла в архиве"}
+                    continue
+                batch.append((source, entry))
+                if len(batch) >= max(1, batch_size):
+                    flush()
+        if batch:
+            flush()
+    except (zipfile.BadZipFile, OSError) as e:
+        return {"error": f"Не удалось прочитать архив: {e}", "documents": documents}
+    return {"documents": documents}
+
+
+def _build_result(fields: dict, classification: dict) -> dict:
     return {
         "document_type": classification.get("label"),
         "sender": fields.get("sender"),
@@ -19,4 +132,299 @@ def process_document(file_path: str) -> dict:
         "document_date": fields.get("document_date"),
         "document_number": fields.get("document_number"),
         "subject": fields.get("subject"),
-    }
\ No newline at end of file
+    }
+
+
+def early_exit_options(fields=None, min_prob=None, first_pages=None) -> dict:
+    return {
+        "fields": tuple(fields) if fields is not None else EARLY_EXIT_FIELDS,
+        "min_prob": EARLY_EXIT_PROB if min_prob is None else min_prob,
+        "first_pages": first_pages or EARLY_EXIT_FIRST_PAGES,
+    }
+
+
+def _early_exit_variant(options: dict) -> str:
+    return f"early:{','.join(options['fields'])}:{options['min_prob']}:{options['first_pages']}"
+
+
+def process_document_early(file_path: str, cache=None, on_stage=None, with_meta=False,
+                           options: dict = None, with_text=False) -> dict:
+    """
+        Обработка с ранним выходом: сначала извлекаются первые страницы
+        (options["first_pages"]), по ним находятся реквизиты и тип документа.
+        Следующие страницы (порциями, каждый раз удваивая прочитанное)
+        обрабатываются, только если не найден один из options["fields"]
+        или вероятность классификатора ниже options["min_prob"].
+        В результат добавляются pages_processed и pages_total.
+    """
+    options = options or early_exit_options()
+    key = None
+    if cache is not None:
+        try:
+            key = cache.key(file_path, variant=_early_exit_variant(options))
+        except OSError:
+            key = None
+        if key is not None:
+            cached = _cached(cache, key, with_text)
+            if cached is not None:
+                return dict(cached, _meta=_finish_meta({"cached": True, "stages": {}})) if with_meta else cached
+
+    stages = {stage: 0.0 for stage in STAGES}
+    timings = {}
+
+    def timed(stage, func, *args):
+        started = time.perf_counter()
+        value = func(*args)
+        seconds = time.perf_counter() - started
+        stages[stage] += seconds
+        if on_stage is not None:
+            on_stage(stage, seconds)
+        return value
+
+    pages = []
+    result = None
+    with PageReader(file_path, timings) as reader:
+        chunk = options["first_pages"]
+        while True:
+            new_pages = timed("extract", reader.read, chunk)
+            if not new_pages:
+                break
+            pages.extend(new_pages)
+            chunk = len(pages)
+
+            text = normalize_text(_join_pages(pages))
+            if not text.strip():
+                continue
+            fields = timed("nlp", extract_fields_many, [text])[0]
+            classification = timed("classify", classify_documents, [text])[0]
+            result = _build_result(fields, classification)
+            if with_text:
+                result["_text"] = text
+            if (all(fields.get(name) for name in options["fields"])
+                    and classification.get("prob", 0.0) >= options["min_prob"]):
+                break
+        total = reader.total
+
+    if result is None:
+        result = {"error": "Не удалось извлечь текст из документа"}
+    else:
+        result["pages_processed"] = len(pages)
+        result["pages_total"] = total
+        if key is not None:
+            cache.put(key, result)
+
+    if with_meta:
+        methods = [method for _, method in pages]
+        meta = {
+            "cached": False,
+            "extraction": summary_method(methods),
+            "pages": total,
+            "ocr_pages": methods.count("ocr"),
+            "extract_steps": {name: round(value, 6) for name, value in timings.items()},
+            "stages": {stage: round(seconds, 6) for stage, seconds in stages.items() if seconds},
+        }
+        result = dict(result, _meta=_finish_meta(meta))
+    return result
+
+
+def process_documents(file_paths: list, cache=None, on_stage=None, with_meta=False, early_exit=None,
+                      near_duplicates=None, with_text=False) -> list:
+    """
+        Обработка пакета документов. Текст извлекается из каждого файла
+        отдельно, а NER и классификация выполняются одним пакетом
+        для всех документов с текстом.
+        on_stage(index, stage, seconds) вызывается после каждого этапа;
+        для пакетных этапов передаётся время всего пакета.
+        with_meta — добавить в каждый результат блок "_meta": способ
+        извлечения, число страниц и страниц OCR, время этапов (для пакетных
+        этапов — доля документа, время пакета делится поровну). В кэш
+        "_meta" не попадает.
+        early_exit — параметры режима раннего выхода (early_exit_options());
+        в этом режиме документы обрабатываются по одному.
+        near_duplicates — индекс почти-дубликатов (src.core.dedup): до OCR
+        документ ищется по pHash страниц, перед NER и классификацией —
+        по SimHash текста; найденный результат возвращается с полем
+        "reused_from" (источник, слой совпадения и расстояние). В режиме
+        раннего выхода индекс не используется: результаты по части
+        страниц с полными не сравнимы.
+        with_text — добавить в результат извлечённый текст ("_text"; None,
+        если документ узнан по изображению до OCR). Текст сохраняется
+        и в кэше; записи кэша без текста в этом режиме пересчитываются.
+        Элементы file_paths — пути или InMemoryFile; ZIP-архивы обрабатываются
+        через process_archive.
+        Возвращает список результатов в порядке file_paths.
+    """
+    if early_exit is not None:
+        results = []
+        for i, file_path in enumerate(file_paths):
+            callback = None
+            if on_stage is not None:
+                callback = lambda stage, seconds, i=i: on_stage(i, stage, seconds)
+            if _is_archive(file_path):
+                results.append(process_archive(file_path, cache=cache, with_meta=with_meta, early_exit=early_exit,
+                                               with_text=with_text))
+                continue
+            results.append(process_document_early(file_path, cache=cache, on_stage=callback,
+                                                  with_meta=with_meta, options=early_exit, with_text=with_text))
+        return results
+
+    results = [None] * len(file_paths)
+    items = {}
+
+    def report(indices, stage, started):
+        seconds = time.perf_counter() - started
+        if on_stage is not None:
+            for i in indices:
+                on_stage(i, stage, seconds)
+        return seconds
+
+    for i, file_path in enumerate(file_paths):
+        if _is_archive(file_path):
+            results[i] = process_archive(file_path, cache=cache, with_meta=with_meta, early_exit=early_exit,
+                                         near_duplicates=near_duplicates, with_text=with_text)
+            continue
+
+        item = prepare_document(file_path, cache=cache, with_meta=with_meta, near_duplicates=near_duplicates,
+                                with_text=with_text)
+        if item["extract_seconds"] is not None and on_stage is not None:
+            on_stage(i, "extract", item["extract_seconds"])
+        if item["result"] is not None:
+            results[i] = item["result"]
+            continue
+        items[i] = item
+
+    if not items:
+        return results
+
+    pending = list(items)
+    texts = [items[i]["text"] for i in pending]
+
+    started = time.perf_counter()
+    fields_list = extract_fields_many(texts)
+    nlp_seconds = report(pending, "nlp", started)
+
+    started = time.perf_counter()
+    classifications = classify_documents(texts)
+    classify_seconds = report(pending, "classify", started)
+
+    for i, fields, classification in zip(pending, fields_list, classifications):
+        meta = items[i]["meta"]
+        if meta is not None:
+            meta["batch_size"] = len(pending)
+            meta["stages"]["nlp"] = round(nlp_seconds / len(pending), 6)
+            meta["stages"]["classify"] = round(classify_seconds / len(pending), 6)
+        results[i] = complete_document(items[i], fields, classification, cache=cache,
+                                       near_duplicates=near_duplicates, with_text=with_text)
+
+    return results
+
+
+def prepare_document(file_path, cache=None, with_meta=False, near_duplicates=None, with_text=False) -> dict:
+    """
+        Всё, что предшествует NER и классификации, для одного документа
+        (не архива): поиск в кэше и в индексе почти-дубликатов, извлечение
+        текста. Возвращает словарь:
+          "result"          — готовый результат (из кэша, от почти-дубликата
+                              или ошибка извлечения; с "_meta" при with_meta)
+                              либо None, если нужны NER и классификация;
+          "text", "meta"    — текст и блок "_meta" для complete_document;
+          "key", "image", "simhash", "source" — ключ кэша и сигнатуры
+                              для сохранения результата;
+          "extract_seconds" — время этапа extract (None — попадание в кэш).
+        with_text — как в process_documents.
+        Словарь передаётся между процессами, поэтому в нём только простые типы.
+    """
+    item = {"result": None, "text": None, "meta": None, "key": None, "image": None,
+            "simhash": None, "source": str(file_path), "extract_seconds": None}
+
+    def done(result, meta):
+        item["result"] = dict(result, _meta=_finish_meta(meta)) if with_meta else result
+        return item
+
+    def reuse(match, text=None):
+        result = reused(match)
+        if with_text:
+            result["_text"] = text
+        if item["key"] is not None:
+            cache.put(item["key"], result)
+        return result
+
+    if cache is not None:
+        try:
+            item["key"] = cache.key(file_path)
+        except OSError:
+            item["key"] = None
+        if item["key"] is not None:
+            cached = _cached(cache, item["key"], with_text)
+            if cached is not None:
+                return done(cached, {"cached": True, "stages": {}})
+
+    started = time.perf_counter()
+    timings = {} if with_meta else None
+    if near_duplicates is not None and near_duplicates.image_distance is not None:
+        # Скан, похожий на уже обработанный, не проходит OCR
+        step = time.perf_counter()
+        item["image"] = page_hashes(file_path)
+        verify = {}
+
+        def first_page_fields():
+            # Шаблонные письма различаются номером и датой: они сверяются
+            # по первой странице, распознанной отдельно
+            verify_step = time.perf_counter()
+            with PageReader(file_path) as reader:
+                text = normalize_text(_join_pages(reader.read(1)))
+            verify["verify"] = time.perf_counter() - verify_step
+            return key_fields(text)
+
+        match = near_duplicates.match_image(item["image"], fields=first_page_fields)
+        steps = {"phash": time.perf_counter() - step - verify.get("verify", 0.0), **verify}
+        if timings is not None:
+            timings.update(steps)
+        if match is not None:
+            item["extract_seconds"] = seconds = time.perf_counter() - started
+            return done(reuse(match), {"cached": False, "reused": "image", "extraction": "near_duplicate",
+                                       "pages": len(item["image"]),
+                                       "extract_steps": {name: round(value, 6) for name, value in steps.items()},
+                                       "stages": {"extract": round(seconds, 6)}})
+
+    document = extract_document(file_path, timings)
+    text = document["text"] if document else None
+    item["extract_seconds"] = seconds = time.perf_counter() - started
+    meta = _extraction_meta(document, timings, seconds) if with_meta else None
+
+    if not text:
+        return done({"error": "Не удалось извлечь текст из документа"}, meta)
+
+    if near_duplicates is not None:
+        item["simhash"] = text_hash(text)
+        match = near_duplicates.match_text(item["simhash"], fields=key_fields(text))
+        if match is not None:
+            # Сигнатура скана привязывается к найденному результату
+            near_duplicates.add(item["source"], None, image=item["image"], document_id=match["document_id"])
+            if with_meta:
+                meta["reused"] = "text"
+            return done(reuse(match, text), meta)
+
+    item["text"] = text
+    item["meta"] = meta
+    return item
+
+
+def complete_document(item: dict, fields: dict, classification: dict, cache=None, near_duplicates=None,
+                      with_text=False) -> dict:
+    """
+        Результат документа из prepare_document по реквизитам и классификации:
+        сохраняется в кэш и индекс почти-дубликатов, при наличии item["meta"]
+        к нему добавляется "_meta" (время этапов nlp и classify заполняет
+        вызывающий).
+    """
+    result = _build_result(fields, classification)
+    if near_duplicates is not None:
+        near_duplicates.add(item["source"], result, image=item["image"], text=item["simhash"])
+    if with_text:
+        result["_text"] = item["text"]
+    if item["key"] is not None:
+        cache.put(item["key"], result)
+    if item["meta"] is not None:
+        result = dict(result, _meta=_finish_meta(item["meta"]))
+    return result
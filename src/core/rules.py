@@ -0,0 +1,168 @@
+"""
+Правила извлечения реквизитов: описываются в JSON (src/core/field_rules.json
+или файл из переменной окружения TEXTSCANNER_FIELD_RULES), компилируются
+один раз и применяются за один проход по строкам текста.
+
+Виды правил:
+  headers        — строка-заголовок реквизита. action "block": значение —
+                   текст после двоеточия и следующие строки до пустой строки
+                   или границы блока (уходит в NER); "inline": текст после
+                   двоеточия, а без двоеточия — следующая строка.
+  block_boundary — строки, на которых обрывается блок.
+  fallback_block — реквизит, который берётся из первого блока документа,
+                   если его заголовок так и не встретился до этого места.
+  values         — значения, найденные регулярным выражением (первое
+                   совпадение в тексте); label_only — строка, где есть только
+                   метка, а значение перенесено на следующую строку.
+"""
+import os
+import re
+import json
+import threading
+
+RULES_PATH = os.environ.get("TEXTSCANNER_FIELD_RULES") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "field_rules.json"
+)
+
+
+def _alternation(pattern) -> str:
+    if isinstance(pattern, str):
+        return pattern
+    return "|".join(f"({p})" for p in pattern)
+
+
+class _ValueRule:
+    def __init__(self, spec: dict):
+        self.field = spec["field"]
+        self.regex = re.compile(_alternation(spec["pattern"]), re.IGNORECASE)
+        self.label_only = re.compile(spec["label_only"], re.IGNORECASE) if spec.get("label_only") else None
+        self.strip = spec.get("strip")
+
+    def value(self, match) -> str:
+        groups = [g for g in match.groups() if g]
+        value = (groups[0] if groups else match.group(0)).strip()
+        return value.strip(self.strip) if self.strip else value
+
+
+class RuleSet:
+    def __init__(self, spec: dict):
+        self.fields = list(spec["fields"])
+        self.headers = [(h["field"], h["action"]) for h in spec["headers"]]
+        # Заголовки проверяются одним выражением: альтернативы перебираются
+        # по порядку, поэтому приоритет правил сохраняется
+        self._header_re = re.compile(
+            "|".join(f"(?P<h{i}>{h['pattern']})" for i, h in enumerate(spec["headers"])), re.IGNORECASE
+        )
+        self._boundary_re = re.compile(spec["block_boundary"], re.IGNORECASE)
+        self.fallback = spec.get("fallback_block")
+        self.values = [_ValueRule(v) for v in spec.get("values", [])]
+        for field, _ in self.headers:
+            if field not in self.fields:
+                self.fields.append(field)
+        for rule in self.values:
+            if rule.field not in self.fields:
+                self.fields.append(rule.field)
+
+    @classmethod
+    def load(cls, path: str = RULES_PATH) -> "RuleSet":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _header(self, line: str):
+        match = self._header_re.match(line)
+        return self.headers[int(match.lastgroup[1:])] if match else None
+
+    def scan(self, text: str):
+        """
+            Разбор текста без NER за один проход по строкам.
+            Возвращает словарь результата (поля блоков — None) и список пар
+            (поле, текст блока) в порядке строк, которые ещё нужно пропустить
+            через NER; более поздний блок перекрывает ранний.
+        """
+        lines = [line.strip() for line in text.splitlines()]
+        start, end = 0, len(lines)
+        while start < end and lines[start] == "":
+            start += 1
+        while end > start and lines[end - 1] == "":
+            end -= 1
+        lines = lines[start:end]
+        count = len(lines)
+
+        result = {field: None for field in self.fields}
+        result["content_summary"] = None
+
+        # Классификация строк одним проходом с конца: заголовок реквизита
+        # и stop[i] — первая строка не раньше i, на которой обрывается блок
+        headers = [None] * count
+        stop = [count] * (count + 1)
+        for i in range(count - 1, -1, -1):
+            line = lines[i]
+            if line == "":
+                stop[i] = i
+                continue
+            headers[i] = self._header(line)
+            stop[i] = i if self._boundary_re.match(line) else stop[i + 1]
+
+        # Значения — первое совпадение в тексте: поиск по строкам
+        # прекращается, как только найдены все
+        values = {}
+        pending = self.values
+        for i, line in enumerate(lines):
+            if not pending:
+                break
+            for rule in pending:
+                match = rule.regex.search(line)
+                if match is None and rule.label_only is not None and i + 1 < count \
+                        and rule.label_only.search(line):
+                    match = rule.regex.search(f"{line} {lines[i + 1]}")
+                if match is not None:
+                    values[rule.field] = rule.value(match)
+            if values:
+                pending = [rule for rule in pending if rule.field not in values]
+
+        def tail(i):
+            if i < 0 or ":" not in lines[i]:
+                return []
+            after = lines[i].split(":", 1)[1].strip()
+            return [after] if after else []
+
+        assignments = []
+        fallback_found = self.fallback is None
+        for i in range(count):
+            header = headers[i]
+            if header is not None:
+                field, action = header
+                if action == "block":
+                    block = tail(i) + lines[i + 1:stop[i + 1]]
+                    if block:
+                        assignments.append((field, " ".join(block)))
+                        if field == self.fallback:
+                            fallback_found = True
+                elif ":" in lines[i]:
+                    result[field] = lines[i].split(":", 1)[1].strip()
+                elif i + 1 < count and lines[i + 1]:
+                    result[field] = lines[i + 1]
+            elif not fallback_found:
+                # Первый блок без заголовка (бланк, шапка письма)
+                block = tail(i - 1) + lines[i:stop[i]]
+                if block:
+                    assignments.append((self.fallback, " ".join(block)))
+                    fallback_found = True
+
+        result.update(values)
+        return result, assignments
+
+
+_rules = None
+_lock = threading.Lock()
+
+
+def get_rules() -> RuleSet:
+    """
+        Правила загружаются и компилируются при первом обращении.
+    """
+    global _rules
+    with _lock:
+        if _rules is None:
+            _rules = RuleSet.load()
+    return _rules
@@ -1,31 +1,150 @@
-import os
+import io
 import logging
+import zipfile
 from pathlib import Path
-import sys
-from pdf2image import convert_from_path
-import pytesseract
-import fitz
-import pdfplumber
-from docx import Document
-from PIL import Image
 import re
+import time
+import threading
+from contextlib import contextmanager
+from src.core.ocr import ocr_pages, recognize, get_profile
+from src.core.docx_reader import read_docx_text
 
-# Указать путь к tesseract.exe
-# pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+# Тяжёлые библиотеки (PyMuPDF, pdfplumber, pdf2image, python-docx, Pillow)
+# импортируются внутри функций — при первом документе, которому они нужны.
 
-def resource_path(relative_path: str) -> str:
+# Версия кода извлечения текста. Увеличивается при любом изменении,
+# влияющем на результат, — входит в ключ кэша результатов.
+EXTRACTOR_VERSION = "5"
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tiff', '.bmp')
+# Расширения входных файлов, которые принимают CLI и интерфейс
+SUPPORTED_EXTENSIONS = ('.docx', '.pdf') + IMAGE_EXTENSIONS + ('.zip',)
+
+# Сигнатуры форматов в начале файла
+_MAGIC = (
+    (b"%PDF-", ".pdf"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"II*\x00", ".tiff"),
+    (b"MM\x00*", ".tiff"),
+    (b"BM", ".bmp"),
+)
+_MIME_TYPES = {
+    "application/pdf": ".pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": ".docx",
+    "application/zip": ".zip",
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/tiff": ".tiff",
+    "image/bmp": ".bmp",
+}
+
+
+def is_supported(filename: str) -> bool:
+    return str(filename).lower().endswith(SUPPORTED_EXTENSIONS)
+
+
+def detect_format(data: bytes, filename: str = None, mime: str = None):
     """
-    Возвращает корректный путь:
-    - при обычном запуске → из папки проекта
-    - при запуске exe (PyInstaller) → из _MEIPASS
+    Формат содержимого по сигнатуре; если она не распознана — по MIME-типу,
+    затем по расширению имени файла. DOCX отличается от обычного ZIP
+    наличием word/document.xml. Возвращает расширение (".pdf", ".docx",
+    ".zip", ".png", ...) или None.
     """
-    base_path = getattr(sys, "_MEIPASS", os.path.abspath("."))
-    return os.path.join(base_path, relative_path)
+    return _detect(bytes(data[:1024]), lambda: io.BytesIO(data), filename, mime)
 
 
-pytesseract.pytesseract.tesseract_cmd = resource_path(
-    os.path.join("tesseract", "tesseract.exe")
-)
+def detect_file_format(path, filename: str = None, mime: str = None):
+    """
+    То же для файла на диске: читается только начало файла
+    (и оглавление, если это ZIP).
+    """
+    with open(path, "rb") as f:
+        head = f.read(1024)
+    return _detect(head, lambda: path, filename, mime)
+
+
+def _detect(head: bytes, archive, filename, mime):
+    for magic, ext in _MAGIC:
+        if head.startswith(magic):
+            return ext
+    # Перед %PDF- допускается мусор в первом килобайте
+    if b"%PDF-" in head:
+        return ".pdf"
+    if head.startswith(b"PK\x03\x04"):
+        try:
+            with zipfile.ZipFile(archive()) as zf:
+                names = set(zf.namelist())
+        except zipfile.BadZipFile:
+            return None
+        return ".docx" if "word/document.xml" in names else ".zip"
+
+    if mime:
+        ext = _MIME_TYPES.get(mime.split(";")[0].strip().lower())
+        if ext:
+            return ext
+    if filename:
+        ext = Path(filename).suffix.lower()
+        if ext in IMAGE_EXTENSIONS + ('.pdf', '.docx', '.zip'):
+            return ext
+    return None
+
+
+class InMemoryFile:
+    """
+    Документ, полученный в виде байтов (из очереди, хранилища, архива),
+    вместо пути к файлу. suffix определяется по содержимому, str() —
+    имя для сообщений об ошибках.
+    """
+
+    def __init__(self, data: bytes, name: str = None, mime: str = None):
+        self.data = data
+        self.name = name or "<bytes>"
+        self.suffix = detect_format(data, name, mime)
+
+    def open(self):
+        return io.BytesIO(self.data)
+
+    def __str__(self):
+        return self.name
+
+
+def _binary(source):
+    # Путь или поток в памяти — то, что принимают Pillow, pdfplumber и python-docx
+    return source.open() if isinstance(source, InMemoryFile) else source
+
+
+# PyMuPDF не потокобезопасен: обращения к нему из разных потоков
+# (интерфейс обрабатывает несколько документов сразу) выполняются
+# по одному. OCR идёт вне блокировки.
+_pdf_lock = threading.RLock()
+
+
+def _open_pdf(source):
+    import fitz
+
+    if isinstance(source, InMemoryFile):
+        return fitz.open(stream=source.data, filetype="pdf")
+    return fitz.open(source)
+
+
+@contextmanager
+def _pdf_document(source):
+    # Открытие и закрытие — под блокировкой, работа со страницами
+    # вызывающий сам оборачивает в _pdf_lock
+    with _pdf_lock:
+        doc = _open_pdf(source)
+    try:
+        yield doc
+    finally:
+        with _pdf_lock:
+            doc.close()
+
+
+def _add_time(timings, name, started):
+    # timings — необязательный словарь «подэтап -> секунды» для _meta результата
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
 
 
 def normalize_text(text):
@@ -34,43 +153,170 @@ def normalize_text(text):
     return re.sub(r'\n{2,}', '\n', text)
 
 
-# OCR для изображений
-def ocr_image(image_path):
+def _pdf_pages(pdf_path):
+    from pdf2image import convert_from_path, pdfinfo_from_path, convert_from_bytes, pdfinfo_from_bytes
+
+    if isinstance(pdf_path, InMemoryFile):
+        pages = pdfinfo_from_bytes(pdf_path.data)["Pages"]
+        convert = lambda **kwargs: convert_from_bytes(pdf_path.data, **kwargs)
+    else:
+        pages = pdfinfo_from_path(pdf_path)["Pages"]
+        convert = lambda **kwargs: convert_from_path(pdf_path, **kwargs)
+    dpi = get_profile()["dpi"]
+
+    def load(number):
+        image = convert(
+            dpi=dpi, first_page=number, last_page=number, grayscale=True
+        )[0]
+        image.info["dpi"] = (dpi, dpi)
+        return image
+
+    for number in range(1, pages + 1):
+        yield lambda number=number: load(number)
+
+
+def _image_frames(image):
+    from PIL import ImageSequence
+
+    for frame in ImageSequence.Iterator(image):
+        # Кадры многостраничного TIFF читаются из одного файла последовательно,
+        # поэтому копия кадра снимается здесь, а не в потоке OCR.
+        yield lambda frame=frame.copy(): frame
+
+
+# OCR для изображений (все кадры многостраничного TIFF)
+def ocr_image_pages(image_path):
+    from PIL import Image
+
     try:
-        text = pytesseract.image_to_string(Image.open(image_path), lang='rus')
-        return text
+        with Image.open(_binary(image_path)) as image:
+            if getattr(image, "n_frames", 1) > 1:
+                return ocr_pages(_image_frames(image))
+            return [recognize(image)]
     except Exception as e:
         logging.error(f"OCR failed for {image_path}: {e}")
         return None
 
-# OCR для PDF без текста
+
+def _join_frames(texts):
+    if len(texts) == 1:
+        return texts[0]
+    return "".join(text + "\n" for text in texts)
+
+
+def ocr_image(image_path):
+    texts = ocr_image_pages(image_path)
+    if texts is None:
+        return None
+    return _join_frames(texts)
+
+# OCR для PDF без текста (через poppler — запасной путь, если PyMuPDF не открыл файл)
 def ocr_pdf(pdf_path):
     try:
-        images = convert_from_path(pdf_path)
-        full_text = ""
-        for i, img in enumerate(images):
-            text = pytesseract.image_to_string(img, lang='rus')
-            full_text += text + "\n"
-        return full_text
+        return "".join(text + "\n" for text in ocr_pages(_pdf_pages(pdf_path)))
     except Exception as e:
         logging.error(f"OCR PDF failed for {pdf_path}: {e}")
         return None
 
-# Прямое извлечение текста из PDF
+
+# Минимальное число букв и цифр, при котором текстовый слой страницы
+# считается содержательным; иначе страница распознаётся через OCR.
+MIN_PAGE_CHARS = 20
+
+
+def has_text_layer(page_text) -> bool:
+    count = 0
+    for ch in page_text:
+        if ch.isalnum():
+            count += 1
+            if count >= MIN_PAGE_CHARS:
+                return True
+    return False
+
+
+def _pixmap_pages(doc, numbers):
+    import fitz
+    from PIL import Image
+
+    # Страницы отрисовываются сразу в разрешении профиля OCR
+    dpi = get_profile()["dpi"]
+    for number in numbers:
+        # PyMuPDF не потокобезопасен: страница отрисовывается здесь,
+        # в потоки OCR уходит уже готовое изображение.
+        with _pdf_lock:
+            pix = doc[number].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+            image = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+        image.info["dpi"] = (dpi, dpi)
+        yield lambda image=image: image
+
+
+def extract_pdf_pages(pdf_path, timings=None):
+    """
+    Постраничное извлечение текста из PDF за одно открытие файла.
+    Страницы с содержательным текстовым слоем берутся как есть,
+    остальные отрисовываются PyMuPDF и распознаются через OCR.
+    Возвращает список пар (текст страницы, "text" | "ocr").
+    """
+    started = time.perf_counter()
+    with _pdf_document(pdf_path) as doc:
+        pages = []
+        ocr_numbers = []
+        with _pdf_lock:
+            for number, page in enumerate(doc):
+                page_text = page.get_text()
+                if has_text_layer(page_text):
+                    pages.append((page_text, "text"))
+                else:
+                    pages.append(None)
+                    ocr_numbers.append(number)
+        _add_time(timings, "text_layer", started)
+
+        if ocr_numbers:
+            started = time.perf_counter()
+            texts = ocr_pages(_pixmap_pages(doc, ocr_numbers))
+            for number, text in zip(ocr_numbers, texts):
+                pages[number] = (text, "ocr")
+            _add_time(timings, "ocr", started)
+
+    return pages
+
+
+def _pdf_fallback(pdf_path, timings=None):
+    # PyMuPDF не смог открыть файл: пробуем pdfplumber, затем OCR через poppler
+    started = time.perf_counter()
+    try:
+        import pdfplumber
+        with pdfplumber.open(_binary(pdf_path)) as pdf:
+            pages = [(page.extract_text() or "", "pdfplumber") for page in pdf.pages]
+        if any(text.strip() for text, _ in pages):
+            return pages
+    except Exception as e:
+        logging.error(f"pdfplumber failed for {pdf_path}: {e}")
+    finally:
+        _add_time(timings, "pdfplumber", started)
+
+    started = time.perf_counter()
+    text = ocr_pdf(pdf_path)
+    _add_time(timings, "ocr", started)
+    return [(text, "ocr")] if text else None
+
+
+def _join_pages(pages):
+    return "".join(text + "\n" for text, _ in pages if text.strip())
+
+
+# Прямое извлечение текста из PDF: только текстовый слой (PyMuPDF,
+# затем pdfplumber), без OCR — постраничный выбор OCR в extract_pdf_pages
 def extract_text_pdf(pdf_path):
     try:
-        text = ""
-        with fitz.open(pdf_path) as doc:
-            for page in doc:
-                page_text = page.get_text()
-                if page_text.strip():
-                    text += page_text + "\n"
+        with _pdf_lock, _open_pdf(pdf_path) as doc:
+            text = "".join(page_text + "\n" for page_text in (page.get_text() for page in doc)
+                           if page_text.strip())
         if not text.strip():
-            with pdfplumber.open(pdf_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
+            import pdfplumber
+            with pdfplumber.open(_binary(pdf_path)) as pdf:
+                text = "".join(page_text + "\n" for page_text in (page.extract_text() for page in pdf.pages)
+                               if page_text)
         return text if text.strip() else None
     except Exception as e:
         logging.error(f"PDF extraction failed for {pdf_path}: {e}")
@@ -78,36 +324,209 @@ def extract_text_pdf(pdf_path):
 
 # Извлечение текста из DOCX
 def extract_text_docx(docx_path):
+    # Потоковый разбор XML (с таблицами, надписями и колонтитулами);
+    # python-docx — запасной путь для файлов, которые он не осилил
+    try:
+        text = read_docx_text(_binary(docx_path))
+        return text if text.strip() else None
+    except Exception as e:
+        logging.error(f"DOCX streaming extraction failed for {docx_path}: {e}")
+    return extract_text_docx_legacy(docx_path)
+
+
+def extract_text_docx_legacy(docx_path):
     try:
-        doc = Document(docx_path)
+        from docx import Document
+        doc = Document(_binary(docx_path))
         text = "\n".join([p.text for p in doc.paragraphs])
         return text if text.strip() else None
     except Exception as e:
         logging.error(f"DOCX extraction failed for {docx_path}: {e}")
         return None
 
-# Основная функция
-def extract_text(file_path):
-    file_path = Path(file_path)
-    if not file_path.exists():
-        logging.error(f"File not found: {file_path}")
+
+def _page_methods(methods):
+    return [{"page": number, "method": method} for number, method in enumerate(methods, start=1)]
+
+
+def extract_document(file_path, timings=None):
+    """
+    Извлечение текста с описанием того, как он получен:
+    {
+      "text": str,
+      "method": "text" | "ocr" | "mixed" | "pdfplumber" | "docx",
+      "pages": [{"page": 1, "method": "text" | "ocr" | ...}, ...]
+    }
+    file_path — путь или InMemoryFile.
+    Если передан словарь timings, в него добавляется время подэтапов
+    ("text_layer", "ocr", "pdfplumber", "docx") в секундах.
+    Возвращает None, если файл не найден или тип не поддерживается.
+    """
+    file_path, ext = _resolve(file_path)
+    if ext is None:
         return None
 
-    ext = file_path.suffix.lower()
-    if ext in ['.png', '.jpg', '.jpeg', '.tiff', '.bmp']:
-        return normalize_text(ocr_image(file_path))
+    if ext in IMAGE_EXTENSIONS:
+        started = time.perf_counter()
+        texts = ocr_image_pages(file_path) or []
+        _add_time(timings, "ocr", started)
+        text = _join_frames(texts)
+        methods = ["ocr"] * len(texts)
     elif ext == '.pdf':
-        text = extract_text_pdf(file_path)
-        if text:
-            return normalize_text(text)
-        else:
-            return normalize_text(ocr_pdf(file_path))
+        try:
+            pages = extract_pdf_pages(file_path, timings)
+        except Exception as e:
+            logging.error(f"PDF extraction failed for {file_path}: {e}")
+            pages = _pdf_fallback(file_path, timings) or []
+        text = _join_pages(pages)
+        methods = [method for _, method in pages]
     elif ext == '.docx':
-        return normalize_text(extract_text_docx(file_path))
+        started = time.perf_counter()
+        text = extract_text_docx(file_path)
+        _add_time(timings, "docx", started)
+        return {"text": normalize_text(text), "method": "docx", "pages": []}
     else:
         logging.error(f"Unsupported file type: {file_path}")
         return None
 
+    return {"text": normalize_text(text), "method": summary_method(methods), "pages": _page_methods(methods)}
+
+
+def _resolve(file_path):
+    # (источник, расширение); расширение None — файл не найден
+    if isinstance(file_path, InMemoryFile):
+        return file_path, file_path.suffix or ""
+    file_path = Path(file_path)
+    if not file_path.exists():
+        logging.error(f"File not found: {file_path}")
+        return file_path, None
+    return file_path, file_path.suffix.lower()
+
+
+def summary_method(methods):
+    kinds = set(methods)
+    return kinds.pop() if len(kinds) == 1 else ("mixed" if kinds else None)
+
+
+class PageReader:
+    """
+    Постраничное чтение документа для режима раннего выхода:
+    read(count) извлекает (и при необходимости распознаёт) только следующие
+    count страниц. Страницы одной порции распознаются параллельно.
+    DOCX отдаётся целиком как одна страница — его разбор дешёвый.
+    total — число страниц документа (0, если файл не удалось открыть).
+    """
+
+    def __init__(self, file_path, timings=None):
+        self.file_path, ext = _resolve(file_path)
+        self.timings = timings
+        self.total = 0
+        self.position = 0
+        self._doc = None
+        self._image = None
+        self._pages = None
+
+        if ext is None:
+            return
+
+        if ext == '.pdf':
+            try:
+                with _pdf_lock:
+                    self._doc = _open_pdf(self.file_path)
+                    self.total = self._doc.page_count
+            except Exception as e:
+                logging.error(f"PDF extraction failed for {self.file_path}: {e}")
+                self._pages = _pdf_fallback(self.file_path, timings) or []
+        elif ext in IMAGE_EXTENSIONS:
+            from PIL import Image
+            try:
+                self._image = Image.open(_binary(self.file_path))
+                self.total = getattr(self._image, "n_frames", 1)
+            except Exception as e:
+                logging.error(f"OCR failed for {self.file_path}: {e}")
+        elif ext == '.docx':
+            started = time.perf_counter()
+            text = extract_text_docx(self.file_path)
+            _add_time(timings, "docx", started)
+            self._pages = [(text, "docx")] if text else []
+        else:
+            logging.error(f"Unsupported file type: {self.file_path}")
+
+        if self._pages is not None:
+            self.total = len(self._pages)
+
+    def read(self, count: int) -> list:
+        start, end = self.position, min(self.position + max(1, count), self.total)
+        if start >= end:
+            return []
+        self.position = end
+        try:
+            if self._pages is not None:
+                return self._pages[start:end]
+            if self._doc is not None:
+                return self._read_pdf(start, end)
+            return self._read_frames(start, end)
+        except Exception as e:
+            logging.error(f"Page extraction failed for {self.file_path}: {e}")
+            self.position = self.total
+            return []
+
+    def _read_pdf(self, start, end):
+        started = time.perf_counter()
+        pages = []
+        ocr_numbers = []
+        with _pdf_lock:
+            for number in range(start, end):
+                page_text = self._doc[number].get_text()
+                if has_text_layer(page_text):
+                    pages.append((page_text, "text"))
+                else:
+                    pages.append(None)
+                    ocr_numbers.append(number)
+        _add_time(self.timings, "text_layer", started)
+
+        if ocr_numbers:
+            started = time.perf_counter()
+            texts = ocr_pages(_pixmap_pages(self._doc, ocr_numbers))
+            for number, text in zip(ocr_numbers, texts):
+                pages[number - start] = (text, "ocr")
+            _add_time(self.timings, "ocr", started)
+        return pages
+
+    def _read_frames(self, start, end):
+        started = time.perf_counter()
+        if self.total == 1:
+            texts = [recognize(self._image)]
+        else:
+            def frames():
+                for number in range(start, end):
+                    self._image.seek(number)
+                    yield lambda frame=self._image.copy(): frame
+            texts = ocr_pages(frames())
+        _add_time(self.timings, "ocr", started)
+        return [(text, "ocr") for text in texts]
+
+    def close(self):
+        if self._doc is not None:
+            with _pdf_lock:
+                self._doc.close()
+        if self._image is not None:
+            self._image.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Основная функция
+def extract_text(file_path):
+    document = extract_document(file_path)
+    if document is None:
+        return None
+    return document["text"]
+
 # # Настройка логирования
 # logging.basicConfig(
 #     filename='logs/text_extractor.log',
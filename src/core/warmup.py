@@ -0,0 +1,71 @@
+import importlib
+import time
+
+
+def _load_spacy_model():
+    from src.core.nlp_extractor import get_nlp
+    get_nlp()
+
+
+def _load_classifier():
+    from src.core.classifier import _load_resources
+    _load_resources()
+
+
+def _load_ocr_engine():
+    from src.core.ocr import get_engine
+    get_engine()
+
+
+# (название, действие). Порядок важен: сначала импорт библиотеки,
+# затем загрузка модели, чтобы время каждого этапа считалось отдельно.
+LIBRARIES = [
+    ("PyMuPDF", lambda: importlib.import_module("fitz")),
+    ("pdfplumber", lambda: importlib.import_module("pdfplumber")),
+    ("pdf2image", lambda: importlib.import_module("pdf2image")),
+    ("python-docx", lambda: importlib.import_module("docx")),
+    ("Pillow", lambda: importlib.import_module("PIL.Image")),
+    ("OCR engine", _load_ocr_engine),
+    ("spaCy (import)", lambda: importlib.import_module("spacy")),
+    ("scikit-learn (import)", lambda: importlib.import_module("sklearn")),
+]
+
+MODELS = [
+    ("spaCy model", _load_spacy_model),
+    ("classifier model", _load_classifier),
+]
+
+
+def warm_up(components=None) -> list:
+    """
+        Заранее импортирует библиотеки и загружает модели.
+        Возвращает список (название, секунды, ошибка или None).
+        Уже загруженные компоненты занимают ~0 с.
+    """
+    if components is None:
+        components = LIBRARIES + MODELS
+
+    timings = []
+    for name, action in components:
+        start = time.perf_counter()
+        error = None
+        try:
+            action()
+        except Exception as e:
+            error = str(e)
+        timings.append((name, time.perf_counter() - start, error))
+    return timings
+
+
+def warm_models() -> list:
+    return warm_up(MODELS)
+
+
+def print_profile(timings: list, title: str = "Профиль запуска"):
+    print(f"{title}:")
+    for name, seconds, error in timings:
+        line = f"  {name:<24} {seconds * 1000:9.1f} мс"
+        if error:
+            line += f"  (ошибка: {error})"
+        print(line)
+    print(f"  {'Итого':<24} {sum(t for _, t, _ in timings) * 1000:9.1f} мс")
@@ -0,0 +1,149 @@
+import os
+import json
+import logging
+from src.core.cache import file_hash
+
+MANIFEST_NAME = ".manifest.json"
+
+
+def manifest_name(label: str = None) -> str:
+    """
+        Имя файла манифеста; у каждой доли (src.traversal.shard_name) свой манифест.
+    """
+    return f".manifest.{label}.json" if label else MANIFEST_NAME
+
+
+class Manifest:
+    """
+        Манифест обработанных файлов в папке результатов:
+        путь -> размер, mtime и хэш содержимого.
+        Файл считается изменённым, только если изменилось содержимое:
+        при совпадении размера и mtime хэш не пересчитывается.
+    """
+
+    def __init__(self, output_folder: str, name: str = MANIFEST_NAME):
+        self.path = os.path.join(output_folder, name)
+        self.entries = {}
+        self._pending = {}
+        path = self.path
+        if name != MANIFEST_NAME and not os.path.exists(path):
+            # Первый запуск доли после merge: начинаем с общего манифеста
+            path = os.path.join(output_folder, MANIFEST_NAME)
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.error(f"Manifest is unreadable, starting from scratch: {path}: {e}")
+
+    def needs_processing(self, key: str, file_path: str) -> bool:
+        st = os.stat(file_path)
+        entry = self.entries.get(key)
+        if entry and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime_ns:
+            return False
+
+        sha = file_hash(file_path)
+        if entry and entry["sha256"] == sha:
+            # Файл «потрогали», но содержимое прежнее
+            entry["size"], entry["mtime"] = st.st_size, st.st_mtime_ns
+            return False
+
+        # Запоминаем состояние файла на момент проверки: если он изменится
+        # во время обработки, следующий запуск это заметит.
+        self._pending[key] = {"size": st.st_size, "mtime": st.st_mtime_ns, "sha256": sha}
+        return True
+
+    def record(self, key: str, file_path: str):
+        entry = self._pending.pop(key, None)
+        if entry is None:
+            st = os.stat(file_path)
+            entry = {"size": st.st_size, "mtime": st.st_mtime_ns, "sha256": file_hash(file_path)}
+        self.entries[key] = entry
+
+    def save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+JOURNAL_NAME = ".journal.jsonl"
+QUARANTINE_NAME = ".quarantine.jsonl"
+
+
+def journal_name(label: str = None) -> str:
+    return f".journal.{label}.jsonl" if label else JOURNAL_NAME
+
+
+def quarantine_name(label: str = None) -> str:
+    return f".quarantine.{label}.jsonl" if label else QUARANTINE_NAME
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+class Journal:
+    """
+        Дописываемый журнал: строка JSON на событие {"file", "status", ...}.
+        Записи копятся в памяти и сбрасываются на диск (с fsync) вызовом
+        commit() — в момент, когда результаты соответствующих документов
+        уже надёжно записаны. После аварии журнал может обрываться
+        на недописанной строке — она пропускается при чтении.
+        resume=False начинает журнал заново; fallback — общий файл
+        (после merge), читаемый перед собственным. Файл создаётся
+        при первой записи.
+    """
+
+    def __init__(self, output_folder: str, name: str = JOURNAL_NAME, resume: bool = True,
+                 fallback: str = None):
+        self.path = os.path.join(output_folder, name)
+        self.entries = {}
+        self._pending = []
+        self._file = None
+        if resume:
+            if fallback and fallback != name:
+                self._load(os.path.join(output_folder, fallback))
+            self._load(self.path)
+        elif os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _load(self, path: str):
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self.entries[entry["file"]] = entry
+
+    def status(self, key: str):
+        entry = self.entries.get(key)
+        return entry["status"] if entry else None
+
+    def record(self, key: str, status: str, **info):
+        entry = {"file": key, "status": status, **info}
+        self.entries[key] = entry
+        self._pending.append(entry)
+
+    def commit(self):
+        if not self._pending:
+            return
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+            # Оборванная при аварии строка не должна склеиться с новой записью
+            if self._file.tell() and not _ends_with_newline(self.path):
+                self._file.write("\n")
+        self._file.write("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in self._pending))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending.clear()
+
+    def close(self):
+        self.commit()
+        if self._file is not None:
+            self._file.close()
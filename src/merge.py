@@ -0,0 +1,153 @@
+"""
+Объединение результатов долей (--shard i/N) в одной папке результатов:
+манифесты .manifest.shard-*.json сливаются в .manifest.json, потоки
+results.shard-*.jsonl[.gz] дописываются в results.jsonl[.gz], файлы
+results-shard-*.parquet собираются в один Parquet, списки карантина
+.quarantine.shard-*.jsonl — в .quarantine.jsonl, базы results.shard-*.sqlite
+(--store) — в results.sqlite. JSON-файлы на документ
+объединять не нужно — доли пишут их в общее дерево без пересечений.
+"""
+import os
+import re
+import json
+import time
+import shutil
+import argparse
+from src.incremental import Manifest, MANIFEST_NAME, QUARANTINE_NAME
+from src.store import ResultStore, STORE_NAME
+
+_MANIFEST_RE = re.compile(r"^\.manifest\.(shard-\d+-of-\d+)\.json$")
+_JSONL_RE = re.compile(r"^results\.(shard-\d+-of-\d+)\.jsonl(\.gz)?$")
+_PARQUET_RE = re.compile(r"^results-(shard-\d+-of-\d+)-.*\.parquet$")
+_QUARANTINE_RE = re.compile(r"^\.quarantine\.(shard-\d+-of-\d+)\.jsonl$")
+_STORE_RE = re.compile(r"^results\.(shard-\d+-of-\d+)\.sqlite$")
+
+
+def _shard_files(output_folder: str, pattern) -> list:
+    return sorted(name for name in os.listdir(output_folder) if pattern.match(name))
+
+
+def merge_manifests(output_folder: str, names: list) -> int:
+    manifest = Manifest(output_folder, name=MANIFEST_NAME)
+    for name in names:
+        with open(os.path.join(output_folder, name), "r", encoding="utf-8") as f:
+            manifest.entries.update(json.load(f))
+    manifest.save()
+    return len(manifest.entries)
+
+
+def _append(target: str, output_folder: str, names: list):
+    with open(target, "ab") as out:
+        for name in names:
+            with open(os.path.join(output_folder, name), "rb") as f:
+                shutil.copyfileobj(f, out, 1024 * 1024)
+
+
+def merge_jsonl(output_folder: str, names: list) -> list:
+    """
+        Дописывает потоки долей в общий файл. Члены gzip можно склеивать
+        побайтно — результат остаётся корректным gzip.
+    """
+    targets = []
+    for compressed in (False, True):
+        parts = [name for name in names if name.endswith(".gz") == compressed]
+        if not parts:
+            continue
+        target = os.path.join(output_folder, "results.jsonl.gz" if compressed else "results.jsonl")
+        _append(target, output_folder, parts)
+        targets.append(target)
+    return targets
+
+
+def merge_parquet(output_folder: str, names: list) -> str:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Для объединения parquet требуется пакет pyarrow")
+
+    target = os.path.join(output_folder, f"results-merged-{time.strftime('%Y%m%d-%H%M%S')}.parquet")
+    writer = None
+    try:
+        for name in names:
+            source = pq.ParquetFile(os.path.join(output_folder, name))
+            if writer is None:
+                writer = pq.ParquetWriter(target, source.schema_arrow, compression="zstd")
+            for group in range(source.num_row_groups):
+                writer.write_table(source.read_row_group(group))
+    finally:
+        if writer is not None:
+            writer.close()
+    return target
+
+
+def merge_stores(output_folder: str, names: list) -> str:
+    target = os.path.join(output_folder, STORE_NAME)
+    store = ResultStore(target)
+    try:
+        for name in names:
+            store.merge_from(os.path.join(output_folder, name))
+    finally:
+        store.close()
+    return target
+
+
+def merge(output_folder: str, keep: bool = False) -> dict:
+    """
+        Объединяет файлы всех долей в output_folder. Запускать после
+        завершения всех узлов. Объединённые файлы долей удаляются, чтобы
+        повторный запуск не дописал их второй раз; keep — оставить их.
+    """
+    manifests = _shard_files(output_folder, _MANIFEST_RE)
+    streams = _shard_files(output_folder, _JSONL_RE)
+    tables = _shard_files(output_folder, _PARQUET_RE)
+    quarantines = _shard_files(output_folder, _QUARANTINE_RE)
+    stores = _shard_files(output_folder, _STORE_RE)
+    shards = {pattern.match(name).group(1)
+              for pattern, names in ((_MANIFEST_RE, manifests), (_JSONL_RE, streams), (_PARQUET_RE, tables),
+                                     (_QUARANTINE_RE, quarantines), (_STORE_RE, stores))
+              for name in names}
+
+    report = {"shards": sorted(shards), "outputs": []}
+    if manifests:
+        report["manifest_entries"] = merge_manifests(output_folder, manifests)
+        report["outputs"].append(os.path.join(output_folder, MANIFEST_NAME))
+    if streams:
+        report["outputs"] += merge_jsonl(output_folder, streams)
+    if tables:
+        report["outputs"].append(merge_parquet(output_folder, tables))
+    if quarantines:
+        target = os.path.join(output_folder, QUARANTINE_NAME)
+        _append(target, output_folder, quarantines)
+        report["outputs"].append(target)
+    if stores:
+        report["outputs"].append(merge_stores(output_folder, stores))
+
+    if not keep:
+        for name in manifests + streams + tables + quarantines:
+            os.remove(os.path.join(output_folder, name))
+        # У базы в режиме WAL рядом могут остаться файлы -wal и -shm
+        for name in stores:
+            for suffix in ("", "-wal", "-shm"):
+                path = os.path.join(output_folder, name + suffix)
+                if os.path.exists(path):
+                    os.remove(path)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="main_cli.py merge",
+                                     description="Объединение результатов долей (--shard i/N)")
+    parser.add_argument("--output", required=True, help="Общая папка результатов долей")
+    parser.add_argument("--keep", action="store_true",
+                        help="Не удалять файлы долей (повторное объединение продублирует строки)")
+    args = parser.parse_args(argv)
+
+    report = merge(args.output, keep=args.keep)
+    if not report["shards"]:
+        print(f"В {args.output} нет файлов долей")
+        return
+    print(f"Объединены доли: {', '.join(report['shards'])}")
+    if "manifest_entries" in report:
+        print(f"Записей в манифесте: {report['manifest_entries']}")
+    for path in report["outputs"]:
+        print(f"Записано: {path}")
@@ -0,0 +1,150 @@
+import os
+import heapq
+import bisect
+
+# Границы корзин гистограмм времени, секунды
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Границы корзин гистограммы числа страниц
+PAGE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 500)
+
+
+class Histogram:
+    """
+        Гистограмма в смысле Prometheus: накопительные корзины, сумма и количество.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name: str, labels: str = "") -> list:
+        prefix = labels + "," if labels else ""
+        result = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            result.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+        result.append(f'{name}_bucket{{{prefix}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        result.append(f"{name}_sum{suffix} {self.sum:.6f}")
+        result.append(f"{name}_count{suffix} {self.count}")
+        return result
+
+
+class BatchMetrics:
+    """
+        Сводные метрики пакетной обработки по блокам "_meta" результатов:
+        гистограммы времени документа, этапов и подэтапов извлечения,
+        числа страниц, счётчики способов извлечения и N самых медленных
+        документов.
+    """
+
+    def __init__(self, slowest: int = 10):
+        self.documents = Histogram(TIME_BUCKETS)
+        self.stages = {}
+        self.extract_steps = {}
+        self.pages = Histogram(PAGE_BUCKETS)
+        self.ocr_pages = 0
+        self.methods = {}
+        self.cached = 0
+        self.errors = 0
+        self.slowest_n = slowest
+        self._slowest = []
+        self._seq = 0
+
+    def observe(self, source: str, result: dict):
+        meta = result.get("_meta")
+        if meta is None:
+            return
+        if "error" in result:
+            self.errors += 1
+        if meta.get("cached"):
+            self.cached += 1
+            return
+
+        self.documents.observe(meta["seconds"])
+        for stage, seconds in meta["stages"].items():
+            self.stages.setdefault(stage, Histogram(TIME_BUCKETS)).observe(seconds)
+        for step, seconds in meta.get("extract_steps", {}).items():
+            self.extract_steps.setdefault(step, Histogram(TIME_BUCKETS)).observe(seconds)
+        if meta.get("pages") is not None:
+            self.pages.observe(meta["pages"])
+        self.ocr_pages += meta.get("ocr_pages", 0)
+        method = meta.get("extraction") or "none"
+        self.methods[method] = self.methods.get(method, 0) + 1
+
+        if self.slowest_n > 0:
+            self._seq += 1
+            item = (meta["seconds"], self._seq, source, meta)
+            if len(self._slowest) < self.slowest_n:
+                heapq.heappush(self._slowest, item)
+            else:
+                heapq.heappushpop(self._slowest, item)
+
+    def slowest(self) -> list:
+        """
+            Список (секунды, путь, _meta) от самого медленного документа.
+        """
+        return [(seconds, source, meta) for seconds, _, source, meta in sorted(self._slowest, reverse=True)]
+
+    def render(self) -> str:
+        lines = ["# TYPE textscanner_document_seconds histogram"]
+        lines += self.documents.lines("textscanner_document_seconds")
+        lines.append("# TYPE textscanner_stage_seconds histogram")
+        for stage, histogram in sorted(self.stages.items()):
+            lines += histogram.lines("textscanner_stage_seconds", f'stage="{stage}"')
+        lines.append("# TYPE textscanner_extract_step_seconds histogram")
+        for step, histogram in sorted(self.extract_steps.items()):
+            lines += histogram.lines("textscanner_extract_step_seconds", f'step="{step}"')
+        lines.append("# TYPE textscanner_document_pages histogram")
+        lines += self.pages.lines("textscanner_document_pages")
+        lines.append("# TYPE textscanner_ocr_pages_total counter")
+        lines.append(f"textscanner_ocr_pages_total {self.ocr_pages}")
+        lines.append("# TYPE textscanner_extraction_total counter")
+        for method, count in sorted(self.methods.items()):
+            lines.append(f'textscanner_extraction_total{{method="{method}"}} {count}')
+        lines.append("# TYPE textscanner_cache_hits_total counter")
+        lines.append(f"textscanner_cache_hits_total {self.cached}")
+        lines.append("# TYPE textscanner_errors_total counter")
+        lines.append(f"textscanner_errors_total {self.errors}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+
+def print_slowest(entries: list):
+    if not entries:
+        return
+    print(f"Самые медленные документы ({len(entries)}):")
+    for seconds, source, meta in entries:
+        stages = ", ".join(f"{stage} {value:.3f} с" for stage, value in meta["stages"].items())
+        pages = f", страниц {meta['pages']} (OCR {meta['ocr_pages']})" if meta.get("pages") is not None else ""
+        print(f"  {seconds:8.3f} с  {source}  [{meta.get('extraction')}{pages}; {stages}]")
+
+
+def profile_documents(sources: list, profile_dir: str, early_exit: dict = None):
+    """
+        Повторная обработка документов под cProfile (без кэша);
+        профили сохраняются в profile_dir/<имя файла>.prof для snakeviz / pstats.
+    """
+    import cProfile
+    from src.core.processor import process_document
+
+    os.makedirs(profile_dir, exist_ok=True)
+    for source in sources:
+        profiler = cProfile.Profile()
+        profiler.runcall(process_document, source, early_exit=early_exit)
+        path = os.path.join(profile_dir, os.path.basename(source) + ".prof")
+        profiler.dump_stats(path)
+        print(f"Профиль: {path}")
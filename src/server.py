@@ -0,0 +1,350 @@
+import os
+import json
+import time
+import queue
+import socket
+import argparse
+import threading
+import tempfile
+import socketserver
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+
+from src.cli import WorkerPool, _process_batch
+from src.core.text_extractor import detect_file_format
+from src.core.cache import DEFAULT_CACHE_DIR
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Предельный размер тела запроса с содержимым документа
+MAX_BODY_BYTES = 256 * 1024 * 1024
+# Тело запроса читается во временный файл порциями такого размера
+_CHUNK_BYTES = 1024 * 1024
+
+
+class _Job:
+    def __init__(self, path):
+        self.path = path
+        self.result = None
+        self.done = threading.Event()
+        self.enqueued = time.perf_counter()
+
+
+class DocumentService:
+    """
+        Прогретые процессы-обработчики (WorkerPool) за ограниченной очередью.
+        На каждый процесс — поток-диспетчер: он забирает из очереди сразу
+        все ожидающие задания (до batch_size) и отдаёт их процессу одним
+        пакетом, чтобы NER и классификация шли пакетом. PyMuPDF, OCR и кэш
+        результатов работают только внутри процессов, по пакету за раз.
+        Если очередь заполнена, задание отклоняется — клиент получает 503.
+    """
+
+    def __init__(self, workers: int = 1, queue_size: int = 16, batch_size: int = 8,
+                 cache_options: dict = None):
+        self.workers = max(1, workers)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.batch_size = max(1, batch_size)
+        # OCR-потоки делятся между процессами, как в пакетном режиме
+        ocr_threads = max(1, (os.cpu_count() or 1) // self.workers)
+        self.init_args = (cache_options, ocr_threads, None, None, None, False)
+        self.worker_pool = WorkerPool()
+        self._pool_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.counters = {
+            "requests": 0, "rejected": 0, "errors": 0, "processed": 0,
+            "in_progress": 0, "latency_seconds_sum": 0.0, "queue_wait_seconds_sum": 0.0,
+        }
+        self.ready = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"doc-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+
+    def start(self):
+        # Процессы запускаются и загружают модели до приёма первого запроса
+        pool = self._pool()
+        for future in [pool.submit(os.getpid) for _ in range(self.workers)]:
+            future.result()
+        self.ready.set()
+        for thread in self._threads:
+            thread.start()
+
+    def close(self):
+        with self._pool_lock:
+            self.worker_pool.close()
+
+    def _pool(self):
+        with self._pool_lock:
+            return self.worker_pool.get(self.workers, self.init_args)
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                self.counters[name] += delta
+
+    def submit(self, job: _Job) -> bool:
+        self._count(requests=1)
+        try:
+            self.queue.put_nowait(job)
+            return True
+        except queue.Full:
+            self._count(rejected=1)
+            return False
+
+    def reject(self):
+        # Отказ до постановки в очередь (тело запроса не прочитано)
+        self._count(requests=1, rejected=1)
+
+    def _worker(self):
+        while True:
+            jobs = [self.queue.get()]
+            while len(jobs) < self.batch_size:
+                try:
+                    jobs.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            started = time.perf_counter()
+            self._count(in_progress=len(jobs),
+                        queue_wait_seconds_sum=sum(started - j.enqueued for j in jobs))
+            try:
+                self._run(jobs)
+            finally:
+                finished = time.perf_counter()
+                self._count(in_progress=-len(jobs), processed=len(jobs),
+                            latency_seconds_sum=sum(finished - j.enqueued for j in jobs))
+                for job in jobs:
+                    job.done.set()
+
+    def _run(self, jobs):
+        pool = self._pool()
+        try:
+            results = pool.submit(_process_batch, [job.path for job in jobs]).result()[0]
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                # Процесс-обработчик погиб: следующий пакет получит новый пул
+                with self._pool_lock:
+                    self.worker_pool.discard(pool)
+            self._count(errors=len(jobs))
+            for job in jobs:
+                job.result = {"error": f"Ошибка обработки: {e}"}
+            return
+
+        for job, result in zip(jobs, results):
+            result.pop("_meta", None)
+            job.result = result
+            if "error" in result:
+                self._count(errors=1)
+
+    def health(self) -> dict:
+        return {
+            "status": "ok" if self.ready.is_set() else "starting",
+            "queue": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "uptime_seconds": round(time.time() - self.started, 3),
+        }
+
+    def metrics(self) -> str:
+        with self._lock:
+            c = dict(self.counters)
+        lines = [
+            "# TYPE textscanner_requests_total counter",
+            f"textscanner_requests_total {c['requests']}",
+            "# TYPE textscanner_rejected_total counter",
+            f"textscanner_rejected_total {c['rejected']}",
+            "# TYPE textscanner_errors_total counter",
+            f"textscanner_errors_total {c['errors']}",
+            "# TYPE textscanner_processed_total counter",
+            f"textscanner_processed_total {c['processed']}",
+            "# TYPE textscanner_in_progress gauge",
+            f"textscanner_in_progress {c['in_progress']}",
+            "# TYPE textscanner_queue_depth gauge",
+            f"textscanner_queue_depth {self.queue.qsize()}",
+            "# TYPE textscanner_latency_seconds summary",
+            f"textscanner_latency_seconds_sum {c['latency_seconds_sum']:.6f}",
+            f"textscanner_latency_seconds_count {c['processed']}",
+            "# TYPE textscanner_queue_wait_seconds summary",
+            f"textscanner_queue_wait_seconds_sum {c['queue_wait_seconds_sum']:.6f}",
+            f"textscanner_queue_wait_seconds_count {c['processed']}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    service = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def address_string(self):
+        # У соединений через Unix-сокет нет адреса клиента
+        return self.client_address[0] if self.client_address else "unix"
+
+    def _send(self, status: int, body, content_type="application/json; charset=utf-8", headers=None):
+        if not isinstance(body, (bytes, str)):
+            body = json.dumps(body, ensure_ascii=False)
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/health":
+            self._send(200, self.service.health())
+        elif url.path == "/metrics":
+            self._send(200, self.service.metrics(), content_type="text/plain; version=0.0.4")
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/process":
+            self._send(404, {"error": "not found"})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            self._send(413, {"error": "request body too large"})
+            return
+        if self.service.queue.full():
+            # Тело не сохраняется, а только вычитывается, чтобы клиент
+            # получил ответ, а не обрыв соединения посреди отправки
+            self.service.reject()
+            _drain(self.rfile, length)
+            self._reject()
+            return
+
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("application/json"):
+            try:
+                path = json.loads(self.rfile.read(length).decode("utf-8"))["path"]
+            except (ValueError, KeyError, TypeError):
+                self._send(400, {"error": "expected JSON body {\"path\": ...}"})
+                return
+            self._respond(self._process(_Job(path)))
+            return
+
+        filename = unquote(self.headers.get("X-Filename", "")) or parse_qs(url.query).get("filename", [None])[0]
+        mime = content_type if content_type and not content_type.startswith("application/octet-stream") else None
+        try:
+            path = _spool(self.rfile, length, filename, mime)
+        except ConnectionError:
+            self.close_connection = True
+            self._send(400, {"error": "incomplete request body"})
+            return
+        try:
+            result = self._process(_Job(path))
+        finally:
+            # Временный файл удаляется до ответа клиенту
+            os.remove(path)
+        self._respond(result)
+
+    def _process(self, job: _Job):
+        # Результат задания или None, если очередь заполнена
+        if not self.service.submit(job):
+            return None
+        job.done.wait()
+        return job.result
+
+    def _respond(self, result):
+        if result is None:
+            self._reject()
+        else:
+            self._send(200, result)
+
+    def _reject(self):
+        self._send(503, {"error": "queue full"}, headers={"Retry-After": "1"})
+
+
+def _drain(stream, length: int):
+    while length > 0:
+        chunk = stream.read(min(_CHUNK_BYTES, length))
+        if not chunk:
+            break
+        length -= len(chunk)
+
+
+def _spool(stream, length: int, filename=None, mime=None) -> str:
+    """
+        Переписывает тело запроса во временный файл порциями по _CHUNK_BYTES,
+        чтобы в памяти не держать документ целиком. Расширение файла —
+        по сигнатуре содержимого (detect_file_format), иначе по имени.
+        Возвращает путь; удаляет файл вызывающий.
+    """
+    fd, path = tempfile.mkstemp(prefix="textscanner-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            remaining = length
+            while remaining > 0:
+                chunk = stream.read(min(_CHUNK_BYTES, remaining))
+                if not chunk:
+                    raise ConnectionError("request body is shorter than Content-Length")
+                f.write(chunk)
+                remaining -= len(chunk)
+        target = path + (detect_file_format(path, filename, mime) or "")
+        os.replace(path, target)
+        return target
+    except BaseException:
+        os.remove(path)
+        raise
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service: DocumentService, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None):
+    handler = type("Handler", (_Handler,), {"service": service})
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        return ThreadingUnixHTTPServer(socket_path, handler)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="main_cli.py serve",
+                                     description="Локальный сервис обработки документов")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--socket", help="Путь к Unix-сокету вместо TCP")
+    parser.add_argument("--workers", type=int, default=1, help="Процессов-обработчиков")
+    parser.add_argument("--queue-size", type=int, default=16,
+                        help="Размер очереди; при переполнении клиент получает 503")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.socket and not hasattr(socket, "AF_UNIX"):
+        parser.error("Unix sockets are not supported on this platform")
+
+    cache_options = None if args.no_cache else {"cache_dir": args.cache_dir}
+    service = DocumentService(args.workers, args.queue_size, args.batch_size, cache_options)
+    server = make_server(service, args.host, args.port, args.socket)
+
+    print("Загрузка моделей...")
+    service.start()
+    print(f"Сервис запущен: {args.socket or f'http://{args.host}:{args.port}'}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
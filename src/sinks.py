@@ -0,0 +1,268 @@
+import os
+import io
+import gzip
+import json
+import time
+import zlib
+
+OUTPUT_FORMATS = ("json", "jsonl", "parquet")
+
+_CHUNK = 1024 * 1024
+
+# Сколько документов или секунд копится между контрольными точками JSON Lines
+CHECKPOINT_ROWS = 500
+CHECKPOINT_SECONDS = 2.0
+
+# Поля результата process_document, выносимые в отдельные колонки Parquet
+RESULT_FIELDS = (
+    "document_type", "sender", "recipient", "document_date",
+    "document_number", "subject", "error",
+)
+
+
+def _record(source: str, result: dict, meta: dict) -> dict:
+    record = {"source": source, "processed_at": time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+    record.update(meta)
+    record["result"] = result
+    return record
+
+
+class JsonFilesSink:
+    """
+        Формат по умолчанию: отдельный JSON-файл на каждый документ.
+    """
+    per_file = True
+
+    def __init__(self, output_folder: str):
+        self.output_folder = output_folder
+
+    def output_path(self, name: str) -> str:
+        return os.path.join(
+            self.output_folder,
+            f"{os.path.splitext(name)[0]}.json"
+        )
+
+    def write(self, name: str, source: str, result: dict, meta: dict) -> str:
+        # name может быть относительным путём: дерево результатов повторяет входное
+        output_file = self.output_path(name)
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=4)
+        return output_file
+
+    def checkpoint(self) -> bool:
+        """
+            Сбрасывает буферы; True — все записанные результаты уже в файлах
+            и переживут аварийное завершение процесса.
+        """
+        return True
+
+    def close(self):
+        pass
+
+
+class JsonlSink:
+    """
+        Один поток JSON Lines (при необходимости сжатый gzip), дописываемый
+        в конец: строка на документ с исходным путём и метаданными обработки.
+        Запись буферизуется; повторный запуск продолжает тот же файл
+        (для gzip добавляется новый член архива — это корректный gzip).
+        label — метка доли (см. src.traversal.shard_name): у каждого узла свой файл.
+
+        checkpoint() завершает член gzip и делает fsync, когда с прошлой
+        контрольной точки записано checkpoint_rows строк или прошло
+        checkpoint_seconds, иначе возвращает False. После аварии файл
+        читается до последней контрольной точки. Недописанный хвост
+        (обрывок строки или члена gzip) отбрасывается при открытии.
+    """
+    per_file = False
+
+    def __init__(self, output_folder: str, compress: str = None, buffer_size: int = 1024 * 1024,
+                 label: str = None, checkpoint_rows: int = CHECKPOINT_ROWS,
+                 checkpoint_seconds: float = CHECKPOINT_SECONDS):
+        name = f"results.{label}.jsonl" if label else "results.jsonl"
+        self.compress = compress
+        self.buffer_size = buffer_size
+        self.checkpoint_rows = checkpoint_rows
+        self.checkpoint_seconds = checkpoint_seconds
+        self._unsaved = 0
+        self._saved = time.monotonic()
+        self.path = os.path.join(output_folder, name + ".gz" if compress == "gzip" else name)
+        _drop_incomplete_tail(self.path, compress == "gzip")
+        if compress == "gzip":
+            self._raw = open(self.path, "ab")
+            self._file = None
+        else:
+            self._raw = self._file = open(self.path, "ab", buffering=buffer_size)
+
+    def _open_member(self):
+        # GzipFile поверх открытого файла не закрывает его вместе с собой
+        self._file = io.BufferedWriter(gzip.GzipFile(fileobj=self._raw, mode="ab"), self.buffer_size)
+
+    def write(self, name: str, source: str, result: dict, meta: dict) -> str:
+        line = json.dumps(_record(source, result, meta), ensure_ascii=False) + "\n"
+        if self._file is None:
+            self._open_member()
+        self._file.write(line.encode("utf-8"))
+        self._unsaved += 1
+        return self.path
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def checkpoint(self) -> bool:
+        if not self._unsaved:
+            return True
+        if self._unsaved < self.checkpoint_rows and time.monotonic() - self._saved < self.checkpoint_seconds:
+            return False
+        if self.compress == "gzip":
+            # Пока член gzip не завершён, часть строк остаётся в компрессоре
+            # zlib, а без завершающего блока оборванный член не склеивается
+            # со следующим: член закрывается, следующая запись откроет новый
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        else:
+            self._file.flush()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._unsaved = 0
+        self._saved = time.monotonic()
+        return True
+
+    def close(self):
+        if self._file is not None and self._file is not self._raw:
+            self._file.close()
+        self._raw.close()
+
+
+def _complete_length(path: str, compressed: bool) -> int:
+    """
+        Длина прочитываемой части файла: до последнего перевода строки
+        или до конца последнего целого члена gzip.
+    """
+    with open(path, "rb") as f:
+        if not compressed:
+            end = f.seek(0, os.SEEK_END)
+            while end > 0:
+                start = max(0, end - _CHUNK)
+                f.seek(start)
+                chunk = f.read(end - start)
+                i = chunk.rfind(b"\n")
+                if i >= 0:
+                    return start + i + 1
+                end = start
+            return 0
+
+        complete = offset = 0
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            while chunk:
+                try:
+                    # Распакованные данные не нужны: ищутся только границы членов
+                    decompressor.decompress(chunk, _CHUNK)
+                except zlib.error:
+                    return complete
+                if decompressor.eof:
+                    offset += len(chunk) - len(decompressor.unused_data)
+                    complete = offset
+                    chunk = decompressor.unused_data
+                    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+                else:
+                    offset += len(chunk) - len(decompressor.unconsumed_tail)
+                    chunk = decompressor.unconsumed_tail
+        return complete
+
+
+def _drop_incomplete_tail(path: str, compressed: bool):
+    # После аварии дописывание за обрывком испортило бы и новые строки
+    if not os.path.exists(path):
+        return
+    size = os.path.getsize(path)
+    length = _complete_length(path, compressed)
+    if length < size:
+        print(f"Отброшен недописанный хвост {path}: {size - length} байт")
+        with open(path, "r+b") as f:
+            f.truncate(length)
+
+
+class ParquetSink:
+    """
+        Колоночный файл Parquet (нужен pyarrow). Строки копятся в памяти
+        и сбрасываются группами по row_group_size. Parquet не допускает
+        дозаписи, поэтому каждый запуск создаёт новый файл.
+
+        Контрольных точек нет: без завершающего футера, который пишет
+        close(), файл не читается, даже если группы строк уже на диске.
+        checkpoint() всегда возвращает False — журнал --resume фиксирует
+        документы только после закрытия файла, и прерванный запуск
+        продолжается с начала.
+    """
+    per_file = False
+
+    def __init__(self, output_folder: str, row_group_size: int = 10000, label: str = None):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Для формата parquet требуется пакет pyarrow")
+
+        self._pa = pa
+        self._pq = pq
+        prefix = f"results-{label}" if label else "results"
+        self.path = os.path.join(output_folder, f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.parquet")
+        self.row_group_size = row_group_size
+        self._rows = []
+        self._writer = None
+        self._schema = pa.schema(
+            [("source", pa.string()), ("processed_at", pa.string()),
+             ("elapsed_seconds", pa.float64()), ("worker_pid", pa.int64()),
+             ("pipeline_version", pa.string())]
+            + [(field, pa.string()) for field in RESULT_FIELDS]
+            + [("result_json", pa.string())]
+        )
+
+    def write(self, name: str, source: str, result: dict, meta: dict) -> str:
+        record = _record(source, result, meta)
+        row = {
+            "source": record["source"],
+            "processed_at": record["processed_at"],
+            "elapsed_seconds": meta.get("elapsed_seconds"),
+            "worker_pid": meta.get("worker_pid"),
+            "pipeline_version": meta.get("pipeline_version"),
+            "result_json": json.dumps(result, ensure_ascii=False),
+        }
+        for field in RESULT_FIELDS:
+            value = result.get(field)
+            row[field] = None if value is None else str(value)
+        self._rows.append(row)
+        if len(self._rows) >= self.row_group_size:
+            self.flush()
+        return self.path
+
+    def flush(self):
+        if not self._rows:
+            return
+        table = self._pa.Table.from_pylist(self._rows, schema=self._schema)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self.path, self._schema, compression="zstd")
+        self._writer.write_table(table, row_group_size=self.row_group_size)
+        self._rows.clear()
+
+    def checkpoint(self) -> bool:
+        return False
+
+    def close(self):
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+
+
+def open_sink(output_format: str, output_folder: str, compress: str = None, row_group_size: int = 10000,
+              label: str = None):
+    if output_format == "jsonl":
+        return JsonlSink(output_folder, compress=compress, label=label)
+    if output_format == "parquet":
+        return ParquetSink(output_folder, row_group_size=row_group_size, label=label)
+    return JsonFilesSink(output_folder)
@@ -0,0 +1,347 @@
+"""
+Хранилище результатов в SQLite для поиска по обработанным документам.
+
+process_folder с store=True пишет в папку результатов results.sqlite
+(у доли — results.shard-i-of-N.sqlite, их объединяет merge):
+  documents     — строка на документ (элемент ZIP-архива — отдельная
+                  строка "архив.zip/имя"): реквизиты отдельными колонками
+                  с индексами, дата в виде ГГГГ-ММ-ДД для поиска
+                  по диапазону, результат и метаданные обработки в JSON;
+  documents_fts — полнотекстовый индекс FTS5 по тексту, теме,
+                  отправителю и получателю (rowid = documents.id).
+База работает в режиме WAL: запросы не блокируются записью идущей
+обработки. Результаты копятся в памяти и пишутся одной транзакцией
+на пакет.
+
+Поиск — подкомандой query:
+    python main_cli.py query результаты/ --sender "Ромашка" --date-from 2024-01-01
+    python main_cli.py query результаты/results.sqlite --text "договор поставки"
+"""
+import os
+import re
+import json
+import time
+import sqlite3
+import datetime
+import argparse
+
+STORE_NAME = "results.sqlite"
+
+# Сколько документов или секунд копится перед записью транзакции
+FLUSH_ROWS = 500
+FLUSH_SECONDS = 2.0
+
+FIELDS = ("document_type", "sender", "recipient", "document_date", "document_number", "subject", "error")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    file TEXT NOT NULL UNIQUE,
+    source TEXT,
+    processed_at TEXT,
+    document_type TEXT,
+    sender TEXT,
+    recipient TEXT,
+    document_date TEXT,
+    date_iso TEXT,
+    document_number TEXT COLLATE NOCASE,
+    subject TEXT,
+    error TEXT,
+    reused_from TEXT,
+    elapsed_seconds REAL,
+    pipeline_version TEXT,
+    result TEXT NOT NULL,
+    meta TEXT
+);
+CREATE INDEX IF NOT EXISTS documents_type ON documents(document_type, date_iso);
+CREATE INDEX IF NOT EXISTS documents_date ON documents(date_iso);
+CREATE INDEX IF NOT EXISTS documents_number ON documents(document_number);
+CREATE INDEX IF NOT EXISTS documents_sender ON documents(sender COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS documents_recipient ON documents(recipient COLLATE NOCASE);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    text, subject, sender, recipient, tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+_COLUMNS = ("file", "source", "processed_at") + FIELDS + (
+    "date_iso", "reused_from", "elapsed_seconds", "pipeline_version", "result", "meta",
+)
+
+_UPSERT = (
+    f"INSERT INTO documents ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' for _ in _COLUMNS)}) "
+    f"ON CONFLICT(file) DO UPDATE SET "
+    + ", ".join(f"{column} = excluded.{column}" for column in _COLUMNS[1:])
+)
+
+_MONTHS = {
+    name: number for number, name in enumerate(
+        ("январ", "феврал", "март", "апрел", "ма", "июн", "июл", "август", "сентябр", "октябр", "ноябр", "декабр"),
+        start=1,
+    )
+}
+_NUMERIC_DATE_RE = re.compile(r"^(\d{1,2})[./-](\d{1,2})[./-](\d{2,4})$")
+_ISO_DATE_RE = re.compile(r"^(\d{4})-(\d{2})-(\d{2})$")
+_TEXT_DATE_RE = re.compile(r"^(\d{1,2})\s+([а-яё]+)\s+(\d{4})$", re.IGNORECASE)
+
+
+def store_name(label: str = None) -> str:
+    return f"results.{label}.sqlite" if label else STORE_NAME
+
+
+def iso_date(value):
+    """
+        Дата реквизита ("05.03.24", "5 марта 2024", "2024-03-05") в виде
+        ГГГГ-ММ-ДД; None, если разобрать не удалось.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    match = _ISO_DATE_RE.match(value)
+    if match:
+        year, month, day = (int(g) for g in match.groups())
+    else:
+        match = _NUMERIC_DATE_RE.match(value)
+        if match:
+            day, month, year = (int(g) for g in match.groups())
+        else:
+            match = _TEXT_DATE_RE.match(value)
+            if not match:
+                return None
+            word = match.group(2).lower()
+            month = next((n for stem, n in _MONTHS.items() if word.startswith(stem) and len(word) - len(stem) <= 2),
+                         None)
+            if month is None:
+                return None
+            day, year = int(match.group(1)), int(match.group(3))
+        if year < 100:
+            year += 2000 if year < 70 else 1900
+    try:
+        # Несуществующая дата («31.02.2024») не должна попасть в диапазон поиска
+        return datetime.date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+def _rows(name: str, source: str, result: dict, meta: dict, processed_at: str):
+    """
+        Строки (колонки documents, текст) для результата; у архива —
+        по строке на каждый файл архива. "_text" забирается из результатов.
+    """
+    if "documents" in result:
+        for entry in result["documents"]:
+            if entry.get("result") is not None:
+                yield from _rows(f"{name}/{entry['file']}", source, entry["result"], meta, processed_at)
+        if "error" not in result:
+            return
+    text = result.pop("_text", None)
+    stored = {key: value for key, value in result.items() if key not in ("_meta", "documents")}
+    processing = dict(meta)
+    if result.get("_meta") is not None:
+        processing["_meta"] = result["_meta"]
+    values = [name, source, processed_at] + [_text(stored.get(field)) for field in FIELDS] + [
+        iso_date(stored.get("document_date")),
+        json.dumps(stored["reused_from"], ensure_ascii=False) if stored.get("reused_from") else None,
+        meta.get("elapsed_seconds"),
+        meta.get("pipeline_version"),
+        json.dumps(stored, ensure_ascii=False),
+        json.dumps(processing, ensure_ascii=False),
+    ]
+    yield values, text
+
+
+def connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=60)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+class ResultStore:
+    """
+        Запись результатов process_folder. write() копит строки, checkpoint()
+        записывает их одной транзакцией, когда накопилось flush_rows строк
+        или прошло flush_seconds, и возвращает True, если незаписанных строк
+        не осталось (как checkpoint() у приёмников src.sinks).
+    """
+
+    def __init__(self, path: str, flush_rows: int = FLUSH_ROWS, flush_seconds: float = FLUSH_SECONDS):
+        self.path = path
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self._conn = connect(path)
+        self._pending = []
+        self._flushed = time.monotonic()
+
+    def write(self, name: str, source: str, result: dict, meta: dict):
+        """
+            Забирает из результата (и результатов файлов архива) "_text".
+        """
+        processed_at = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+        self._pending.extend(_rows(name, source, result, meta, processed_at))
+
+    def flush(self):
+        if not self._pending:
+            return
+        self._write(self._pending)
+        self._pending = []
+        self._flushed = time.monotonic()
+
+    def _write(self, rows: list):
+        # Документ, записанный дважды за пакет (--watch), — последняя версия
+        rows = list({values[0]: (values, text) for values, text in rows}.values())
+        files = [(values[0],) for values, _ in rows]
+        with self._conn:
+            # Повторно обработанный документ заменяет прежнюю строку, id сохраняется
+            self._conn.executemany(
+                "DELETE FROM documents_fts WHERE rowid = (SELECT id FROM documents WHERE file = ?)", files
+            )
+            self._conn.executemany(_UPSERT, [values for values, _ in rows])
+            self._conn.executemany(
+                "INSERT INTO documents_fts (rowid, text, subject, sender, recipient) "
+                "SELECT id, ?, subject, sender, recipient FROM documents WHERE file = ?",
+                [(text, values[0]) for values, text in rows],
+            )
+
+    def checkpoint(self) -> bool:
+        if len(self._pending) >= self.flush_rows or time.monotonic() - self._flushed >= self.flush_seconds:
+            self.flush()
+        return not self._pending
+
+    def merge_from(self, path: str) -> int:
+        """
+            Перенос всех документов другой базы (доли) в эту.
+        """
+        source = sqlite3.connect(path)
+        try:
+            rows = source.execute(
+                f"SELECT {', '.join('d.' + column for column in _COLUMNS)}, f.text "
+                f"FROM documents d LEFT JOIN documents_fts f ON f.rowid = d.id"
+            )
+            count = 0
+            while True:
+                chunk = rows.fetchmany(self.flush_rows)
+                if not chunk:
+                    break
+                self._write([(list(row[:-1]), row[-1]) for row in chunk])
+                count += len(chunk)
+        finally:
+            source.close()
+        return count
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._conn.close()
+
+
+def _fts_phrase(value: str) -> str:
+    # Слова пользователя — отдельные термы в кавычках, без синтаксиса FTS5
+    words = re.findall(r"\w+", value)
+    return " AND ".join(f'"{word}"' for word in words) if words else '""'
+
+
+def query(conn: sqlite3.Connection, document_type: str = None, sender: str = None, recipient: str = None,
+          number: str = None, date: str = None, date_from: str = None, date_to: str = None,
+          text: str = None, limit: int = 20) -> list:
+    """
+        Поиск документов. document_type, number — точное совпадение
+        (номер без учёта регистра), date, date_from, date_to — ГГГГ-ММ-ДД
+        или любой формат, понятный iso_date; sender, recipient — все слова
+        встречаются в реквизите; text — запрос FTS5 к тексту документа
+        (слова, "фраза", префикс*, OR, NOT). Возвращает словари
+        с реквизитами, а при text — ещё и фрагментом текста.
+    """
+    conditions = []
+    params = []
+    match = []
+    if document_type:
+        conditions.append("d.document_type = ?")
+        params.append(document_type)
+    if number:
+        conditions.append("d.document_number = ?")
+        params.append(number)
+    for value, operator in ((date, "="), (date_from, ">="), (date_to, "<=")):
+        if value:
+            conditions.append(f"d.date_iso {operator} ?")
+            params.append(iso_date(value) or value)
+    if sender:
+        match.append(f"sender : ({_fts_phrase(sender)})")
+    if recipient:
+        match.append(f"recipient : ({_fts_phrase(recipient)})")
+    if text:
+        match.append(f"({text})")
+
+    columns = "d.file, d.document_type, d.document_date, d.document_number, d.sender, d.recipient, d.subject"
+    if match:
+        snippet = ", snippet(documents_fts, 0, '[', ']', '…', 12) AS snippet" if text else ""
+        sql = (f"SELECT {columns}{snippet} FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid "
+               f"WHERE documents_fts MATCH ?")
+        params.insert(0, " AND ".join(match))
+        if conditions:
+            sql += " AND " + " AND ".join(conditions)
+        sql += " ORDER BY rank" if text else " ORDER BY d.date_iso DESC"
+    else:
+        sql = f"SELECT {columns} FROM documents d"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY d.date_iso DESC"
+    sql += " LIMIT ?"
+    params.append(limit)
+
+    cursor = conn.execute(sql, params)
+    names = [description[0] for description in cursor.description]
+    return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+
+def _shorten(value, width: int) -> str:
+    value = "" if value is None else str(value)
+    return value if len(value) <= width else value[:width - 1] + "…"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="main_cli.py query",
+                                     description="Поиск по хранилищу результатов (results.sqlite)")
+    parser.add_argument("database", help="Файл базы или папка результатов с results.sqlite")
+    parser.add_argument("--type", dest="document_type", help="Тип документа")
+    parser.add_argument("--sender", help="Слова в отправителе")
+    parser.add_argument("--recipient", help="Слова в получателе")
+    parser.add_argument("--number", help="Номер документа")
+    parser.add_argument("--date", help="Дата документа")
+    parser.add_argument("--date-from", help="Дата не раньше")
+    parser.add_argument("--date-to", help="Дата не позже")
+    parser.add_argument("--text", help="Полнотекстовый запрос FTS5 по тексту документа")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="Вывести найденное строками JSON")
+    args = parser.parse_args(argv)
+
+    path = os.path.join(args.database, STORE_NAME) if os.path.isdir(args.database) else args.database
+    if not os.path.exists(path):
+        parser.error(f"нет базы {path}")
+
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    started = time.perf_counter()
+    try:
+        rows = query(conn, document_type=args.document_type, sender=args.sender, recipient=args.recipient,
+                     number=args.number, date=args.date, date_from=args.date_from, date_to=args.date_to,
+                     text=args.text, limit=args.limit)
+    except sqlite3.OperationalError as e:
+        parser.error(f"ошибка запроса: {e}")
+    elapsed = time.perf_counter() - started
+    conn.close()
+
+    for row in rows:
+        if args.json:
+            print(json.dumps(row, ensure_ascii=False))
+            continue
+        print(f"{_shorten(row['file'], 40):<40} {_shorten(row['document_type'], 16):<16} "
+              f"{_shorten(row['document_date'], 12):<12} {_shorten(row['document_number'], 12):<12} "
+              f"{_shorten(row['sender'], 40)}")
+        if row.get("snippet"):
+            print(f"    {' '.join(row['snippet'].split())}")
+    print(f"Найдено: {len(rows)} за {elapsed * 1000:.1f} мс")
@@ -0,0 +1,232 @@
+"""
+Обработка пакетов документов в процессах под надзором: у каждого
+документа есть бюджет времени, у процесса-обработчика — бюджет памяти
+(RSS). Процесс, превысивший бюджет или упавший, убивается вместе с
+дочерними процессами (tesseract) и перезапускается; остальные
+процессы продолжают работу.
+
+Неудачный пакет из нескольких документов разбивается на одиночные, чтобы
+найти виновника, не расходуя попытки соседей. Документ, исчерпавший
+попытки, попадает в карантин.
+"""
+import os
+import sys
+import time
+import signal
+import logging
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import wait
+
+# Как часто проверяются сроки и память процессов, секунды
+POLL_INTERVAL = 0.5
+# Сколько раз подряд процесс может упасть при запуске (загрузке моделей)
+MAX_START_FAILURES = 3
+# Наименьший срок запуска процесса, секунды: загрузка моделей может
+# занять больше бюджета одного документа
+START_TIMEOUT = 120.0
+
+
+def process_rss_mb(pid: int):
+    """
+        Резидентная память процесса в МБ: /proc на Linux, иначе psutil
+        (если установлен), иначе None.
+    """
+    try:
+        with open(f"/proc/{pid}/status", "rb") as f:
+            for line in f:
+                if line.startswith(b"VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss / 2 ** 20
+    except Exception:
+        return None
+
+
+def _worker_main(conn, init_args):
+    # Своя группа процессов: при остановке убиваются и запущенные
+    # обработчиком процессы tesseract
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()
+    from src.cli import _init_worker, _process_batch
+
+    _init_worker(*init_args, True)
+    conn.send(("ready", None))
+    while True:
+        paths = conn.recv()
+        if paths is None:
+            break
+        try:
+            conn.send(("done", _process_batch(paths)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    def __init__(self, ctx, init_args, start_timeout=None):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child, init_args), daemon=True)
+        self.process.start()
+        child.close()
+        self.ready = False
+        self.task = None
+        # Срок отсчитывается с запуска: процесс, зависший до первого
+        # задания, тоже убивается
+        self.deadline = time.monotonic() + start_timeout if start_timeout else None
+
+    def send(self, task, timeout):
+        self.task = task
+        self.deadline = time.monotonic() + timeout * len(task.names) if timeout else None
+        self.conn.send(task.paths)
+
+    def kill(self):
+        if self.process.is_alive():
+            try:
+                if hasattr(os, "killpg"):
+                    os.killpg(self.process.pid, signal.SIGKILL)
+                else:
+                    self.process.kill()
+            except OSError:
+                self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.kill()
+
+
+class Task:
+    def __init__(self, names: list, paths: list):
+        self.names = names
+        self.paths = paths
+
+
+class Supervisor:
+    """
+        timeout — секунд на документ (пакет из N документов получает N×timeout),
+        memory_mb — предельный RSS процесса-обработчика,
+        retries — сколько раз повторять документ после сбоя (таймаут,
+        превышение памяти, падение процесса).
+        handle(names, results, pid, elapsed, cache_hits) — как в src.cli._run,
+        on_quarantine(name, reason, attempts) — документ исчерпал попытки.
+    """
+
+    def __init__(self, workers: int, init_args: tuple, timeout: float = None, memory_mb: float = None,
+                 retries: int = 1):
+        self.workers = max(1, workers)
+        self.init_args = init_args
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.retries = max(0, retries)
+        self.failures = {}
+        if memory_mb and process_rss_mb(os.getpid()) is None:
+            logging.error("Process memory is not observable here (no /proc, no psutil): memory budget is not enforced")
+            self.memory_mb = None
+
+    def run(self, tasks, handle, on_quarantine):
+        ctx = multiprocessing.get_context()
+        queue = deque(tasks)
+        workers = [self._spawn(ctx) for _ in range(self.workers)]
+        start_failures = 0
+        try:
+            while queue or any(worker.task for worker in workers):
+                for worker in workers:
+                    if worker.ready and worker.task is None and queue:
+                        task = queue.popleft()
+                        for name in task.names:
+                            print(f"Обрабатываю файл: {name}")
+                        worker.send(task, self.timeout)
+
+                ready = wait([w.conn for w in workers] + [w.process.sentinel for w in workers], POLL_INTERVAL)
+                for i, worker in enumerate(workers):
+                    reason, restart = None, False
+                    if worker.conn in ready:
+                        try:
+                            kind, payload = worker.conn.recv()
+                        except (EOFError, OSError):
+                            worker.process.join(timeout=1)
+                            kind, payload = "died", None
+                        if kind == "died":
+                            reason = f"процесс завершился с кодом {worker.process.exitcode}"
+                            restart = True
+                        elif kind == "ready":
+                            worker.ready = True
+                            start_failures = 0
+                        elif kind == "done":
+                            task, worker.task = worker.task, None
+                            try:
+                                handle(task.names, *payload)
+                            except Exception as e:
+                                print(f"Ошибка обработки {', '.join(task.names)}: {e}")
+                        elif kind == "error":
+                            # Исключение внутри обработчика: процесс жив, перезапуск не нужен
+                            reason = payload
+                    if reason is None:
+                        reason = self._check(worker, ready)
+                        restart = reason is not None
+                    if reason is None:
+                        continue
+
+                    if not worker.ready:
+                        start_failures += 1
+                        if start_failures >= MAX_START_FAILURES:
+                            raise RuntimeError(f"Worker process keeps failing at startup: {reason}")
+                    if worker.task is not None:
+                        task, worker.task = worker.task, None
+                        self._requeue(task, reason, queue, on_quarantine)
+                    if restart:
+                        worker.kill()
+                        workers[i] = self._spawn(ctx)
+        finally:
+            for worker in workers:
+                if worker.task is None and worker.ready:
+                    worker.stop()
+                else:
+                    worker.kill()
+
+    def _spawn(self, ctx):
+        start_timeout = max(self.timeout, START_TIMEOUT) if self.timeout else None
+        return _Worker(ctx, self.init_args, start_timeout)
+
+    def _check(self, worker, ready):
+        if worker.process.sentinel in ready or not worker.process.is_alive():
+            worker.process.join(timeout=1)
+            return f"процесс завершился с кодом {worker.process.exitcode}"
+        if worker.ready and worker.task is None:
+            return None
+        if worker.deadline is not None and time.monotonic() > worker.deadline:
+            if not worker.ready:
+                return f"процесс не запустился за {max(self.timeout, START_TIMEOUT):g} с"
+            return f"превышен лимит времени ({self.timeout:g} с на документ)"
+        if self.memory_mb:
+            rss = process_rss_mb(worker.process.pid)
+            if rss is not None and rss > self.memory_mb:
+                return f"превышен лимит памяти ({rss:.0f} МБ > {self.memory_mb:g} МБ)"
+        return None
+
+    def _requeue(self, task, reason, queue, on_quarantine):
+        if len(task.names) > 1:
+            # Виновник неизвестен: документы пакета повторяются по одному,
+            # попытка не засчитывается
+            print(f"Сбой пакета ({reason}), документы будут обработаны по одному", file=sys.stderr)
+            queue.extend(Task([name], [path]) for name, path in zip(task.names, task.paths))
+            return
+
+        name = task.names[0]
+        attempts = self.failures.get(name, 0) + 1
+        self.failures[name] = attempts
+        if attempts > self.retries:
+            print(f"Карантин: {name} ({reason}, попыток: {attempts})", file=sys.stderr)
+            on_quarantine(name, reason, attempts)
+        else:
+            print(f"Повтор {attempts}/{self.retries}: {name} ({reason})", file=sys.stderr)
+            queue.append(task)
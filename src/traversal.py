@@ -0,0 +1,105 @@
+"""
+Обход входной папки и разбиение работы на доли (шарды) для запуска
+на нескольких машинах с общей файловой системой.
+
+Доля файла определяется хэшем его пути относительно входной папки,
+поэтому узлы, запущенные с одинаковыми --shard i/N, без какой-либо
+координации получают непересекающиеся наборы файлов, покрывающие всю папку.
+"""
+import os
+import hashlib
+import fnmatch
+
+
+def parse_shard(value: str) -> tuple:
+    """
+        "i/N" -> (i, N), доли нумеруются с 1.
+    """
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"Shard must look like i/N, got: {value}")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Shard index must be between 1 and N, got: {value}")
+    return index, count
+
+
+def shard_name(shard: tuple) -> str:
+    """
+        Метка доли в именах манифеста и потоковых файлов результатов.
+    """
+    index, count = shard
+    return f"shard-{index:0{len(str(count))}d}-of-{count}"
+
+
+def _portable(relative_path: str) -> str:
+    # Хэш не должен зависеть от разделителя путей ОС узла
+    return relative_path.replace(os.sep, "/")
+
+
+def in_shard(relative_path: str, shard: tuple) -> bool:
+    index, count = shard
+    digest = hashlib.sha1(_portable(relative_path).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count == index - 1
+
+
+def _matches(relative_path: str, patterns) -> bool:
+    path = _portable(relative_path)
+    name = path.rsplit("/", 1)[-1]
+    return any(fnmatch.fnmatch(path, pattern) or fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+
+def in_excluded_dir(relative_path: str, exclude) -> bool:
+    """
+        Лежит ли файл в подпапке, которую iter_files не обходит из-за exclude
+        (для файлов, найденных не обходом, а наблюдением за папкой).
+    """
+    parts = _portable(relative_path).split("/")[:-1]
+    return bool(exclude) and any(
+        _matches("/".join(parts[:i]), exclude) for i in range(1, len(parts) + 1)
+    )
+
+
+def file_filter(accept=None, include=None, exclude=None, shard=None):
+    """
+        Предикат для относительного пути файла: поддерживаемый тип (accept),
+        совпадение с одним из шаблонов include (если заданы), ни одного
+        совпадения с exclude и принадлежность доле shard.
+        Шаблоны сравниваются и с путём ("архив/2023/*.pdf"), и с именем файла.
+    """
+    def check(relative_path: str) -> bool:
+        if accept is not None and not accept(relative_path):
+            return False
+        if include and not _matches(relative_path, include):
+            return False
+        if exclude and _matches(relative_path, exclude):
+            return False
+        return shard is None or in_shard(relative_path, shard)
+    return check
+
+
+def iter_files(input_folder: str, recursive: bool = False, exclude=None):
+    """
+        Относительные пути файлов папки (os.scandir) в детерминированном
+        порядке: файлы папки по имени, затем подпапки по имени.
+        Подпапки, совпадающие с exclude, не обходятся; по символическим
+        ссылкам на папки обход не идёт (защита от циклов).
+    """
+    stack = [""]
+    while stack:
+        relative_dir = stack.pop()
+        with os.scandir(os.path.join(input_folder, relative_dir)) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+
+        subdirs = []
+        for entry in entries:
+            relative_path = os.path.join(relative_dir, entry.name)
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive and not (exclude and _matches(relative_path, exclude)):
+                        subdirs.append(relative_path)
+                elif entry.is_file():
+                    yield relative_path
+            except OSError:
+                continue
+        stack.extend(reversed(subdirs))
@@ -0,0 +1,234 @@
+import os
+import sys
+import time
+import select
+import struct
+import logging
+
+# Маски событий inotify (см. <sys/inotify.h>)
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = os.O_CLOEXEC if hasattr(os, "O_CLOEXEC") else 0
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _walk_dirs(folder: str, relative_dir: str = ""):
+    """
+        Подпапки relative_dir (включая её саму) — относительные пути;
+        по символическим ссылкам на папки обход не идёт.
+    """
+    stack = [relative_dir]
+    while stack:
+        current = stack.pop()
+        yield current
+        try:
+            with os.scandir(os.path.join(folder, current)) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(os.path.join(current, entry.name))
+        except OSError:
+            continue
+
+
+def _files_in(folder: str, relative_dir: str) -> set:
+    names = set()
+    try:
+        with os.scandir(os.path.join(folder, relative_dir)) as it:
+            for entry in it:
+                if entry.is_file():
+                    names.add(os.path.join(relative_dir, entry.name))
+    except OSError:
+        pass
+    return names
+
+
+class InotifySource:
+    """
+        Источник событий файловой системы через inotify (Linux, через libc).
+        recursive — следить и за подпапками, в том числе созданными
+        или перенесёнными в папку во время наблюдения.
+    """
+
+    def __init__(self, folder: str, recursive: bool = False):
+        import ctypes
+        import ctypes.util
+
+        self.folder = folder
+        self.recursive = recursive
+        self._ctypes = ctypes
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        # Дескриптор наблюдения -> папка относительно folder
+        self._dirs = {}
+        try:
+            self._add_watch("")
+        except OSError:
+            os.close(self._fd)
+            raise
+        if recursive:
+            self._add_tree("")
+
+    def _add_watch(self, relative_dir: str):
+        mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+        path = os.path.join(self.folder, relative_dir)
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(self._ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        self._dirs[wd] = relative_dir
+
+    def _add_tree(self, relative_dir: str) -> set:
+        """
+            Наблюдение за папкой и всеми её подпапками. Возвращает файлы,
+            уже лежащие в них: они могли появиться до установки наблюдения.
+        """
+        names = set()
+        for current in _walk_dirs(self.folder, relative_dir):
+            if current:
+                try:
+                    self._add_watch(current)
+                except OSError as e:
+                    logging.error(f"Cannot watch {os.path.join(self.folder, current)}: {e}")
+                    continue
+            names |= _files_in(self.folder, current)
+        return names
+
+    def wait(self, timeout: float) -> set:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        names = set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return names
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & _IN_IGNORED:
+                # Папка удалена или перенесена
+                self._dirs.pop(wd, None)
+                continue
+            relative_dir = self._dirs.get(wd)
+            if not name or relative_dir is None:
+                continue
+            relative_path = os.path.join(relative_dir, os.fsdecode(name))
+            if mask & _IN_ISDIR:
+                if self.recursive and mask & (_IN_CREATE | _IN_MOVED_TO):
+                    names |= self._add_tree(relative_path)
+            else:
+                names.add(relative_path)
+        return names
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingSource:
+    """
+        Запасной вариант для систем без inotify: периодическое сравнение
+        размеров и mtime файлов папки (recursive — и подпапок).
+    """
+
+    def __init__(self, folder: str, interval: float = 1.0, recursive: bool = False):
+        self.folder = folder
+        self.interval = interval
+        self.recursive = recursive
+        self._snapshot = self._scan()
+
+    def _scan(self) -> dict:
+        snapshot = {}
+        for relative_dir in _walk_dirs(self.folder) if self.recursive else [""]:
+            try:
+                with os.scandir(os.path.join(self.folder, relative_dir)) as it:
+                    for entry in it:
+                        if entry.is_file():
+                            st = entry.stat()
+                            snapshot[os.path.join(relative_dir, entry.name)] = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                continue
+        return snapshot
+
+    def wait(self, timeout: float) -> set:
+        time.sleep(min(timeout, self.interval))
+        snapshot = self._scan()
+        changed = {name for name, sig in snapshot.items() if self._snapshot.get(name) != sig}
+        self._snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+def open_source(folder: str, poll_interval: float = 1.0, recursive: bool = False):
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifySource(folder, recursive=recursive)
+        except (OSError, AttributeError) as e:
+            logging.error(f"inotify unavailable, falling back to polling: {e}")
+    return PollingSource(folder, poll_interval, recursive=recursive)
+
+
+def _signature(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def watch_folder(folder: str, on_ready, accept=None, debounce: float = 2.0,
+                 poll_interval: float = 1.0, on_start=None, recursive: bool = False):
+    """
+        Наблюдение за папкой. Файл передаётся в on_ready(list_of_names) только
+        после того, как его размер и mtime не менялись debounce секунд, —
+        так недописанные файлы не попадают в обработку.
+        accept(name) -> bool фильтрует интересующие файлы.
+        on_start() вызывается, когда наблюдение уже установлено, — например,
+        для первичного прохода по папке без риска пропустить новые файлы.
+        recursive — следить и за подпапками; имена передаются путями
+        относительно folder.
+    """
+    source = open_source(folder, poll_interval, recursive=recursive)
+    # имя -> (время последнего изменения, подпись (size, mtime))
+    pending = {}
+    try:
+        if on_start is not None:
+            on_start()
+        while True:
+            timeout = debounce if pending else 60.0
+            changed = source.wait(timeout)
+            now = time.monotonic()
+            for name in changed:
+                if accept is None or accept(name):
+                    pending[name] = (now, _signature(os.path.join(folder, name)))
+
+            ready = []
+            for name, (changed_at, sig) in list(pending.items()):
+                if now - changed_at < debounce:
+                    continue
+                current = _signature(os.path.join(folder, name))
+                if current is None:
+                    del pending[name]
+                elif current != sig:
+                    pending[name] = (now, current)
+                else:
+                    del pending[name]
+                    ready.append(name)
+
+            if ready:
+                on_ready(sorted(ready))
+    finally:
+        source.close()
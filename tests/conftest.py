@@ -0,0 +1,89 @@
+import pytest
+
+
+class _Classifier:
+    """
+        Замена модели классификатора: любой текст — «письмо» с вероятностью 1.
+    """
+    classes_ = ["письмо"]
+
+    def predict_proba(self, texts):
+        import numpy as np
+        return np.ones((len(texts), 1))
+
+
+@pytest.fixture
+def models(monkeypatch):
+    """
+        Конвейер без моделей из data/ и spacy_models/: пустой русский spaCy
+        (реквизиты находят правила, NER ничего не находит) и классификатор
+        с одним классом.
+    """
+    spacy = pytest.importorskip("spacy")
+    from src.core import nlp_extractor, classifier
+
+    monkeypatch.setattr(nlp_extractor, "nlp", spacy.blank("ru"))
+    monkeypatch.setattr(classifier, "_pipeline", _Classifier())
+
+
+@pytest.fixture
+def ner(monkeypatch):
+    """
+        Пустая русская модель с правилами вместо статистического NER.
+    """
+    spacy = pytest.importorskip("spacy")
+    from src.core import nlp_extractor
+
+    model = spacy.blank("ru")
+    ruler = model.add_pipe("entity_ruler")
+    ruler.add_patterns([
+        {"label": "ORG", "pattern": "Ромашка"},
+        {"label": "PER", "pattern": [{"TEXT": "Иванов"}, {"TEXT": "Иван"}]},
+        {"label": "PER", "pattern": [{"TEXT": "Петров"}, {"TEXT": "Пётр"}]},
+    ])
+    monkeypatch.setattr(nlp_extractor, "nlp", model)
+    return model
+
+
+@pytest.fixture
+def make_docx():
+    """
+        make_docx(абзацы) -> содержимое DOCX (python-docx).
+    """
+    pytest.importorskip("docx")
+    import io
+    from docx import Document
+
+    def make(paragraphs) -> bytes:
+        document = Document()
+        for text in paragraphs:
+            document.add_paragraph(text)
+        buffer = io.BytesIO()
+        document.save(buffer)
+        return buffer.getvalue()
+    return make
+
+
+@pytest.fixture
+def make_pdf():
+    """
+        make_pdf(страницы) -> содержимое PDF (PyMuPDF). Страница — список
+        строк текстового слоя или None: страница-скан без текста.
+    """
+    fitz = pytest.importorskip("fitz")
+
+    def make(pages) -> bytes:
+        document = fitz.open()
+        for lines in pages:
+            page = document.new_page()
+            if lines is None:
+                pix = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 64, 64), False)
+                pix.clear_with(200)
+                page.insert_image(page.rect, pixmap=pix)
+                continue
+            # Встроенный шрифт CJK содержит и кириллицу
+            page.insert_text((50, 72), "\n".join(lines), fontname="china-s", fontsize=11)
+        data = document.tobytes()
+        document.close()
+        return data
+    return make
@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+pytest.importorskip("PyQt6.QtWidgets")
+
+from src.app import DarkMockupUI, QApplication  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def qapp():
+    return QApplication.instance() or QApplication([])
+
+
+class _Task:
+    cancelled = False
+
+
+@pytest.fixture
+def ui(qapp, monkeypatch):
+    window = DarkMockupUI()
+    window.add_files(["a.pdf", "b.pdf"])
+    # Задачи не запускаются: сигналы вызываются тестом напрямую
+    monkeypatch.setattr(window.pool, "clear", lambda: None)
+    window.tasks = {0: _Task(), 1: _Task()}
+    yield window
+    window.close()
+
+
+def test_started_signal_after_cancel_is_ignored(ui):
+    ui.on_task_started(0)
+    ui.cancel_processing()
+    # Сигнал started задачи 1 был отправлен до отмены, доставлен после
+    ui.on_task_started(1)
+    ui.on_task_failed(1, "Отменено")
+    ui.on_task_failed(0, "Отменено")
+
+    assert ui.started_at == {}
+    assert ui.tasks == {}
+
+
+def test_result_of_cancelled_task_is_dropped(ui):
+    ui.cancel_processing()
+    ui.on_task_finished(1, {"document_number": "5"})
+
+    assert 1 not in ui.results
+    assert ui.queue_table.item(1, ui.COL_STATUS).text() == "Отменено"
+
+
+def test_supported_extensions_do_not_depend_on_cli():
+    from src.core.text_extractor import is_supported
+
+    assert is_supported("A.PDF") and is_supported("scan.tiff") and is_supported("docs.zip")
+    assert not is_supported("notes.txt")
@@ -0,0 +1,27 @@
+import pytest
+
+from benchmarks.run import percentile, summarize
+
+
+@pytest.mark.parametrize("q, expected", [(50, 5), (90, 9), (95, 10), (99, 10), (100, 10), (10, 1), (0, 1)])
+def test_percentile_nearest_rank_even(q, expected):
+    assert percentile(list(range(10, 0, -1)), q) == expected
+
+
+@pytest.mark.parametrize("q, expected", [(50, 3), (20, 1), (21, 2), (80, 4), (81, 5)])
+def test_percentile_nearest_rank_odd(q, expected):
+    assert percentile([5, 1, 4, 2, 3], q) == expected
+
+
+def test_percentile_empty_and_single():
+    assert percentile([], 50) is None
+    assert percentile([7], 99) == 7
+
+
+def test_summarize():
+    summary = summarize([0.1, 0.2, 0.3, 0.4])
+
+    assert summary["count"] == 4
+    assert summary["p50_ms"] == 200.0
+    assert summary["p99_ms"] == 400.0
+    assert summary["docs_per_sec"] == 4.0
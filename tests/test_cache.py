@@ -0,0 +1,48 @@
+import os
+
+from src.core.cache import ResultCache
+
+
+def test_put_get_roundtrip(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    assert cache.get("ab01") is None
+    cache.put("ab01", {"document_number": "17"})
+
+    assert cache.get("ab01") == {"document_number": "17"}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_required_field_missing_is_miss(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cache.put("ab01", {"document_number": "17"})
+
+    assert cache.get("ab01", required="_text") is None
+    assert cache.misses == 1
+
+
+def test_refresh_skips_reads(tmp_path):
+    ResultCache(str(tmp_path)).put("ab01", {"a": 1})
+
+    assert ResultCache(str(tmp_path), refresh=True).get("ab01") is None
+
+
+def test_overwrite_does_not_grow_size(tmp_path):
+    cache = ResultCache(str(tmp_path), refresh=True)
+    for _ in range(20):
+        cache.put("ab01", {"text": "x" * 100})
+
+    on_disk = sum(size for _, _, size in cache._entries())
+    assert cache._size == on_disk
+
+
+def test_eviction_removes_oldest(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=1000)
+    for i in range(10):
+        key = f"{i:02d}key"
+        cache.put(key, {"text": "x" * 150})
+        path = cache._path(key)
+        os.utime(path, (i, i))
+
+    assert cache._size <= 1000
+    assert cache.get("09key") is not None
+    assert cache.get("00key") is None
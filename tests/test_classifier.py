@@ -0,0 +1,72 @@
+import logging
+
+import pytest
+
+from src.core import classifier
+from src.core.classifier import classify_documents
+
+UNKNOWN = {"label": None, "prob": 0.0, "method": "unknown", "top": []}
+
+
+@pytest.fixture
+def no_model(tmp_path, monkeypatch):
+    monkeypatch.setattr(classifier, "MODEL_PATH", str(tmp_path / "model.pkl"))
+    monkeypatch.setattr(classifier, "MMAP_PATH", str(tmp_path / "model.mmap"))
+    monkeypatch.setattr(classifier, "_pipeline", None)
+    monkeypatch.setattr(classifier, "_load_error", None)
+    return tmp_path / "model.pkl"
+
+
+def test_missing_model_is_logged_once_and_handled(no_model, monkeypatch, caplog):
+    calls = []
+    load = classifier._load_model
+    monkeypatch.setattr(classifier, "_load_model", lambda: calls.append(1) or load())
+
+    with caplog.at_level(logging.ERROR):
+        assert classify_documents(["a", "b"]) == [UNKNOWN, UNKNOWN]
+        assert classify_documents(["c"]) == [UNKNOWN]
+
+    assert len(calls) == 1
+    assert [r.message for r in caplog.records if "could not be loaded" in r.message] \
+        == [f"Classifier model could not be loaded: Model not found at {no_model}"]
+
+
+def test_corrupt_model_is_handled(no_model):
+    pytest.importorskip("joblib")
+    no_model.write_bytes(b"not a pickle")
+
+    assert classify_documents(["a"]) == [UNKNOWN]
+    with pytest.raises(Exception):
+        # Прогрев при запуске сообщает об ошибке
+        classifier._load_resources()
+
+
+def test_top_labels(monkeypatch):
+    np = pytest.importorskip("numpy")
+
+    class Model:
+        classes_ = ["акт", "письмо", "счёт"]
+
+        def predict_proba(self, texts):
+            return np.array([[0.2, 0.5, 0.3]] * len(texts))
+
+    monkeypatch.setattr(classifier, "_pipeline", Model())
+
+    result = classify_documents(["x"], top_k=2)[0]
+
+    assert (result["label"], result["prob"], result["method"]) == ("Письмо", 0.5, "ml")
+    assert [t["label"] for t in result["top"]] == ["Письмо", "Счёт"]
+
+
+def test_importing_cli_loads_no_heavy_libraries():
+    import os
+    import sys
+    import subprocess
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = ("import sys, main_cli, src.core.processor, src.core.pipeline; "
+            "print(' '.join(m for m in ('spacy', 'sklearn', 'fitz', 'pymupdf', 'joblib', 'pdfplumber', "
+            "'docx', 'PIL', 'numpy') if m in sys.modules))")
+    output = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+
+    assert output.stdout.strip() == ""
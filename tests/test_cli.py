@@ -0,0 +1,71 @@
+from src.cli import WorkerPool
+
+
+def test_worker_pool_is_reused_for_same_options():
+    pool = WorkerPool()
+    try:
+        first = pool.get(2, (None, 1))
+        assert pool.get(2, (None, 1)) is first
+        assert pool.get(3, (None, 1)) is not first
+    finally:
+        pool.close()
+
+
+def test_worker_pool_initializes_local_worker_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr("src.cli._init_worker", lambda *args: calls.append(args))
+    pool = WorkerPool()
+    pool.init_local(({"cache_dir": "c"}, 1))
+    pool.init_local(({"cache_dir": "c"}, 1))
+    pool.init_local(({"cache_dir": "d"}, 1))
+
+    assert len(calls) == 2
+
+
+def _failing_on(name):
+    def process_documents(file_paths, **options):
+        if any(name in str(path) for path in file_paths):
+            raise RuntimeError("сбой классификатора")
+        return [{"document_number": str(path)} for path in file_paths]
+    return process_documents
+
+
+def test_batch_failure_only_hits_failing_document(monkeypatch):
+    from src import cli
+
+    monkeypatch.setattr(cli, "process_documents", _failing_on("bad"))
+
+    results, _, _, _ = cli._process_batch(["a.pdf", "bad.pdf", "c.pdf"])
+
+    assert results == [{"document_number": "a.pdf"}, {"error": "Ошибка обработки: сбой классификатора"},
+                       {"document_number": "c.pdf"}]
+
+
+def test_process_folder_writes_neighbours_of_failing_document(tmp_path, monkeypatch):
+    import json
+    from src import cli
+
+    monkeypatch.setattr(cli, "process_documents", _failing_on("bad"))
+    (tmp_path / "in").mkdir()
+    for name in ("a.pdf", "bad.pdf", "c.pdf"):
+        (tmp_path / "in" / name).write_bytes(b"%PDF-1.4")
+
+    cli.process_folder(str(tmp_path / "in"), str(tmp_path / "out"), batch_size=3)
+
+    assert sorted(p.name for p in (tmp_path / "out").glob("*.json")) == ["a.json", "bad.json", "c.json"]
+    assert "error" in json.loads((tmp_path / "out" / "bad.json").read_text(encoding="utf-8"))
+
+
+def test_journal_is_kept_only_with_resume(tmp_path, monkeypatch):
+    from src import cli
+
+    monkeypatch.setattr(cli, "process_documents", _failing_on("bad"))
+    (tmp_path / "in").mkdir()
+    (tmp_path / "in" / "a.pdf").write_bytes(b"%PDF-1.4")
+    journal = tmp_path / "out" / ".journal.jsonl"
+
+    cli.process_folder(str(tmp_path / "in"), str(tmp_path / "out"), output_format="jsonl")
+    assert not journal.exists()
+
+    cli.process_folder(str(tmp_path / "in"), str(tmp_path / "out"), output_format="jsonl", resume=True)
+    assert '"a.pdf"' in journal.read_text(encoding="utf-8")
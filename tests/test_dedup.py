@@ -0,0 +1,72 @@
+import pytest
+
+# Индекс почти-дубликатов хранит хэши в массивах numpy
+pytest.importorskip("numpy")
+from src.core.dedup import NearDuplicateIndex, text_hash, key_fields, hamming
+
+BODY = ("Уведомляем вас о том, что в соответствии с условиями договора поставки "
+        "оплата по выставленному счёту должна быть произведена в течение десяти "
+        "банковских дней с момента получения настоящего уведомления. В случае "
+        "просрочки платежа поставщик вправе начислить неустойку в размере, "
+        "установленном договором, и приостановить дальнейшие отгрузки товара.")
+
+
+def _letter(number, date, ending=""):
+    # Длинное письмо: номер и дата — малая доля его триграмм
+    return (["ООО «Ромашка»", "", f"Исх. № {number} от {date}", "", "Кому: АО «Вектор»", "",
+             "Тема: об оплате", ""] + [BODY] * 6 + [ending, "С уважением, директор"])
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "index.sqlite"))
+    yield index
+    index.close()
+
+
+def test_key_fields_normalize_whitespace():
+    assert key_fields("Исх. №  17/2  от 05.03.2024") == {"document_number": "17/2", "document_date": "05.03.2024"}
+    assert key_fields("без реквизитов") == {"document_number": None, "document_date": None}
+
+
+def test_template_letters_are_not_reused(tmp_path, index, models, make_docx):
+    from src.core.processor import process_documents
+
+    first = "\n".join(_letter("17", "05.03.2024"))
+    other = "\n".join(_letter("18", "06.03.2024"))
+    # Письма одного шаблона близки по SimHash — порог их не различает
+    assert hamming(text_hash(first), text_hash(other)) <= index.text_distance
+
+    paths = []
+    for name, paragraphs in (("a.docx", _letter("17", "05.03.2024")),
+                             ("b.docx", _letter("18", "06.03.2024")),
+                             ("c.docx", _letter("17", "05.03.2024", "Спасибо."))):
+        path = tmp_path / name
+        path.write_bytes(make_docx(paragraphs))
+        paths.append(str(path))
+
+    a, b, c = [process_documents([path], near_duplicates=index)[0] for path in paths]
+
+    assert "reused_from" not in b
+    assert (b["document_number"], b["document_date"]) == ("18", "06.03.2024")
+    # То же письмо с мелкой правкой узнаётся
+    assert c["reused_from"]["source"] == paths[0]
+    assert c["document_number"] == "17"
+
+
+def test_image_match_checks_first_page_fields(index):
+    result = {"document_number": "17", "document_date": "05.03.2024"}
+    index.add("a.png", result, image=[0b1011])
+    calls = []
+
+    def fields(number):
+        def read():
+            calls.append(number)
+            return {"document_number": number, "document_date": "05.03.2024"}
+        return read
+
+    assert index.match_image([0b1111], fields=fields("18")) is None
+    assert index.match_image([0b1111], fields=fields("17"))["result"] == result
+    # Без кандидатов первая страница не распознаётся
+    assert index.match_image([(1 << 64) - 1 - 0b1011], fields=fields("17")) is None
+    assert calls == ["18", "17"]
@@ -0,0 +1,84 @@
+import io
+import tracemalloc
+
+import pytest
+
+from src.core.docx_reader import iter_part_paragraphs, read_docx_paragraphs, read_docx_text
+
+docx = pytest.importorskip("docx")
+from docx.shared import Cm  # noqa: E402
+
+NS = ('xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+      'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006"')
+
+
+def _part(body: str) -> io.BytesIO:
+    return io.BytesIO(f'<w:document {NS}><w:body>{body}</w:body></w:document>'.encode("utf-8"))
+
+
+def _save(document) -> io.BytesIO:
+    buffer = io.BytesIO()
+    document.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def test_tab_stops_are_not_text():
+    document = docx.Document()
+    paragraph = document.add_paragraph()
+    paragraph.paragraph_format.tab_stops.add_tab_stop(Cm(5))
+    paragraph.paragraph_format.tab_stops.add_tab_stop(Cm(10))
+    run = paragraph.add_run("Дата")
+    run.add_tab()
+    paragraph.add_run("№ 5")
+    buffer = _save(document)
+
+    assert read_docx_text(buffer) == "Дата\t№ 5"
+    buffer.seek(0)
+    assert [p.text for p in docx.Document(buffer).paragraphs] == ["Дата\t№ 5"]
+
+
+def test_same_text_as_python_docx_with_table_and_header():
+    document = docx.Document()
+    document.sections[0].header.paragraphs[0].text = "ООО «Бланк»"
+    document.add_paragraph("Исх. № 17 от 05.03.2024")
+    table = document.add_table(rows=2, cols=2)
+    for i, cell in enumerate(table._cells):
+        cell.text = f"ячейка {i}"
+    document.add_paragraph("Подпись")
+
+    assert read_docx_paragraphs(_save(document)) == [
+        "ООО «Бланк»", "Исх. № 17 от 05.03.2024", "ячейка 0", "ячейка 1", "ячейка 2", "ячейка 3", "Подпись",
+    ]
+
+
+def test_breaks_and_hyphens():
+    body = ('<w:p><w:r><w:t>а</w:t><w:br/><w:t>б</w:t><w:br w:type="page"/><w:t>в</w:t>'
+            '<w:noBreakHyphen/><w:t>г</w:t><w:cr/></w:r></w:p>')
+
+    assert list(iter_part_paragraphs(_part(body))) == ["а\nбв-г\n"]
+
+
+def test_textbox_fallback_is_skipped_and_emitted_before_anchor():
+    textbox = '<w:txbxContent><w:p><w:pPr><w:tabs><w:tab w:val="left" w:pos="720"/></w:tabs></w:pPr>' \
+              '<w:r><w:t>надпись</w:t></w:r></w:p></w:txbxContent>'
+    body = (f'<w:p><w:r><w:t>якорь</w:t></w:r><w:r><mc:AlternateContent>'
+            f'<mc:Choice>{textbox}</mc:Choice><mc:Fallback>{textbox}</mc:Fallback>'
+            f'</mc:AlternateContent></w:r></w:p>')
+
+    assert list(iter_part_paragraphs(_part(body))) == ["надпись", "якорь"]
+
+
+def test_memory_does_not_grow_with_table_size():
+    row = '<w:tr>' + '<w:tc><w:p><w:r><w:t>значение ячейки таблицы</w:t></w:r></w:p></w:tc>' * 4 + '</w:tr>'
+    stream = _part(f'<w:tbl>{row * 5000}</w:tbl>')
+
+    tracemalloc.start()
+    try:
+        count = sum(1 for _ in iter_part_paragraphs(stream))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    assert count == 20000
+    assert peak < 2 ** 20
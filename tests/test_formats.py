@@ -0,0 +1,69 @@
+import io
+import zipfile
+
+import pytest
+
+from src.core.text_extractor import detect_format, InMemoryFile
+
+
+def _zip(names):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name in names:
+            archive.writestr(name, b"x")
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("data, expected", [
+    (b"%PDF-1.7\n", ".pdf"),
+    (b"\x89PNG\r\n\x1a\n....", ".png"),
+    (b"\xff\xd8\xff\xe0", ".jpg"),
+    (b"II*\x00....", ".tiff"),
+    (b"MM\x00*....", ".tiff"),
+    (b"BM......", ".bmp"),
+    (b"\r\n" * 100 + b"%PDF-1.4", ".pdf"),
+])
+def test_signatures(data, expected):
+    assert detect_format(data, "wrong.docx") == expected
+
+
+def test_docx_and_zip_are_told_apart():
+    assert detect_format(_zip(["word/document.xml", "[Content_Types].xml"])) == ".docx"
+    assert detect_format(_zip(["a.pdf", "b.png"]), "upload.docx") == ".zip"
+
+
+def test_broken_zip_is_unknown():
+    assert detect_format(b"PK\x03\x04broken") is None
+
+
+def test_mime_then_extension_fallback():
+    assert detect_format(b"????", mime="application/pdf; charset=binary") == ".pdf"
+    assert detect_format(b"????", "scan.JPEG") == ".jpeg"
+    assert detect_format(b"????", "notes.txt") is None
+
+
+def test_in_memory_file():
+    source = InMemoryFile(b"%PDF-1.4", "a.bin")
+
+    assert source.suffix == ".pdf"
+    assert str(source) == "a.bin"
+    assert source.open().read() == b"%PDF-1.4"
+
+
+LETTER = ["Исх. № 17-А от 05.03.2024", "Тема: поставка бумаги", "Просим поставить бумагу до конца месяца."]
+
+
+def test_zip_archive_is_processed_member_by_member(models, make_docx):
+    from src.core.processor import process_document_bytes
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("letters/a.docx", make_docx(LETTER))
+        archive.writestr("notes.txt", b"plain text")
+    result = process_document_bytes(buffer.getvalue(), "batch.zip")
+
+    assert [entry["file"] for entry in result["documents"]] == ["letters/a.docx", "notes.txt"]
+    letter = result["documents"][0]["result"]
+    assert letter["document_type"] == "Письмо"
+    assert letter["document_number"] == "17-А"
+    assert "error" in result["documents"][1]["result"]
@@ -0,0 +1,120 @@
+import os
+import json
+
+from src.incremental import Manifest, manifest_name, MANIFEST_NAME, Journal, JOURNAL_NAME, QUARANTINE_NAME
+
+
+def _write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def test_new_file_needs_processing(tmp_path):
+    source = tmp_path / "a.pdf"
+    _write(source, b"one")
+    manifest = Manifest(str(tmp_path))
+
+    assert manifest.needs_processing("a.pdf", str(source))
+
+
+def test_recorded_file_is_skipped_after_save(tmp_path):
+    source = tmp_path / "a.pdf"
+    _write(source, b"one")
+    manifest = Manifest(str(tmp_path))
+    manifest.needs_processing("a.pdf", str(source))
+    manifest.record("a.pdf", str(source))
+    manifest.save()
+
+    assert not Manifest(str(tmp_path)).needs_processing("a.pdf", str(source))
+
+
+def test_touched_file_with_same_content_is_skipped(tmp_path):
+    source = tmp_path / "a.pdf"
+    _write(source, b"one")
+    manifest = Manifest(str(tmp_path))
+    manifest.record("a.pdf", str(source))
+    os.utime(source, ns=(1, 1))
+
+    assert not manifest.needs_processing("a.pdf", str(source))
+    assert manifest.entries["a.pdf"]["mtime"] == 1
+
+
+def test_changed_content_needs_processing(tmp_path):
+    source = tmp_path / "a.pdf"
+    _write(source, b"one")
+    manifest = Manifest(str(tmp_path))
+    manifest.record("a.pdf", str(source))
+    _write(source, b"two")
+
+    assert manifest.needs_processing("a.pdf", str(source))
+
+
+def test_change_during_processing_is_noticed_next_run(tmp_path):
+    source = tmp_path / "a.pdf"
+    _write(source, b"one")
+    manifest = Manifest(str(tmp_path))
+    manifest.needs_processing("a.pdf", str(source))
+    # Файл изменился, пока документ обрабатывался
+    _write(source, b"changed")
+    manifest.record("a.pdf", str(source))
+    manifest.save()
+
+    assert Manifest(str(tmp_path)).needs_processing("a.pdf", str(source))
+
+
+def test_unreadable_manifest_starts_from_scratch(tmp_path):
+    (tmp_path / MANIFEST_NAME).write_text("{", encoding="utf-8")
+
+    assert Manifest(str(tmp_path)).entries == {}
+
+
+def test_shard_manifest_starts_from_merged(tmp_path):
+    (tmp_path / MANIFEST_NAME).write_text(json.dumps({"a.pdf": {"size": 1, "mtime": 1, "sha256": "x"}}),
+                                          encoding="utf-8")
+    manifest = Manifest(str(tmp_path), name=manifest_name("shard-1-of-2"))
+
+    assert "a.pdf" in manifest.entries
+    assert manifest.path.endswith(".manifest.shard-1-of-2.json")
+
+
+def test_journal_keeps_only_committed(tmp_path):
+    journal = Journal(str(tmp_path))
+    journal.record("a.pdf", "done")
+    journal.commit()
+    journal.record("b.pdf", "done")
+    # Аварийное завершение: b.pdf не подтверждён
+
+    resumed = Journal(str(tmp_path))
+    assert resumed.status("a.pdf") == "done"
+    assert resumed.status("b.pdf") is None
+
+
+def test_journal_skips_torn_line(tmp_path):
+    (tmp_path / JOURNAL_NAME).write_text(
+        json.dumps({"file": "a.pdf", "status": "done"}) + '\n{"file": "b.p', encoding="utf-8")
+
+    journal = Journal(str(tmp_path))
+    assert journal.status("a.pdf") == "done"
+    assert journal.status("b.pdf") is None
+
+    journal.record("c.pdf", "done")
+    journal.close()
+    assert Journal(str(tmp_path)).status("c.pdf") == "done"
+
+
+def test_journal_without_resume_starts_over(tmp_path):
+    journal = Journal(str(tmp_path))
+    journal.record("a.pdf", "done")
+    journal.close()
+
+    assert Journal(str(tmp_path), resume=False).status("a.pdf") is None
+    assert not (tmp_path / JOURNAL_NAME).exists()
+
+
+def test_journal_reads_merged_fallback(tmp_path):
+    merged = Journal(str(tmp_path), name=QUARANTINE_NAME)
+    merged.record("a.pdf", "quarantined", reason="timeout")
+    merged.close()
+
+    shard = Journal(str(tmp_path), name=".quarantine.shard-1-of-2.jsonl", fallback=QUARANTINE_NAME)
+    assert shard.status("a.pdf") == "quarantined"
@@ -0,0 +1,62 @@
+import os
+import json
+import gzip
+
+import pytest
+
+from src.merge import merge
+from src.incremental import MANIFEST_NAME
+
+
+def _write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def test_merge_manifests_and_jsonl(tmp_path):
+    for i in (1, 2):
+        _write_json(tmp_path / f".manifest.shard-{i}-of-2.json", {f"{i}.pdf": {"size": i, "mtime": i, "sha256": "x"}})
+        (tmp_path / f"results.shard-{i}-of-2.jsonl").write_text(json.dumps({"source": f"{i}.pdf"}) + "\n",
+                                                              encoding="utf-8")
+        with gzip.open(tmp_path / f"results.shard-{i}-of-2.jsonl.gz", "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"source": f"{i}.pdf"}) + "\n")
+
+    report = merge(str(tmp_path))
+
+    assert report["shards"] == ["shard-1-of-2", "shard-2-of-2"]
+    assert report["manifest_entries"] == 2
+    with open(tmp_path / MANIFEST_NAME, encoding="utf-8") as f:
+        assert set(json.load(f)) == {"1.pdf", "2.pdf"}
+    lines = (tmp_path / "results.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["source"] for line in lines] == ["1.pdf", "2.pdf"]
+    with gzip.open(tmp_path / "results.jsonl.gz", "rt", encoding="utf-8") as f:
+        assert len(f.read().splitlines()) == 2
+    assert sorted(os.listdir(tmp_path)) == [MANIFEST_NAME, "results.jsonl", "results.jsonl.gz"]
+
+
+def test_merge_keep_leaves_shard_files(tmp_path):
+    (tmp_path / "results.shard-1-of-1.jsonl").write_text("{}\n", encoding="utf-8")
+
+    merge(str(tmp_path), keep=True)
+
+    assert (tmp_path / "results.shard-1-of-1.jsonl").exists()
+
+
+def test_merge_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+    from src.sinks import ParquetSink
+
+    for i in (1, 2):
+        sink = ParquetSink(str(tmp_path), label=f"shard-{i}-of-2")
+        sink.write(f"{i}.pdf", f"{i}.pdf", {"document_number": str(i)}, {})
+        sink.close()
+
+    report = merge(str(tmp_path))
+
+    merged = [path for path in report["outputs"] if path.endswith(".parquet")]
+    assert pq.read_table(merged[0]).column("document_number").to_pylist() == ["1", "2"]
+
+
+def test_nothing_to_merge(tmp_path):
+    assert merge(str(tmp_path)) == {"shards": [], "outputs": []}
@@ -0,0 +1,55 @@
+from src.metrics import Histogram, BatchMetrics
+
+
+def test_histogram_buckets_are_cumulative_and_inclusive():
+    histogram = Histogram((1, 5))
+    for value in (0.5, 1, 3, 5, 7):
+        histogram.observe(value)
+
+    assert histogram.lines("x") == [
+        'x_bucket{le="1"} 2',
+        'x_bucket{le="5"} 4',
+        'x_bucket{le="+Inf"} 5',
+        "x_sum 16.500000",
+        "x_count 5",
+    ]
+
+
+def test_histogram_labels():
+    histogram = Histogram((1,))
+    histogram.observe(2)
+
+    assert histogram.lines("x", 'stage="nlp"') == [
+        'x_bucket{stage="nlp",le="1"} 0',
+        'x_bucket{stage="nlp",le="+Inf"} 1',
+        'x_sum{stage="nlp"} 2.000000',
+        'x_count{stage="nlp"} 1',
+    ]
+
+
+def _result(seconds, cached=False, error=False):
+    meta = {"seconds": seconds, "stages": {"extract": seconds / 2, "nlp": seconds / 2},
+            "extraction": "text", "pages": 2, "ocr_pages": 1}
+    if cached:
+        meta = {"cached": True}
+    result = {"_meta": meta}
+    if error:
+        result["error"] = "x"
+    return result
+
+
+def test_batch_metrics_slowest_and_counters():
+    metrics = BatchMetrics(slowest=2)
+    for i, seconds in enumerate((0.1, 0.9, 0.5, 0.3)):
+        metrics.observe(f"{i}.pdf", _result(seconds))
+    metrics.observe("cached.pdf", _result(0, cached=True))
+    metrics.observe("bad.pdf", _result(0.2, error=True))
+    metrics.observe("no-meta.pdf", {})
+
+    assert [source for _, source, _ in metrics.slowest()] == ["1.pdf", "2.pdf"]
+    assert metrics.documents.count == 5
+    assert (metrics.cached, metrics.errors, metrics.ocr_pages) == (1, 1, 5)
+
+    text = metrics.render()
+    assert 'textscanner_extraction_total{method="text"} 5' in text
+    assert 'textscanner_stage_seconds_count{stage="nlp"} 5' in text
@@ -0,0 +1,52 @@
+import threading
+
+from src.core import nlp_extractor
+from src.core.nlp_extractor import extract_fields, extract_fields_many
+
+TEXTS = [
+    "ООО «Ромашка»\nг. Москва\n\nИсх. № 17 от 05.03.2024\n\nКому: Иванов Иван\n\nТема: о поставке",
+    "Отправитель: Петров Пётр\n\nПолучатель: ООО «Ромашка»\n\nДокумент № 42\nДата: 12 марта 2024 г.",
+    "Кому: Иванов Иван\n\nТекст без отправителя",
+    "",
+]
+
+
+def test_batch_matches_single_texts(ner):
+    batch = extract_fields_many(TEXTS)
+
+    assert batch == [extract_fields(text) for text in TEXTS]
+    assert batch[0]["sender"] == "Ромашка"
+    assert batch[0]["recipient"] == "Иванов Иван"
+    assert batch[1]["sender"] == "Петров Пётр"
+    assert batch[1]["document_number"] == "42"
+
+
+def test_blocks_go_through_one_locked_pipe(ner, monkeypatch):
+    calls = []
+    pipe = ner.pipe
+
+    def locked_pipe(blocks, **kwargs):
+        assert nlp_extractor._pipe_lock.locked()
+        blocks = list(blocks)
+        calls.append(blocks)
+        return pipe(blocks, **kwargs)
+
+    monkeypatch.setattr(ner, "pipe", locked_pipe)
+
+    extract_fields_many(TEXTS)
+
+    assert len(calls) == 1
+    # Одинаковый блок («Иванов Иван» в двух письмах) анализируется один раз
+    assert len(calls[0]) == len(set(calls[0]))
+
+
+def test_concurrent_calls_share_model(ner):
+    expected = extract_fields_many(TEXTS)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(extract_fields_many(TEXTS))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [expected] * 4
@@ -0,0 +1,94 @@
+import time
+import threading
+
+import pytest
+
+from src.core import ocr
+
+
+@pytest.fixture
+def threads():
+    previous = ocr.OCR_THREADS
+    ocr.configure(threads=2)
+    yield 2
+    ocr.configure(threads=previous)
+
+
+def test_ocr_pages_keeps_order_and_bounds_window(threads, monkeypatch):
+    loaded = []
+    recognized = []
+
+    def recognize(page):
+        # Поздние страницы распознаются быстрее ранних
+        time.sleep(0.02 if page % 2 == 0 else 0.001)
+        recognized.append(page)
+        return f"страница {page}"
+
+    def pages():
+        for number in range(12):
+            # Страница отрисовывается только после того, как освободилось место в окне
+            assert number - len(recognized) <= ocr.OCR_WINDOW
+            loaded.append(number)
+            yield lambda number=number: number
+
+    monkeypatch.setattr(ocr, "recognize", recognize)
+
+    texts = ocr.ocr_pages(pages())
+
+    assert texts == [f"страница {i}" for i in range(12)]
+    assert ocr.OCR_WINDOW == 2 * threads
+
+
+class _Engine:
+    name = "fake"
+    created = []
+
+    def __init__(self, **options):
+        self.options = options
+        self.thread = threading.get_ident()
+        _Engine.created.append(self)
+
+
+@pytest.fixture
+def engines(monkeypatch):
+    # У каждого теста свои движки потоков
+    monkeypatch.setattr(ocr, "_local", threading.local())
+    _Engine.created = []
+
+
+def test_engine_is_reused_per_thread(engines, monkeypatch):
+    monkeypatch.setattr(ocr, "_engine_class", lambda: _Engine)
+
+    first = ocr.get_engine()
+    assert ocr.get_engine() is first
+    assert first.options == {"lang": ocr.OCR_LANG, "psm": 3, "oem": 3}
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(ocr.get_engine()))
+    thread.start()
+    thread.join()
+
+    assert other[0] is not first
+    assert len(_Engine.created) == 2
+
+
+def test_missing_tesserocr_falls_back_to_pytesseract(monkeypatch):
+    import sys
+
+    monkeypatch.setitem(sys.modules, "tesserocr", None)
+    for engine in ("auto", "tesserocr"):
+        monkeypatch.setattr(ocr, "ENGINE", engine)
+        assert ocr._engine_class() is ocr.PytesseractEngine
+
+
+def test_failed_tesserocr_init_falls_back(engines, monkeypatch):
+    class Broken:
+        name = "tesserocr"
+
+        def __init__(self, **options):
+            raise RuntimeError("no tessdata")
+
+    monkeypatch.setattr(ocr, "_engine_class", lambda: Broken)
+    monkeypatch.setattr(ocr, "PytesseractEngine", _Engine)
+
+    assert isinstance(ocr.get_engine(), _Engine)
@@ -0,0 +1,73 @@
+import io
+import zipfile
+import threading
+
+from src.core.pipeline import Pipeline
+
+
+def test_pipeline_processes_documents_and_archives(tmp_path, models, make_docx):
+    letter = make_docx(["ООО «Ромашка»", "", "Исх. № 17 от 05.03.2024", "", "Тема: о поставке"])
+    (tmp_path / "a.docx").write_bytes(letter)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("inner/b.docx", letter)
+        archive.writestr("c.docx", make_docx(["Исх. № 18 от 06.03.2024"]))
+    (tmp_path / "d.zip").write_bytes(buffer.getvalue())
+
+    pipeline = Pipeline(extract_workers=1, batch_timeout=0.01)
+    results = dict(pipeline.run([(name, str(tmp_path / name)) for name in ("a.docx", "d.zip")]))
+
+    assert results["a.docx"]["document_number"] == "17"
+    documents = results["d.zip"]["documents"]
+    assert [d["file"] for d in documents] == ["inner/b.docx", "c.docx"]
+    assert [d["result"]["document_number"] for d in documents] == ["17", "18"]
+    assert "error" not in results["d.zip"]
+
+
+def _run_in_thread(pipeline, jobs):
+    # Зависший run не должен вешать весь прогон тестов
+    results = {}
+    thread = threading.Thread(target=lambda: results.update(pipeline.run(jobs)), daemon=True)
+    thread.start()
+    thread.join(timeout=60)
+    assert not thread.is_alive(), "Pipeline.run завис"
+    return results
+
+
+def test_failing_completion_gives_error_result(tmp_path, models, make_docx, monkeypatch):
+    from src.core import pipeline as module
+
+    complete = module.complete_document
+
+    def complete_document(item, *args, **kwargs):
+        if "bad" in item["key_"]:
+            raise RuntimeError("сбой кэша")
+        return complete(item, *args, **kwargs)
+
+    monkeypatch.setattr(module, "complete_document", complete_document)
+    for name in ("a.docx", "bad.docx", "c.docx"):
+        (tmp_path / name).write_bytes(make_docx(["Исх. № 17 от 05.03.2024"]))
+
+    results = _run_in_thread(Pipeline(extract_workers=1, batch_timeout=0.01),
+                             [(name, str(tmp_path / name)) for name in ("a.docx", "bad.docx", "c.docx")])
+
+    assert results["bad.docx"] == {"error": "Ошибка обработки: сбой кэша"}
+    assert results["a.docx"]["document_number"] == results["c.docx"]["document_number"] == "17"
+
+
+def test_failing_extract_callback_gives_error_result(tmp_path, models, make_docx, monkeypatch):
+    from src.core import pipeline as module
+
+    observe = module.StageStats.observe
+
+    def failing_observe(self, *args):
+        if self.name == "extract":
+            raise RuntimeError("сбой статистики")
+        return observe(self, *args)
+
+    monkeypatch.setattr(module.StageStats, "observe", failing_observe)
+    (tmp_path / "a.docx").write_bytes(make_docx(["Исх. № 17 от 05.03.2024"]))
+
+    results = _run_in_thread(Pipeline(extract_workers=1, batch_timeout=0.01), [("a.docx", str(tmp_path / "a.docx"))])
+
+    assert results == {"a.docx": {"error": "Ошибка обработки: сбой статистики"}}
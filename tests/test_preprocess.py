@@ -0,0 +1,79 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+pytest.importorskip("PIL")
+from PIL import Image, ImageDraw
+
+from src.core import ocr
+from src.core.preprocess import preprocess, effective_dpi, binarize, crop_borders, estimate_skew
+
+
+def _page(size=(850, 1100), dpi=100):
+    image = Image.new("L", size, 255)
+    draw = ImageDraw.Draw(image)
+    for y in range(100, 1000, 40):
+        draw.rectangle((100, y, 750, y + 12), fill=0)
+    image.info["dpi"] = (dpi, dpi)
+    return image
+
+
+def test_default_profile_is_previous_pipeline():
+    env = {key: value for key, value in os.environ.items() if key != "TEXTSCANNER_OCR_PROFILE"}
+    output = subprocess.run([sys.executable, "-c", "import src.core.ocr as o; print(o.PROFILE)"],
+                            env=env, capture_output=True, text=True, check=True).stdout
+
+    assert output.strip() == "raw"
+    assert ocr.PROFILES["raw"] == {"dpi": 200, "psm": 3, "oem": 3, "lang": ocr.OCR_LANG, "preprocess": False}
+
+
+def test_raw_profile_returns_image_untouched():
+    page = _page()
+    assert preprocess(page, ocr.PROFILES["raw"]) is page
+
+
+@pytest.mark.parametrize("steps", [{}, {"crop": True}])
+def test_preprocess_does_not_mutate_input_info(steps):
+    if steps.get("crop"):
+        pytest.importorskip("numpy")
+    page = _page(dpi=150)
+    profile = {"dpi": 200, "downscale": True, **steps}
+
+    result = preprocess(page, profile)
+
+    assert page.info["dpi"] == (150, 150)
+    assert result.info["dpi"] == (150, 150)
+
+
+def test_downscale_to_profile_dpi():
+    page = _page(size=(1700, 2200), dpi=400)
+    result = preprocess(page, {"dpi": 200, "downscale": True})
+
+    assert result.size == (850, 1100)
+    assert result.info["dpi"] == (200, 200)
+    assert page.size == (1700, 2200)
+
+
+def test_effective_dpi_estimated_from_a4_without_metadata():
+    image = Image.new("L", (1169, 827), 255)
+    assert effective_dpi(image) == pytest.approx(100, rel=0.01)
+
+
+def test_binarize_and_crop_dark_border():
+    pytest.importorskip("numpy")
+    page = Image.new("L", (400, 400), 20)
+    ImageDraw.Draw(page).rectangle((30, 30, 369, 369), fill=230)
+    ImageDraw.Draw(page).rectangle((150, 150, 250, 200), fill=60)
+
+    cropped = crop_borders(page, margin=5)
+    assert cropped.size == (111, 61)
+    histogram = binarize(cropped).histogram()
+    assert {value for value, count in enumerate(histogram) if count} == {0, 255}
+
+
+def test_estimate_skew_finds_rotation():
+    pytest.importorskip("numpy")
+    page = _page().rotate(2.0, fillcolor=255, expand=True)
+    assert estimate_skew(page) == pytest.approx(-2.0, abs=0.3)
@@ -0,0 +1,38 @@
+from src.core.processor import process_document, early_exit_options
+from src.core.text_extractor import InMemoryFile
+
+FIRST_PAGE = ["ООО Ромашка", "г. Москва", "Исх. № 17 от 05.03.2024", "Тема: о поставке"]
+BODY_PAGE = ["Просим согласовать график поставки товара на следующий квартал."]
+
+
+def _letter(make_pdf, pages):
+    return InMemoryFile(make_pdf(pages), "letter.pdf")
+
+
+def test_early_exit_stops_after_first_page_when_fields_found(models, ner, make_pdf):
+    result = process_document(_letter(make_pdf, [FIRST_PAGE] + [BODY_PAGE] * 3), early_exit=early_exit_options())
+
+    assert (result["sender"], result["document_date"], result["document_number"]) == ("Ромашка", "05.03.2024", "17")
+    assert result["document_type"] == "Письмо"
+    assert (result["pages_processed"], result["pages_total"]) == (1, 4)
+
+
+def test_early_exit_reads_on_while_a_field_is_missing(models, ner, make_pdf):
+    # Номер документа только на последней странице
+    pages = [FIRST_PAGE[:2] + BODY_PAGE, BODY_PAGE, BODY_PAGE, BODY_PAGE + ["Исх. № 17 от 05.03.2024"]]
+
+    result = process_document(_letter(make_pdf, pages), early_exit=early_exit_options())
+
+    assert result["document_number"] == "17"
+    assert (result["pages_processed"], result["pages_total"]) == (4, 4)
+
+
+def test_early_exit_reads_on_while_classifier_is_unsure(models, ner, make_pdf, monkeypatch):
+    import numpy as np
+    from src.core import classifier
+
+    monkeypatch.setattr(classifier._pipeline, "predict_proba", lambda texts: np.full((len(texts), 1), 0.4))
+
+    result = process_document(_letter(make_pdf, [FIRST_PAGE] + [BODY_PAGE] * 3), early_exit=early_exit_options())
+
+    assert (result["pages_processed"], result["pages_total"]) == (4, 4)
@@ -0,0 +1,57 @@
+import pytest
+
+from benchmarks.field_rules import legacy_scan_fields
+from src.core.rules import RuleSet, RULES_PATH, get_rules
+
+LETTERS = [
+    # Шапка бланка без заголовка, затем реквизиты
+    "ООО «Ромашка»\nг. Москва, ул. Ленина, 1\n\nИсх. № 17/2-к от 05.03.2024\n\n"
+    "Кому: АО «Вектор»\nДиректору Иванову И. И.\n\nТема: о поставке\n\nУважаемый Иван Иванович!\n"
+    "Просим подтвердить поставку.\n\nС уважением,\nПетров П. П.",
+    # Явные заголовки «Отправитель»/«Получатель», дата прописью
+    "Отправитель: ООО «Север»\nг. Мурманск\n\nПолучатель:\nИП Смирнов\n\n"
+    "Документ № 42\nДата: 12 марта 2024 г.\nТема\nОб оплате счёта\n\nТекст письма.",
+    "\n\nОт кого: ЗАО «Юг»\nКраснодар\n\nДата: 2024-01-31\n\nSubject: Договор\n",
+    # Блоки обрываются на заголовке без пустой строки
+    "Отправитель: ООО «Запад»\nКому: ООО «Восток»\nДата 01/02/24\nТема: акт сверки",
+    "Просто текст без реквизитов\nвторая строка",
+    "",
+]
+
+
+@pytest.mark.parametrize("text", LETTERS)
+def test_rules_match_legacy_scan(text):
+    assert get_rules().scan(text) == legacy_scan_fields(text)
+
+
+def test_rules_fields_and_blocks():
+    result, assignments = get_rules().scan(LETTERS[0])
+
+    assert result["document_number"] == "17/2-к"
+    assert result["document_date"] == "05.03.2024"
+    assert result["subject"] == "о поставке"
+    assert assignments[0] == ("sender", "ООО «Ромашка» г. Москва, ул. Ленина, 1")
+    assert ("recipient", "АО «Вектор» Директору Иванову И. И.") in assignments
+
+
+def test_number_on_next_line():
+    text = "От кого: ЗАО «Юг»\n\nНомер:\n15-А\n2024-01-31"
+    result, _ = get_rules().scan(text)
+
+    # Прежний разбор захватывал перевод строки и начало даты: «15-А\n2024»
+    assert result["document_number"] == "15-А"
+    assert legacy_scan_fields(text)[0]["document_number"] == "15-А\n2024"
+
+
+def test_custom_rules_file(tmp_path):
+    import json
+
+    with open(RULES_PATH, encoding="utf-8") as f:
+        spec = json.load(f)
+    spec["values"].append({"field": "inn", "pattern": r"ИНН\s*(\d{10,12})"})
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(spec, ensure_ascii=False), encoding="utf-8")
+
+    result, _ = RuleSet.load(str(path)).scan("ООО «Ромашка»\nИНН 7701234567")
+
+    assert result["inn"] == "7701234567"
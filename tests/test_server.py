@@ -0,0 +1,123 @@
+import os
+import threading
+import http.client
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src import cli
+from src.client import Client
+from src.server import DocumentService, _Job, make_server
+
+
+def _fake_process_documents(file_paths, **options):
+    # Процесс-обработчик видит временный файл с расширением по сигнатуре
+    return [{"suffix": Path(path).suffix, "exists": os.path.exists(path), "pid": os.getpid()}
+            for path in file_paths]
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(service):
+        server = make_server(service, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append((server, service))
+        return server.server_address[1]
+
+    yield start
+    for server, service in servers:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+
+def test_process_runs_in_worker_process_and_removes_body_file(serve, monkeypatch, tmp_path):
+    monkeypatch.setattr(cli, "process_documents", _fake_process_documents)
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+    service = DocumentService(workers=1)
+    service.start()
+    client = Client(f"http://127.0.0.1:{serve(service)}")
+
+    result = client.process_bytes(b"%PDF-1.4\n" + b"0" * 3 * 1024 * 1024, filename="scan.bin")
+
+    assert result == {"suffix": ".pdf", "exists": True, "pid": result["pid"]}
+    assert result["pid"] != os.getpid()
+    assert list(tmp_path.iterdir()) == []
+    assert client.process_path("a.docx")["suffix"] == ".docx"
+
+
+def test_health_and_metrics(serve, monkeypatch):
+    monkeypatch.setattr(cli, "process_documents", _fake_process_documents)
+    service = DocumentService(workers=1, queue_size=3)
+    client = Client(f"http://127.0.0.1:{serve(service)}")
+
+    assert client.health()["status"] == "starting"
+    service.start()
+    health = client.health()
+    assert (health["status"], health["queue"], health["queue_capacity"]) == ("ok", 0, 3)
+
+    client.process_path("a.pdf")
+    metrics = client.metrics()
+    assert "textscanner_requests_total 1\n" in metrics
+    assert "textscanner_processed_total 1\n" in metrics
+    assert "textscanner_errors_total 0\n" in metrics
+    assert "textscanner_queue_depth 0\n" in metrics
+
+
+def test_full_queue_returns_503_with_retry_after(serve):
+    # Обработчики не запущены: очередь из одного места занята
+    service = DocumentService(queue_size=1)
+    service.submit(_Job("a.pdf"))
+    port = serve(service)
+
+    for body, content_type in ((b'{"path": "b.pdf"}', "application/json"),
+                               (b"%PDF-1.4" + b"0" * 100000, "application/octet-stream")):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        conn.request("POST", "/process", body=body, headers={"Content-Type": content_type})
+        response = conn.getresponse()
+        assert response.status == 503
+        assert response.getheader("Retry-After") == "1"
+        assert response.read() == b'{"error": "queue full"}'
+        conn.close()
+
+    assert "textscanner_rejected_total 2\n" in service.metrics()
+
+
+def test_client_retries_after_503():
+    calls = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            calls.append(self.path)
+            if len(calls) < 3:
+                self.send_response(503)
+                self.send_header("Retry-After", "0")
+                body = b'{"error": "queue full"}'
+            else:
+                self.send_response(200)
+                body = b'{"document_number": "1"}'
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        assert Client(url, retries=5).process_path("a.pdf") == {"document_number": "1"}
+        assert len(calls) == 3
+
+        # Повторы исчерпаны — возвращается последний ответ 503
+        calls.clear()
+        assert Client(url, retries=1).process_path("a.pdf") == {"error": "queue full"}
+        assert len(calls) == 2
+    finally:
+        server.shutdown()
+        server.server_close()
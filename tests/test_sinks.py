@@ -0,0 +1,149 @@
+import os
+import json
+import gzip
+
+import pytest
+
+from src.sinks import open_sink, JsonFilesSink, JsonlSink
+
+META = {"elapsed_seconds": 0.5, "worker_pid": 1, "pipeline_version": "v1"}
+
+
+def test_json_files_follow_input_tree(tmp_path):
+    sink = open_sink("json", str(tmp_path))
+    assert isinstance(sink, JsonFilesSink)
+
+    path = sink.write(os.path.join("2024", "a.pdf"), "in/2024/a.pdf", {"document_number": "5"}, META)
+
+    assert path == str(tmp_path / "2024" / "a.json")
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == {"document_number": "5"}
+
+
+def _read_jsonl(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.mark.parametrize("compress", [None, "gzip"])
+def test_jsonl_records_and_append(tmp_path, compress):
+    for run in range(2):
+        sink = open_sink("jsonl", str(tmp_path), compress=compress)
+        assert isinstance(sink, JsonlSink)
+        sink.write("a.pdf", f"in/a{run}.pdf", {"document_number": str(run)}, META)
+        sink.close()
+
+    records = _read_jsonl(sink.path)
+    assert [r["source"] for r in records] == ["in/a0.pdf", "in/a1.pdf"]
+    assert records[1]["result"] == {"document_number": "1"}
+    assert records[0]["pipeline_version"] == "v1"
+
+
+def test_jsonl_shard_label(tmp_path):
+    sink = open_sink("jsonl", str(tmp_path), label="shard-1-of-2")
+    sink.close()
+
+    assert os.path.basename(sink.path) == "results.shard-1-of-2.jsonl"
+
+
+def test_parquet_row_groups(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    sink = open_sink("parquet", str(tmp_path), row_group_size=2)
+    for i in range(5):
+        sink.write(f"{i}.pdf", f"in/{i}.pdf", {"document_number": i, "sender": "ООО"}, META)
+    assert not sink.checkpoint()
+    sink.close()
+
+    table = pq.read_table(sink.path)
+    assert table.num_rows == 5
+    assert table.column("document_number").to_pylist() == ["0", "1", "2", "3", "4"]
+    assert json.loads(table.column("result_json")[0].as_py()) == {"document_number": 0, "sender": "ООО"}
+    assert pq.ParquetFile(sink.path).num_row_groups == 3
+
+
+def test_json_output_does_not_compute_pipeline_version(tmp_path, monkeypatch):
+    from src import cli
+
+    def fail():
+        raise AssertionError("pipeline_version must not be computed")
+
+    monkeypatch.setattr(cli, "pipeline_version", fail)
+    (tmp_path / "in").mkdir()
+    cli.process_folder(str(tmp_path / "in"), str(tmp_path / "out"))
+
+    with pytest.raises(AssertionError):
+        cli.process_folder(str(tmp_path / "in"), str(tmp_path / "out"), output_format="jsonl")
+
+
+_CRASH = """
+import os, sys
+from src.sinks import JsonlSink
+
+sink = JsonlSink(sys.argv[1], compress=sys.argv[2] or None, buffer_size=64, checkpoint_rows=3)
+for i in range(3):
+    sink.write("a.pdf", f"in/{i}.pdf", {"text": "x" * 50}, {})
+assert sink.checkpoint()
+# После контрольной точки: строки частично дошли до файла, затем авария
+for i in range(3, 6):
+    sink.write("a.pdf", f"in/{i}.pdf", {"text": "y" * 50}, {})
+sink._file.flush()
+sink._raw.write(b"\\x1f\\x8b\\x08" if sys.argv[2] else b'{"source": "in/obr')
+sink._raw.flush()
+os._exit(0)
+"""
+
+
+@pytest.mark.parametrize("compress", [None, "gzip"])
+def test_jsonl_resume_after_crash(tmp_path, compress):
+    import sys
+    import subprocess
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", _CRASH, str(tmp_path), compress or ""], cwd=root, check=True)
+
+    # Продолжение дописывает после последней целой строки (члена gzip)
+    sink = open_sink("jsonl", str(tmp_path), compress=compress)
+    sink.write("b.pdf", "in/resumed.pdf", {}, META)
+    sink.close()
+
+    sources = [r["source"] for r in _read_jsonl(sink.path)]
+    assert sources[:3] == ["in/0.pdf", "in/1.pdf", "in/2.pdf"]
+    assert sources[-1] == "in/resumed.pdf"
+    if compress:
+        # Незавершённый член gzip не подтверждён контрольной точкой
+        assert len(sources) == 4
+
+
+@pytest.mark.parametrize("compress", [None, "gzip"])
+def test_jsonl_checkpoint_reaches_file(tmp_path, compress):
+    sink = JsonlSink(str(tmp_path), compress=compress, checkpoint_rows=1)
+    sink.write("a.pdf", "in/a.pdf", {}, META)
+    assert sink.checkpoint()
+
+    # Файл читается целиком, пока приёмник ещё открыт
+    assert [r["source"] for r in _read_jsonl(sink.path)] == ["in/a.pdf"]
+    sink.close()
+
+
+def test_jsonl_checkpoint_every_n_rows_or_seconds(tmp_path, monkeypatch):
+    sink = JsonlSink(str(tmp_path), compress="gzip", checkpoint_rows=3, checkpoint_seconds=60)
+    members = []
+    monkeypatch.setattr(os, "fsync", lambda fd: members.append(fd))
+
+    assert sink.checkpoint()
+    for i in range(2):
+        sink.write(f"{i}.pdf", f"in/{i}.pdf", {}, META)
+        assert not sink.checkpoint()
+    sink.write("2.pdf", "in/2.pdf", {}, META)
+    assert sink.checkpoint()
+    assert len(members) == 1
+
+    # Или по времени с прошлой контрольной точки
+    sink.write("3.pdf", "in/3.pdf", {}, META)
+    sink.checkpoint_seconds = 0
+    assert sink.checkpoint()
+    assert len(members) == 2
+    sink.close()
+
+    assert [r["source"] for r in _read_jsonl(sink.path)] == ["in/0.pdf", "in/1.pdf", "in/2.pdf", "in/3.pdf"]
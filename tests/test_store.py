@@ -0,0 +1,95 @@
+import pytest
+
+from src.store import ResultStore, connect, iso_date, query, store_name, STORE_NAME
+
+META = {"elapsed_seconds": 0.5, "worker_pid": 1, "pipeline_version": "v1"}
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("05.03.2024", "2024-03-05"),
+    ("5/3/24", "2024-03-05"),
+    ("05-03-99", "1999-03-05"),
+    ("2024-03-05", "2024-03-05"),
+    ("5 марта 2024", "2024-03-05"),
+    ("1 Мая 2024", "2024-05-01"),
+    ("29.02.2024", "2024-02-29"),
+])
+def test_iso_date(value, expected):
+    assert iso_date(value) == expected
+
+
+@pytest.mark.parametrize("value", [
+    None, "", "вчера", "31.02.2024", "29.02.2023", "31.04.2024", "2024-13-01", "00.01.2024", "5 мартобря 2024",
+])
+def test_iso_date_rejects_impossible(value):
+    assert iso_date(value) is None
+
+
+def _result(number, date, sender, text):
+    return {"document_type": "Письмо", "sender": sender, "recipient": "АО «Вектор»", "document_date": date,
+            "document_number": number, "subject": "о поставке", "_text": text}
+
+
+def _fill(path, rows):
+    store = ResultStore(str(path))
+    for name, result in rows:
+        store.write(name, f"in/{name}", result, META)
+    store.close()
+
+
+def test_query_by_fields_dates_and_text(tmp_path):
+    path = tmp_path / STORE_NAME
+    _fill(path, [
+        ("a.pdf", _result("17", "05.03.2024", "ООО «Ромашка»", "договор поставки цемента")),
+        ("b.pdf", _result("18", "31.02.2024", "ООО «Север»", "акт сверки")),
+        ("c.zip", {"documents": [{"file": "d.docx", "result": _result("19", "1 апреля 2024", "ИП Смирнов",
+                                                                      "счёт на оплату")}]}),
+    ])
+    conn = connect(str(path))
+
+    assert [r["file"] for r in query(conn, number="17")] == ["a.pdf"]
+    assert [r["file"] for r in query(conn, sender="ромашка")] == ["a.pdf"]
+    assert [r["file"] for r in query(conn, date_from="2024-03-01")] == ["c.zip/d.docx", "a.pdf"]
+    # Несуществующая дата не попадает в диапазон
+    assert conn.execute("SELECT date_iso FROM documents WHERE file = 'b.pdf'").fetchone() == (None,)
+    found = query(conn, text="поставки")
+    assert [r["file"] for r in found] == ["a.pdf"]
+    assert "[поставки]" in found[0]["snippet"]
+    conn.close()
+
+
+def test_rewrite_replaces_row_and_text(tmp_path):
+    path = tmp_path / STORE_NAME
+    _fill(path, [("a.pdf", _result("17", "05.03.2024", "ООО «Ромашка»", "старый текст"))])
+    _fill(path, [("a.pdf", _result("17", "05.03.2024", "ООО «Ромашка»", "новый текст"))])
+    conn = connect(str(path))
+
+    assert conn.execute("SELECT COUNT(*) FROM documents").fetchone() == (1,)
+    assert query(conn, text="старый") == []
+    assert [r["file"] for r in query(conn, text="новый")] == ["a.pdf"]
+    conn.close()
+
+
+def test_checkpoint_waits_for_batch(tmp_path):
+    store = ResultStore(str(tmp_path / STORE_NAME), flush_rows=2, flush_seconds=3600)
+    store.write("a.pdf", "in/a.pdf", _result("1", None, None, ""), META)
+    assert not store.checkpoint()
+    store.write("b.pdf", "in/b.pdf", _result("2", None, None, ""), META)
+    assert store.checkpoint()
+    store.close()
+
+
+def test_merge_shard_stores(tmp_path):
+    from src.merge import merge
+
+    for i, name in enumerate(("a.pdf", "b.pdf"), start=1):
+        _fill(tmp_path / store_name(f"shard-{i}-of-2"),
+              [(name, _result(str(i), "05.03.2024", "ООО «Ромашка»", f"текст {name}"))])
+
+    merge(str(tmp_path))
+
+    assert not (tmp_path / store_name("shard-1-of-2")).exists()
+    conn = connect(str(tmp_path / STORE_NAME))
+    assert sorted(r["file"] for r in query(conn, date="2024-03-05")) == ["a.pdf", "b.pdf"]
+    assert [r["file"] for r in query(conn, text="текст AND b")] == ["b.pdf"]
+    conn.close()
@@ -0,0 +1,64 @@
+from collections import deque
+
+from src.supervisor import Supervisor, Task
+
+
+def _supervisor(retries):
+    return Supervisor(1, (), retries=retries)
+
+
+def test_failed_batch_is_split_without_spending_attempts():
+    supervisor = _supervisor(retries=1)
+    queue = deque()
+    quarantined = []
+
+    supervisor._requeue(Task(["a.pdf", "b.pdf"], ["in/a.pdf", "in/b.pdf"]), "таймаут", queue,
+                        lambda *args: quarantined.append(args))
+
+    assert [(t.names, t.paths) for t in queue] == [(["a.pdf"], ["in/a.pdf"]), (["b.pdf"], ["in/b.pdf"])]
+    assert supervisor.failures == {}
+    assert quarantined == []
+
+
+def test_document_is_retried_then_quarantined():
+    supervisor = _supervisor(retries=1)
+    queue = deque()
+    quarantined = []
+    task = Task(["a.pdf"], ["in/a.pdf"])
+
+    supervisor._requeue(task, "таймаут", queue, lambda *args: quarantined.append(args))
+    assert list(queue) == [task]
+    assert quarantined == []
+
+    queue.clear()
+    supervisor._requeue(task, "таймаут", queue, lambda *args: quarantined.append(args))
+    assert list(queue) == []
+    assert quarantined == [("a.pdf", "таймаут", 2)]
+
+
+def test_without_retries_first_failure_quarantines():
+    supervisor = _supervisor(retries=0)
+    quarantined = []
+
+    supervisor._requeue(Task(["a.pdf"], ["in/a.pdf"]), "память", deque(), lambda *args: quarantined.append(args))
+
+    assert quarantined == [("a.pdf", "память", 1)]
+
+
+def _hang(conn, init_args):
+    # Процесс-обработчик, зависший при загрузке моделей
+    import time
+    while True:
+        time.sleep(1)
+
+
+def test_worker_hanging_at_startup_is_killed(monkeypatch):
+    import pytest
+    from src import supervisor
+
+    monkeypatch.setattr(supervisor, "_worker_main", _hang)
+    monkeypatch.setattr(supervisor, "START_TIMEOUT", 0.1)
+    monkeypatch.setattr(supervisor, "POLL_INTERVAL", 0.05)
+
+    with pytest.raises(RuntimeError, match="не запустился"):
+        Supervisor(1, (), timeout=0.1).run([Task(["a.pdf"], ["in/a.pdf"])], None, None)
@@ -0,0 +1,78 @@
+from src.core import text_extractor
+from src.core.text_extractor import InMemoryFile, extract_document, extract_text_pdf
+
+PAGE = ["ООО Ромашка, г. Москва", "Исх. № 17 от 05.03.2024", "Тема: о поставке"]
+
+
+def _fake_ocr(calls):
+    def ocr_pages(pages):
+        images = [load() for load in pages]
+        calls.append(len(images))
+        return [f"распознанная страница {image.size[0] > 0}" for image in images]
+    return ocr_pages
+
+
+def test_mixed_pdf_routes_pages(monkeypatch, make_pdf):
+    calls = []
+    monkeypatch.setattr(text_extractor, "ocr_pages", _fake_ocr(calls))
+    source = InMemoryFile(make_pdf([PAGE, None, PAGE]), "mixed.pdf")
+
+    document = extract_document(source)
+
+    assert document["method"] == "mixed"
+    assert [p["method"] for p in document["pages"]] == ["text", "ocr", "text"]
+    # Только страница-скан отрисовывается и распознаётся, порядок страниц сохранён
+    assert calls == [1]
+    lines = document["text"].splitlines()
+    assert lines.index("распознанная страница True") == len(PAGE)
+    assert "Исх. № 17 от 05.03.2024" in lines
+
+
+def test_extract_text_pdf_is_text_layer_only(monkeypatch, make_pdf):
+    calls = []
+    monkeypatch.setattr(text_extractor, "ocr_pages", _fake_ocr(calls))
+
+    text = extract_text_pdf(InMemoryFile(make_pdf([PAGE, None]), "mixed.pdf"))
+
+    assert [line for line in text.splitlines() if line] == PAGE
+    assert calls == []
+    assert extract_text_pdf(InMemoryFile(make_pdf([None]), "scan.pdf")) is None
+
+
+def test_two_pdfs_in_parallel_threads_use_pymupdf_one_at_a_time(monkeypatch, make_pdf, models):
+    import threading
+    import time
+    import fitz
+    from src.core.processor import process_document
+
+    state = {"active": 0, "max": 0}
+    guard = threading.Lock()
+
+    def tracked(method):
+        def call(*args, **kwargs):
+            with guard:
+                state["active"] += 1
+                state["max"] = max(state["max"], state["active"])
+            time.sleep(0.02)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                with guard:
+                    state["active"] -= 1
+        return call
+
+    monkeypatch.setattr(fitz.Page, "get_text", tracked(fitz.Page.get_text))
+    monkeypatch.setattr(fitz.Page, "get_pixmap", tracked(fitz.Page.get_pixmap))
+    monkeypatch.setattr(text_extractor, "ocr_pages", _fake_ocr([]))
+    sources = [InMemoryFile(make_pdf([PAGE, None, PAGE, None]), f"{name}.pdf") for name in ("a", "b")]
+
+    results = [None, None]
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, process_document(sources[i])))
+               for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert state["max"] == 1
+    assert [result["document_number"] for result in results] == ["17", "17"]
@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+from src.traversal import parse_shard, shard_name, in_shard, file_filter, iter_files, in_excluded_dir
+
+
+def _tree(root, paths):
+    for path in paths:
+        full = root / path
+        full.parent.mkdir(parents=True, exist_ok=True)
+        full.write_bytes(b"x")
+
+
+def test_parse_shard():
+    assert parse_shard("2/8") == (2, 8)
+    for value in ("0/2", "3/2", "a/b", "1"):
+        with pytest.raises(ValueError):
+            parse_shard(value)
+
+
+def test_shard_name_is_zero_padded():
+    assert shard_name((3, 12)) == "shard-03-of-12"
+
+
+def test_shards_partition_files():
+    paths = [f"dir{i % 7}/file{i}.pdf" for i in range(500)]
+    owners = [[i for i in range(1, 5) if in_shard(path, (i, 4))] for path in paths]
+
+    assert all(len(owner) == 1 for owner in owners)
+    assert {owner[0] for owner in owners} == {1, 2, 3, 4}
+
+
+def test_iter_files_order_and_exclude(tmp_path):
+    _tree(tmp_path, ["b.pdf", "a.pdf", "z/c.pdf", "tmp/d.pdf", "y/e.pdf"])
+
+    assert list(iter_files(str(tmp_path))) == ["a.pdf", "b.pdf"]
+    assert list(iter_files(str(tmp_path), recursive=True, exclude=["tmp"])) == [
+        "a.pdf", "b.pdf", os.path.join("y", "e.pdf"), os.path.join("z", "c.pdf"),
+    ]
+
+
+def test_file_filter():
+    check = file_filter(lambda path: path.endswith(".pdf"), include=["2023/*"], exclude=["draft_*"])
+
+    assert check("2023/a.pdf")
+    assert not check("2023/a.docx")
+    assert not check("2024/a.pdf")
+    assert not check("2023/draft_a.pdf")
+
+
+def test_in_excluded_dir():
+    assert in_excluded_dir(os.path.join("tmp", "a.pdf"), ["tmp"])
+    assert in_excluded_dir("archive/tmp/a.pdf", ["tmp"])
+    assert in_excluded_dir("archive/2023/a.pdf", ["archive/2023"])
+    assert not in_excluded_dir("tmp.pdf", ["tmp"])
+    assert not in_excluded_dir("a/b.pdf", None)
@@ -0,0 +1,120 @@
+import os
+import time
+import threading
+
+import pytest
+
+from src import watch as watch_module
+from src.watch import watch_folder, PollingSource
+
+
+class _Stop(Exception):
+    pass
+
+
+@pytest.fixture(params=["inotify", "polling"])
+def source_kind(request, monkeypatch):
+    if request.param == "polling":
+        monkeypatch.setattr(watch_module, "open_source",
+                            lambda folder, poll_interval, recursive=False:
+                            PollingSource(folder, poll_interval, recursive=recursive))
+    return request.param
+
+
+def _watch(folder, on_start, debounce=0.3, accept=None):
+    batches = []
+
+    def on_ready(names):
+        batches.append((time.monotonic(), names))
+        raise _Stop()
+
+    with pytest.raises(_Stop):
+        watch_folder(str(folder), on_ready, accept=accept, debounce=debounce, poll_interval=0.05,
+                     on_start=on_start)
+    return batches
+
+
+def test_accepted_files_are_reported(tmp_path, source_kind):
+    def on_start():
+        (tmp_path / "a.pdf").write_bytes(b"data")
+        (tmp_path / "b.txt").write_bytes(b"data")
+
+    batches = _watch(tmp_path, on_start, accept=lambda name: name.endswith(".pdf"))
+
+    assert batches[0][1] == ["a.pdf"]
+
+
+def test_file_is_reported_only_after_it_stops_changing(tmp_path, source_kind):
+    finished = []
+
+    def write():
+        with open(tmp_path / "a.pdf", "wb") as f:
+            for _ in range(10):
+                f.write(b"x" * 100)
+                f.flush()
+                time.sleep(0.05)
+        finished.append(time.monotonic())
+
+    writer = threading.Thread(target=write)
+    batches = _watch(tmp_path, writer.start, debounce=0.3)
+    writer.join()
+
+    reported_at, names = batches[0]
+    assert names == ["a.pdf"]
+    assert reported_at >= finished[0]
+    assert (tmp_path / "a.pdf").stat().st_size == 1000
+
+
+def _watch_recursive(folder, on_start, debounce=0.3):
+    batches = []
+
+    def on_ready(names):
+        batches.append(names)
+        raise _Stop()
+
+    with pytest.raises(_Stop):
+        watch_folder(str(folder), on_ready, debounce=debounce, poll_interval=0.05, on_start=on_start,
+                     recursive=True)
+    return batches[0]
+
+
+def test_recursive_watch_sees_existing_subfolders(tmp_path, source_kind):
+    (tmp_path / "2024" / "03").mkdir(parents=True)
+
+    def on_start():
+        (tmp_path / "2024" / "03" / "a.pdf").write_bytes(b"data")
+
+    assert _watch_recursive(tmp_path, on_start) == [os.path.join("2024", "03", "a.pdf")]
+
+
+def test_recursive_watch_sees_new_subfolders(tmp_path, source_kind):
+    def on_start():
+        # Файл появляется в новой папке раньше, чем на неё ставится наблюдение
+        (tmp_path / "new" / "deep").mkdir(parents=True)
+        (tmp_path / "new" / "deep" / "a.pdf").write_bytes(b"data")
+        (tmp_path / "b.pdf").write_bytes(b"data")
+
+    assert _watch_recursive(tmp_path, on_start) == ["b.pdf", os.path.join("new", "deep", "a.pdf")]
+
+
+def test_recursive_watch_sees_moved_in_folder(tmp_path, source_kind):
+    outside = tmp_path / "outside"
+    (outside / "batch").mkdir(parents=True)
+    (outside / "batch" / "a.pdf").write_bytes(b"data")
+    watched = tmp_path / "watched"
+    watched.mkdir()
+
+    def on_start():
+        os.rename(outside / "batch", watched / "batch")
+
+    assert _watch_recursive(watched, on_start) == [os.path.join("batch", "a.pdf")]
+
+
+def test_subfolders_ignored_without_recursive(tmp_path):
+    (tmp_path / "sub").mkdir()
+
+    def on_start():
+        (tmp_path / "sub" / "a.pdf").write_bytes(b"data")
+        (tmp_path / "b.pdf").write_bytes(b"data")
+
+    assert _watch(tmp_path, on_start)[0][1] == ["b.pdf"]